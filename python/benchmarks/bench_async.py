@@ -0,0 +1,66 @@
+"""Throughput benchmark of ``rhc_playbook_lib.aio``.
+
+Verifies the test playbooks many times: one after another with the blocking API, and all at once on
+one event loop with :class:`rhc_playbook_lib.aio.AsyncVerifier`, for several concurrency limits.
+
+Run with ``python python/benchmarks/bench_async.py``.
+"""
+
+import argparse
+import asyncio
+import pathlib
+import time
+
+import rhc_playbook_lib
+from rhc_playbook_lib import aio
+from rhc_playbook_lib.keyring import Keyring
+
+DATA = pathlib.Path(__file__).parents[2].absolute() / "data"
+PLAYBOOKS: tuple[str, ...] = ("insights_remove", "document-from-hell", "bugs")
+
+
+async def _verify_all(keyring: Keyring, playbooks: list[str], concurrency: int) -> int:
+    verifier = aio.AsyncVerifier(keyring, concurrency=concurrency)
+    results = await asyncio.gather(*(verifier.verify_playbook(p) for p in playbooks))
+    return sum(len(plays) for plays in results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=20,
+        help="Number of times each playbook is verified",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 4, 16, 64],
+        help="Signatures verified at once",
+    )
+    args = parser.parse_args()
+
+    keyring = Keyring([(DATA / "public.gpg").read_bytes()])
+    playbooks: list[str] = [
+        (DATA / "playbooks" / f"{name}.yml").read_text() for name in PLAYBOOKS
+    ] * args.rounds
+
+    print(f"{'mode':<12} {'total':>10} {'plays/s':>10}")
+    start: float = time.perf_counter()
+    plays: int = sum(
+        len(rhc_playbook_lib.verify_playbook(p, keyring)) for p in playbooks
+    )
+    elapsed: float = time.perf_counter() - start
+    print(f"{'blocking':<12} {elapsed:>9.2f}s {plays / elapsed:>10.1f}")
+
+    for concurrency in args.concurrency:
+        start = time.perf_counter()
+        plays = asyncio.run(_verify_all(keyring, playbooks, concurrency))
+        elapsed = time.perf_counter() - start
+        print(f"{f'async/{concurrency}':<12} {elapsed:>9.2f}s {plays / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Benchmark of logging serialized plays on the verification hot path.
+
+Compares formatting the payload eagerly inside an f-string with ``diagnostics.log_payload``, with
+the debug level both disabled (the production default) and enabled.
+
+Run with ``python python/benchmarks/bench_diagnostics.py``.
+"""
+
+import argparse
+import logging
+import timeit
+
+from rhc_playbook_lib import diagnostics
+
+logger = logging.getLogger("bench_diagnostics")
+
+
+def _eager(payload: bytes) -> None:
+    logger.debug(f"Serialized play as {payload!r}")
+
+
+def _lazy(payload: bytes) -> None:
+    diagnostics.log_payload(logger, logging.DEBUG, "Serialized play", payload)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=4, help="Payload size in MiB")
+    parser.add_argument("--number", type=int, default=20, help="Calls per repeat")
+    args = parser.parse_args()
+
+    payload: bytes = b"ordereddict([('name', 'play \\xc5\\xa1')])" * (
+        args.size * 1024 * 1024 // 40
+    )
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    print(f"{'level':<10} {'f-string':>12} {'log_payload':>12}")
+    for level in (logging.WARNING, logging.DEBUG):
+        logger.setLevel(level)
+        eager: float = min(
+            timeit.repeat(lambda: _eager(payload), number=args.number, repeat=3)
+        )
+        lazy: float = min(
+            timeit.repeat(lambda: _lazy(payload), number=args.number, repeat=3)
+        )
+        print(
+            f"{logging.getLevelName(level):<10} "
+            f"{eager / args.number * 1e6:>10.1f}us {lazy / args.number * 1e6:>10.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
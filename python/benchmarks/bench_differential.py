@@ -0,0 +1,41 @@
+"""Differential test and throughput of the engines computing the canonical form and digest of plays.
+
+Runs the harness of ``tests/unit/differential.py`` on more cases than the unit tests do. The first
+mismatch is printed with the playbook causing it, and the script exits with status 1. Otherwise
+the throughput of each engine, relative to the reference, is printed.
+
+Run with ``PYTHONPATH=python python python/benchmarks/bench_differential.py --cases 2000 --seed 1``.
+"""
+
+import argparse
+import sys
+
+from tests.unit.differential import Mismatch, run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cases", type=int, default=1000, help="Playbooks to generate")
+    parser.add_argument("--plays", type=int, default=3, help="Most plays of a playbook")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generator")
+    args = parser.parse_args()
+
+    try:
+        seconds, unsupported, compared = run(args.seed, args.cases, args.plays)
+    except Mismatch as exc:
+        print(exc, file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{compared} plays of {args.cases} playbooks are identical in all engines.")
+    print(
+        f"{'engine':<10} {'total':>10} {'plays/s':>10} {'relative':>9} {'unsupported':>12}"
+    )
+    for engine, elapsed in seconds.items():
+        print(
+            f"{engine:<10} {elapsed:>9.2f}s {compared / elapsed:>10.1f} "
+            f"{seconds['reference'] / elapsed:>8.2f}x {unsupported[engine]:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark of emitting signed playbooks with ``rhc_playbook_lib.serialization``.
+
+Compares emitting a catalogue of signed plays with the Python emitter (``CustomYamlDumper``) and with
+``dump_playbook``, which uses libyaml when PyYAML is built with it and the emitters agree on the
+plays. Checking that they agree is included in the time of ``dump_playbook``.
+
+Run with ``python python/benchmarks/bench_emitter.py``.
+"""
+
+import argparse
+import io
+import time
+from typing import TextIO
+
+import yaml
+from rhc_playbook_lib import serialization
+
+
+def _play(index: int, tasks: int) -> dict:
+    return {
+        "name": f"Generated remediation play {index}",
+        "hosts": "localhost",
+        "become": True,
+        "vars": {
+            "insights_signature_exclude": "/hosts,/vars/insights_signature",
+            "insights_signature": b"signature " * 60,
+        },
+        "tasks": [
+            {
+                "name": f"Task {i}",
+                "ansible.builtin.shell": f"systemctl restart service-{i % 10}",
+                "register": "out",
+                "changed_when": None,
+                "when": ["ansible_distribution == 'RedHat'", i % 2 == 0],
+            }
+            for i in range(tasks)
+        ],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--plays", type=int, default=50, help="Plays in the catalogue")
+    parser.add_argument("--tasks", type=int, default=200, help="Tasks of each play")
+    args = parser.parse_args()
+
+    plays: list[dict] = [_play(i, args.tasks) for i in range(args.plays)]
+    print(f"libyaml: {serialization.HAS_LIBYAML}")
+    print(f"{'method':<16} {'total':>10} {'MiB/s':>8}")
+
+    def python(output: TextIO) -> None:
+        yaml.dump(plays, output, Dumper=serialization.CustomYamlDumper, sort_keys=False)
+
+    def dump_playbook(output: TextIO) -> None:
+        serialization.dump_playbook(plays, output)
+
+    outputs: list[str] = []
+    for name, dump in (("python", python), ("dump_playbook", dump_playbook)):
+        output = io.StringIO()
+        start: float = time.perf_counter()
+        dump(output)
+        elapsed: float = time.perf_counter() - start
+        outputs.append(output.getvalue())
+        size: float = len(outputs[-1]) / 1024 / 1024
+        print(f"{name:<16} {elapsed:>9.2f}s {size / elapsed:>8.1f}")
+    assert outputs[0] == outputs[1], "Emitters wrote different output"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Memory benchmark of strings deduplicated by ``CustomSafeConstructor``.
+
+Parses large generated playbooks with and without deduplication of short strings, and reports the
+memory the parsed plays keep: the size of objects allocated by parsing that are still alive, and
+the growth of the resident set size. Each measurement runs in a fresh interpreter.
+
+Run with ``python python/benchmarks/bench_interning.py``.
+"""
+
+import argparse
+import gc
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+from typing import Optional
+
+import rhc_playbook_lib
+import yaml
+from rhc_playbook_lib.serialization import CustomSafeConstructor, serialize_play
+
+
+def _playbook(tasks: int) -> str:
+    play: dict = {
+        "name": "Generated remediation play",
+        "hosts": "localhost",
+        "become": True,
+        "vars": {
+            "insights_signature_exclude": "/hosts,/vars/insights_signature",
+            "insights_signature": "c2lnbmF0dXJl",
+        },
+        "tasks": [
+            {
+                "name": f"Task {i}",
+                "block": [
+                    {
+                        "ansible.builtin.shell": f"systemctl restart service-{i % 10}",
+                        "register": "out",
+                        "become": True,
+                        "changed_when": False,
+                    },
+                    {"ansible.builtin.debug": {"var": "out.stdout_lines"}},
+                ],
+                "rescue": [{"ansible.builtin.fail": {"msg": "Task failed"}}],
+                "when": ["ansible_distribution == 'RedHat'", "out is defined"],
+            }
+            for i in range(tasks)
+        ],
+    }
+    return yaml.dump([play], sort_keys=False)
+
+
+def _resident() -> Optional[int]:
+    """Return the resident set size in bytes, on Linux."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def _measure(tasks: int, intern: bool, trace: bool) -> dict:
+    """Parse a playbook in this process, and return the memory its plays keep.
+
+    Tracing allocations takes memory of its own, the resident size is measured without it.
+    """
+    if not intern:
+        CustomSafeConstructor.intern_max_length = None
+    playbook: str = _playbook(tasks)
+    gc.collect()
+    before: Optional[int] = _resident()
+    if trace:
+        tracemalloc.start()
+    plays: list = rhc_playbook_lib.parse_playbook(playbook)
+    gc.collect()
+    if trace:
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        digest: str = hashlib.sha256(serialize_play(plays[0]).encode()).hexdigest()
+        return {"retained": retained, "digest": digest}
+    after: Optional[int] = _resident()
+    return {"resident": after - before if after and before else None}
+
+
+def _run(tasks: int, intern: bool) -> dict:
+    """Measure in fresh interpreters, so that allocations of one run do not skew the other."""
+    measurement: dict = {}
+    for trace in (True, False):
+        args: list[str] = [sys.executable, __file__, "--child", str(tasks)]
+        if not intern:
+            args.append("--no-intern")
+        if trace:
+            args.append("--trace")
+        result = subprocess.run(args, capture_output=True, text=True, check=True)
+        measurement.update(json.loads(result.stdout))
+    return measurement
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--tasks", type=int, nargs="+", default=[1000, 4000], help="Play sizes"
+    )
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--no-intern", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(_measure(args.child, not args.no_intern, args.trace)))
+        return
+
+    print(f"{'tasks':>6} {'strings':<10} {'retained':>12} {'resident':>12}")
+    for tasks in args.tasks:
+        results: dict[str, dict] = {
+            "plain": _run(tasks, intern=False),
+            "interned": _run(tasks, intern=True),
+        }
+        assert results["plain"]["digest"] == results["interned"]["digest"]
+        for name, result in results.items():
+            resident: str = (
+                f"{result['resident'] / 1024 / 1024:>9.2f}MiB"
+                if result["resident"] is not None
+                else f"{'-':>12}"
+            )
+            print(
+                f"{tasks:>6} {name:<10} "
+                f"{result['retained'] / 1024 / 1024:>9.2f}MiB {resident}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark of linting a playbook catalogue with ``rhc_playbook_lib.lint``.
+
+Writes a catalogue of synthetic playbooks, then checks it with ``lint.lint_files`` and, for
+comparison, digests it with ``manifest.digest_files``, which parses, serializes and hashes every
+play. Both run in a pool of worker processes.
+
+Run with ``python python/benchmarks/bench_lint.py --files 500``.
+"""
+
+import argparse
+import pathlib
+import time
+from tempfile import TemporaryDirectory
+
+import yaml
+from rhc_playbook_lib import lint, manifest
+
+
+def _playbook(index: int, tasks: int) -> str:
+    play: dict = {
+        "name": f"Catalogue play {index}",
+        "hosts": "localhost",
+        "become": "yes",
+        "vars": {
+            "insights_signature_exclude": "/hosts,/vars/insights_signature",
+            "insights_signature": "",
+        },
+        "tasks": [
+            {
+                "name": f"Task {i}",
+                "ansible.builtin.shell": f"systemctl restart service-{i % 10}",
+                "register": "out",
+                "when": ["ansible_distribution == 'RedHat'", "out is defined"],
+            }
+            for i in range(tasks)
+        ],
+    }
+    return yaml.dump([play], sort_keys=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=200, help="Playbooks to write")
+    parser.add_argument("--tasks", type=int, default=50, help="Tasks of each play")
+    parser.add_argument("--jobs", type=int, help="Worker processes")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory_str:
+        directory = pathlib.Path(directory_str)
+        for i in range(args.files):
+            (directory / f"playbook-{i}.yml").write_text(_playbook(i, args.tasks))
+        paths: list[pathlib.Path] = manifest.find_playbooks(directory)
+
+        print(f"{'method':<10} {'total':>10} {'files/s':>10} {'results':>8}")
+        start: float = time.perf_counter()
+        findings: int = sum(1 for _ in lint.lint_files(paths, jobs=args.jobs))
+        elapsed: float = time.perf_counter() - start
+        print(
+            f"{'lint':<10} {elapsed:>9.2f}s {len(paths) / elapsed:>10.1f} {findings:>8}"
+        )
+
+        start = time.perf_counter()
+        entries: int = sum(1 for _ in manifest.digest_files(paths, jobs=args.jobs))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{'manifest':<10} {elapsed:>9.2f}s {len(paths) / elapsed:>10.1f} {entries:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
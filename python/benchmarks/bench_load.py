@@ -0,0 +1,264 @@
+"""Load test of playbook verification: replay a corpus of playbooks with concurrent clients.
+
+The corpus holds the signed test playbooks of ``data/playbooks`` and synthetic playbooks of several
+sizes, signed with a key generated by ``rhc_playbook_lib._keygen``. Nothing is fetched from the
+network, and requests are drawn from the corpus with a fixed seed, so runs are reproducible.
+
+Each client verifies one playbook after another, either by running the ``rhc-playbook-verifier``
+console script (``--mode cli``), or by calling one ``rhc_playbook_lib.Verifier`` shared by all
+client threads (``--mode library``). For each number of clients, reports throughput, latency
+percentiles, and the peak number of processes and peak resident memory of the whole process tree,
+sampled from ``/proc``.
+
+Run with ``python python/benchmarks/bench_load.py --mode cli --clients 1 4 16``.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import pathlib
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from tempfile import TemporaryDirectory
+from typing import Callable, Optional
+
+import rhc_playbook_lib
+import yaml
+from rhc_playbook_lib import _keygen
+from rhc_playbook_lib.keyring import Keyring
+from rhc_playbook_signer.app import digest_signer, sign_play
+
+DATA = pathlib.Path(__file__).parents[2].absolute() / "data"
+# Fields of '/proc/<pid>/stat' after the command name, see proc(5)
+_STAT_PPID = 1
+_STAT_RSS = 21
+# Seconds between samples of the process tree
+SAMPLE_INTERVAL = 0.02
+
+
+def _synthetic_play(index: int, tasks: int) -> dict:
+    return {
+        "name": f"Synthetic play {index}",
+        "hosts": "localhost",
+        "become": True,
+        "tasks": [
+            {
+                "name": f"Task {i}",
+                "ansible.builtin.shell": f"systemctl restart service-{i % 10}",
+                "register": "out",
+                "changed_when": False,
+                "when": ["ansible_distribution == 'RedHat'", "out is defined"],
+            }
+            for i in range(tasks)
+        ],
+    }
+
+
+def build_corpus(
+    directory: pathlib.Path, synthetic: int, sizes: list[int]
+) -> list[pathlib.Path]:
+    """Write the corpus into a directory, with the generated public key as ``key.public.gpg``.
+
+    :returns: Playbook files of the corpus.
+    """
+    with _keygen._generate_keys() as gpg_tmp_dir:
+        _keygen._export_key_pair(gpg_tmp_dir, directory)
+
+    corpus: list[pathlib.Path] = sorted((DATA / "playbooks").glob("*.yml"))
+    with digest_signer(
+        local_key=directory / "key.private.gpg", remote_key=None
+    ) as sign:
+        for i in range(synthetic):
+            tasks: int = sizes[i % len(sizes)]
+            path = directory / f"synthetic-{i}-{tasks}.yml"
+            play: dict = sign_play(_synthetic_play(i, tasks), sign=sign)
+            path.write_text(yaml.dump([play], sort_keys=False))
+            corpus.append(path)
+    return corpus
+
+
+def _process_tree(root: int) -> tuple[int, int]:
+    """Return the number of processes in the tree of a process, and their resident memory."""
+    parents: dict[int, int] = {}
+    resident: dict[int, int] = {}
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat") as stat:
+                fields: list[str] = stat.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        pid = int(entry.name)
+        parents[pid] = int(fields[_STAT_PPID])
+        resident[pid] = int(fields[_STAT_RSS]) * os.sysconf("SC_PAGE_SIZE")
+
+    tree: set[int] = {root}
+    grown: bool = True
+    while grown:
+        children: set[int] = {p for p, parent in parents.items() if parent in tree}
+        grown = not children <= tree
+        tree |= children
+    return len(tree), sum(resident.get(pid, 0) for pid in tree)
+
+
+class TreeSampler:
+    """Sample the process tree of this process in a thread, and keep the peaks."""
+
+    def __init__(self) -> None:
+        self.processes: int = 0
+        self.resident: int = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            processes, resident = _process_tree(os.getpid())
+            self.processes = max(self.processes, processes)
+            self.resident = max(self.resident, resident)
+
+    def __enter__(self) -> "TreeSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _cli_client(keys: list[pathlib.Path]) -> Callable[[pathlib.Path], bool]:
+    # Prefer the script installed with this interpreter
+    script: Optional[str] = shutil.which(
+        "rhc-playbook-verifier", path=str(pathlib.Path(sys.executable).parent)
+    ) or shutil.which("rhc-playbook-verifier")
+    command: list[str] = (
+        [script] if script else [sys.executable, "-m", "rhc_playbook_verifier"]
+    )
+    for key in keys:
+        command += ["--key", str(key)]
+
+    def verify(path: pathlib.Path) -> bool:
+        result = subprocess.run(
+            [*command, "--playbook", str(path)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+        return result.returncode == 0
+
+    return verify
+
+
+def _library_client(keys: list[pathlib.Path]) -> Callable[[pathlib.Path], bool]:
+    verifier = rhc_playbook_lib.Verifier(Keyring(key.read_bytes() for key in keys))
+
+    def verify(path: pathlib.Path) -> bool:
+        try:
+            return verifier.verify_playbook(path.read_bytes()).valid
+        except Exception:
+            return False
+
+    return verify
+
+
+def measure(
+    verify: Callable[[pathlib.Path], bool], requests: list[pathlib.Path], clients: int
+) -> dict:
+    """Verify the requests with a number of concurrent clients."""
+    latencies: list[float] = []
+    failed: int = 0
+
+    def timed(path: pathlib.Path) -> bool:
+        start: float = time.perf_counter()
+        ok: bool = verify(path)
+        latencies.append(time.perf_counter() - start)
+        return ok
+
+    with TreeSampler() as sampler:
+        start: float = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=clients) as executor:
+            failed = sum(not ok for ok in executor.map(timed, requests))
+        elapsed: float = time.perf_counter() - start
+
+    percentiles: list[float] = statistics.quantiles(latencies, n=100)
+    return {
+        "clients": clients,
+        "requests": len(requests),
+        "failed": failed,
+        "seconds": elapsed,
+        "throughput": len(requests) / elapsed,
+        "p50": percentiles[49],
+        "p95": percentiles[94],
+        "p99": percentiles[98],
+        "processes": sampler.processes,
+        "resident": sampler.resident,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mode", choices=("cli", "library"), default="cli")
+    parser.add_argument(
+        "--clients",
+        type=int,
+        nargs="+",
+        default=[1, 4, 16],
+        help="Numbers of concurrent clients",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=100, help="Playbooks verified per run"
+    )
+    parser.add_argument(
+        "--synthetic", type=int, default=12, help="Synthetic playbooks in the corpus"
+    )
+    parser.add_argument(
+        "--tasks",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="Numbers of tasks of synthetic plays",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of request order")
+    parser.add_argument("--json", action="store_true", help="Print JSON Lines")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory_str:
+        directory = pathlib.Path(directory_str)
+        corpus: list[pathlib.Path] = build_corpus(directory, args.synthetic, args.tasks)
+        keys: list[pathlib.Path] = [DATA / "public.gpg", directory / "key.public.gpg"]
+        client: Callable[[list[pathlib.Path]], Callable[[pathlib.Path], bool]] = (
+            _cli_client if args.mode == "cli" else _library_client
+        )
+        verify: Callable[[pathlib.Path], bool] = client(keys)
+        requests: list[pathlib.Path] = random.Random(args.seed).choices(
+            corpus, k=args.requests
+        )
+
+        if not args.json:
+            print(
+                f"{args.mode}: {len(corpus)} playbooks, {args.requests} requests, "
+                f"{os.cpu_count()} CPUs\n"
+                f"{'clients':>7} {'failed':>6} {'req/s':>8} {'p50':>9} {'p95':>9} "
+                f"{'p99':>9} {'procs':>6} {'peak RSS':>10}"
+            )
+        for clients in args.clients:
+            result: dict = measure(verify, requests, clients)
+            if args.json:
+                print(json.dumps({"mode": args.mode, **result}))
+                continue
+            print(
+                f"{clients:>7} {result['failed']:>6} {result['throughput']:>8.1f} "
+                f"{result['p50'] * 1000:>7.1f}ms {result['p95'] * 1000:>7.1f}ms "
+                f"{result['p99'] * 1000:>7.1f}ms {result['processes']:>6} "
+                f"{result['resident'] / 1024 / 1024:>7.1f}MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
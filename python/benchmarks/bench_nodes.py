@@ -0,0 +1,115 @@
+"""Benchmark of play digests computed from YAML nodes with ``rhc_playbook_lib.nodes``.
+
+Compares the reference pipeline (construct the play, ``clean_play``, ``serialize_play``, SHA-256)
+with ``nodes.digest_play`` walking the composed node graph. Composing the playbook is common to
+both and is reported separately. For each method, reports wall time and the peak of memory
+allocated on top of the composed node graph.
+
+Run with ``python python/benchmarks/bench_nodes.py``.
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import Callable
+
+import rhc_playbook_lib
+import yaml
+from rhc_playbook_lib import nodes
+from rhc_playbook_lib.serialization import Loader, serialize_play
+
+
+def _playbook(tasks: int) -> str:
+    play: dict = {
+        "name": "Generated remediation play",
+        "hosts": "localhost",
+        "become": True,
+        "vars": {
+            "insights_signature_exclude": "/hosts,/vars/insights_signature",
+            "insights_signature": "c2lnbmF0dXJl",
+        },
+        "tasks": [
+            {
+                "name": f"Task {i}",
+                "block": [
+                    {
+                        "ansible.builtin.shell": "systemctl restart rhcd\n" * 4,
+                        "register": "out",
+                    },
+                    {"ansible.builtin.debug": {"var": "out.stdout_lines"}},
+                ],
+                "rescue": [{"ansible.builtin.fail": {"msg": "Task failed"}}],
+                "when": ["ansible_distribution == 'RedHat'", i % 2 == 0],
+            }
+            for i in range(tasks)
+        ],
+    }
+    return yaml.dump([play], sort_keys=False)
+
+
+def _compose(playbook: str) -> tuple[Loader, yaml.Node]:
+    loader = Loader(playbook)
+    try:
+        root = loader.get_single_node()
+    finally:
+        loader.dispose()
+    assert isinstance(root, yaml.SequenceNode)
+    return loader, root.value[0]
+
+
+def _reference(loader: Loader, node: yaml.Node) -> bytes:
+    play: dict = loader.construct_document(node)
+    serialized: bytes = serialize_play(rhc_playbook_lib.clean_play(play)).encode()
+    return rhc_playbook_lib.create_play_digest(serialized)
+
+
+def _nodes(loader: Loader, node: yaml.Node) -> bytes:
+    return nodes.digest_play(loader, node).digest
+
+
+def _measure(
+    function: Callable[[Loader, yaml.Node], bytes], loader: Loader, node: yaml.Node
+) -> tuple[float, int]:
+    """Return the best wall time in seconds and the allocation peak in bytes."""
+    elapsed: float = float("inf")
+    for _ in range(3):
+        start: float = time.perf_counter()
+        function(loader, node)
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function(loader, node)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--tasks", type=int, nargs="+", default=[100, 1000], help="Play sizes"
+    )
+    args = parser.parse_args()
+
+    print(f"{'tasks':>6} {'stage':<10} {'time':>10} {'peak':>12}")
+    for tasks in args.tasks:
+        playbook: str = _playbook(tasks)
+        start: float = time.perf_counter()
+        loader, node = _compose(playbook)
+        print(
+            f"{tasks:>6} {'compose':<10} {(time.perf_counter() - start) * 1000:>8.1f}ms"
+        )
+
+        assert _reference(loader, node) == _nodes(loader, node)
+        for name, function in (("reference", _reference), ("nodes", _nodes)):
+            elapsed, peak = _measure(function, loader, node)
+            print(
+                f"{tasks:>6} {name:<10} {elapsed * 1000:>8.1f}ms "
+                f"{peak / 1024 / 1024:>9.2f}MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Microbenchmarks of ``rhc_playbook_lib.serialization.Serializer``.
+
+Run with ``PYTHONPATH=python python python/benchmarks/bench_serializer.py``.
+"""
+
+import argparse
+import timeit
+import typing
+from typing import Callable
+
+from rhc_playbook_lib.serialization import IterativeSerializer, Serializer
+from tests.unit.differential import reference_str
+
+SHELL_SCRIPT: str = (
+    "#!/bin/bash\nset -euo pipefail\n"
+    + (
+        "if ! rpm -q insights-client >/dev/null; then\n"
+        "\tdnf -y install insights-client && echo 'installed' || exit 1\n"
+        "fi\n"
+    )
+    * 200
+)
+
+CASES: dict[str, str] = {
+    "short key": "ansible.builtin.shell",
+    "shell script": SHELL_SCRIPT,
+    "shell script, one line": SHELL_SCRIPT.replace("\n", " ").replace("\t", " "),
+    "unicode path": "/🍏/👨🏼‍🚀/tříštivá/hrušeň" * 20,
+}
+
+
+PLAY: dict = {
+    "name": "Generated remediation play",
+    "become": True,
+    "vars": {"insights_signature_exclude": "/hosts,/vars/insights_signature"},
+    "tasks": [
+        {
+            "name": f"Task {i}",
+            "block": [
+                {"ansible.builtin.shell": "systemctl restart rhcd", "register": "out"},
+                {"ansible.builtin.debug": {"var": "out.stdout_lines"}},
+            ],
+            "rescue": [{"ansible.builtin.fail": {"msg": "Task failed"}}],
+            "when": ["ansible_distribution == 'RedHat'", i % 2 == 0],
+        }
+        for i in range(1000)
+    ],
+}
+
+
+def _measure(
+    function: Callable[[typing.Any], str], value: typing.Any, number: int
+) -> float:
+    """Return the best time of a single call, in microseconds."""
+    best: float = min(timeit.repeat(lambda: function(value), number=number, repeat=5))
+    return best / number * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=500, help="Calls per repeat")
+    args = parser.parse_args()
+
+    print(f"{'case':<24} {'reference':>14} {'Serializer':>14} {'speedup':>8}")
+    for name, value in CASES.items():
+        assert Serializer._str(value) == reference_str(value)
+        reference: float = _measure(reference_str, value, args.number)
+        current: float = _measure(Serializer._str, value, args.number)
+        print(
+            f"{name:<24} {reference:>12.2f}us {current:>12.2f}us "
+            f"{reference / current:>7.1f}x"
+        )
+
+    print()
+    print(f"{'play':<24} {'Serializer':>14} {'Iterative':>14} {'speedup':>8}")
+    assert Serializer._obj(PLAY) == IterativeSerializer.serialize(PLAY)
+    number: int = max(1, args.number // 100)
+    recursive: float = _measure(Serializer._obj, PLAY, number)
+    iterative: float = _measure(IterativeSerializer.serialize, PLAY, number)
+    print(
+        f"{'1000 tasks':<24} {recursive:>12.2f}us {iterative:>12.2f}us "
+        f"{recursive / iterative:>7.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark of local play signing with ``rhc_playbook_lib.crypto``.
+
+Compares signing each digest in its own temporary GPG home directory (``crypto.sign_file``) with
+signing all digests in one ``crypto.SigningSession``. Reports wall time and the number of
+subprocesses spawned per signature.
+
+Run with ``python python/benchmarks/bench_signing.py``.
+"""
+
+import argparse
+import hashlib
+import subprocess
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Generator
+
+from rhc_playbook_lib import _keygen, crypto
+
+
+class SubprocessCounter:
+    """Count calls to ``subprocess.run`` made by ``rhc_playbook_lib.crypto``."""
+
+    def __init__(self) -> None:
+        self.calls: int = 0
+
+    @contextmanager
+    def patch(self) -> Generator[None, None, None]:
+        original: Callable[..., Any] = subprocess.run
+
+        def run(*args: Any, **kwargs: Any) -> Any:
+            self.calls += 1
+            return original(*args, **kwargs)
+
+        crypto.subprocess.run = run
+        try:
+            yield
+        finally:
+            crypto.subprocess.run = original
+
+
+def _sign_separately(key: Path, files: list[Path]) -> None:
+    for file in files:
+        crypto.sign_file(file, key)
+
+
+def _sign_in_session(key: Path, files: list[Path]) -> None:
+    with crypto.SigningSession(key) as session:
+        for file in files:
+            session.sign_data(file.read_bytes())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--plays", type=int, default=20, help="Number of digests to sign"
+    )
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory_str:
+        directory = Path(directory_str)
+        with _keygen._generate_keys() as gpg_tmp_dir:
+            _keygen._export_key_pair(gpg_tmp_dir, directory)
+        key: Path = directory / "key.private.gpg"
+
+        files: list[Path] = []
+        for i in range(args.plays):
+            file = directory / f"digest-{i}"
+            file.write_bytes(hashlib.sha256(str(i).encode()).digest())
+            files.append(file)
+
+        print(f"{'method':<12} {'total':>10} {'per play':>10} {'processes/play':>15}")
+        for name, method in (
+            ("sign_file", _sign_separately),
+            ("session", _sign_in_session),
+        ):
+            counter = SubprocessCounter()
+            with counter.patch():
+                start: float = time.perf_counter()
+                method(key, files)
+                elapsed: float = time.perf_counter() - start
+            print(
+                f"{name:<12} {elapsed:>9.2f}s {elapsed / args.plays * 1000:>8.1f}ms "
+                f"{counter.calls / args.plays:>15.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark of signature verification backends of ``rhc_playbook_lib.crypto``.
+
+Verifies the plays of the test playbooks, signed by the production RSA-4096 key in
+``data/public.gpg``, with ``gpg`` (key imported into a temporary home directory, agent stopped
+afterwards) and with ``gpgv`` (key converted once into a keyring file). Reports wall time and the
+number of subprocesses spawned per play.
+
+Run with ``python python/benchmarks/bench_verification.py``.
+"""
+
+import argparse
+import pathlib
+import time
+
+import rhc_playbook_lib
+from bench_signing import SubprocessCounter
+from rhc_playbook_lib import crypto
+
+DATA = pathlib.Path(__file__).parents[2].absolute() / "data"
+PLAYBOOKS: tuple[str, ...] = ("insights_remove", "document-from-hell", "bugs")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=5,
+        help="Number of times each playbook is verified",
+    )
+    args = parser.parse_args()
+
+    key: bytes = (DATA / "public.gpg").read_bytes()
+    playbooks: list[str] = [
+        (DATA / "playbooks" / f"{name}.yml").read_text() for name in PLAYBOOKS
+    ]
+
+    print(f"{'backend':<8} {'total':>10} {'per play':>10} {'processes/play':>15}")
+    for backend in ("gpg", "gpgv"):
+        crypto.configure_backend(backend)
+        # Convert the key before measuring, as a long running verifier would have
+        rhc_playbook_lib.verify_playbook(playbooks[0], key)
+
+        plays: int = 0
+        counter = SubprocessCounter()
+        with counter.patch():
+            start: float = time.perf_counter()
+            for _ in range(args.rounds):
+                for playbook in playbooks:
+                    plays += len(rhc_playbook_lib.verify_playbook(playbook, key))
+            elapsed: float = time.perf_counter() - start
+        print(
+            f"{backend:<8} {elapsed:>9.2f}s {elapsed / plays * 1000:>8.1f}ms "
+            f"{counter.calls / plays:>15.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import base64
 import binascii
+import concurrent.futures
+import contextlib
 import copy
 import dataclasses
 import hashlib
@@ -7,19 +9,21 @@ import logging
 import pathlib
 import sys
 import tempfile
+import threading
+import time
 from subprocess import CalledProcessError
-from typing import Any
+from typing import Any, Optional, Union
 
 import yaml
 
-from rhc_playbook_lib import crypto
-from rhc_playbook_lib.constants import TEMPORARY_DIRECTORY_PREFIX
+from rhc_playbook_lib import crypto, diagnostics, nodes
+from rhc_playbook_lib.cache import CachedPlay, DigestCache, play_cache_key
+from rhc_playbook_lib.constants import TEMPORARY_DIRECTORY_PREFIX, VARIABLE_FIELDS
+from rhc_playbook_lib.keyring import Keyring, keyring_file
 from rhc_playbook_lib.serialization import Loader, serialize_play
 
 logger = logging.getLogger(__name__)
 
-VARIABLE_FIELDS: list[str] = ["hosts", "vars"]
-
 
 def _configure_logging(debug: bool = False) -> None:
     main_logger = logging.getLogger()
@@ -56,7 +60,12 @@ class PreconditionError(RuntimeError):
     pass
 
 
-@dataclasses.dataclass(frozen=True)
+class PlayRevokedError(PreconditionError):
+    """The digest of a play is on the revocation list."""
+
+
+# Not frozen: exceptions re-raised by context managers get their traceback assigned
+@dataclasses.dataclass(eq=False)
 class GPGValidationError(RuntimeError):
     message: str
     serialized_play: bytes
@@ -118,14 +127,36 @@ def create_play_digest(play: bytes) -> bytes:
     return sha.digest()
 
 
-def verify_play(play: dict, gpg_key: bytes) -> bytes:
-    """Verify play's signature.
+@dataclasses.dataclass(frozen=True)
+class PreparedPlay:
+    """Play that passed all checks that do not need GPG."""
+
+    name: str
+    digest: bytes
+    signature: bytes
+    # Canonical form of the play; not kept for plays digested from their YAML nodes
+    serialized_play: Optional[bytes] = None
+
+
+def canonical_play(play: dict) -> bytes:
+    """Clean and serialize a play, into the form its digest is computed from.
 
     :param play: Parsed play.
-    :param gpg_key: Content of public GPG key.
-    :raises PreconditionError: Play doesn't contain a signature.
-    :raises GPGValidationError: Digest does not match its signature.
-    :returns: Play digest.
+    :raises PreconditionError: The play has no exclusions, or it cannot be cleaned.
+    """
+    if "insights_signature_exclude" not in play.get("vars", {}):
+        raise PreconditionError(
+            "The play does not have the key 'vars/insights_signature_exclude', "
+            "cannot exclude dynamic fields."
+        )
+    return serialize_play(clean_play(play)).encode("utf-8")
+
+
+def prepare_play(play: dict) -> PreparedPlay:
+    """Run all checks of a play that do not need GPG, and compute its digest.
+
+    :param play: Parsed play.
+    :raises PreconditionError: Play doesn't contain a signature, or it cannot be cleaned.
     """
     play_name: str = play.get("name", "???")
     logger.info(f"Preparing to verify play '{play_name}'.")
@@ -134,15 +165,8 @@ def verify_play(play: dict, gpg_key: bytes) -> bytes:
     if b64_signature == b"":
         raise PreconditionError(f"The play '{play_name}' does not contain a signature.")
 
-    if "insights_signature_exclude" not in play.get("vars", {}):
-        raise PreconditionError(
-            "The play does not have the key 'vars/insights_signature_exclude', "
-            "cannot exclude dynamic fields."
-        )
-
-    cleaned_play: dict = clean_play(play)
-    serialized_play: bytes = serialize_play(cleaned_play).encode("utf-8")
-    logger.debug(f"Serialized play as {serialized_play!r}")
+    serialized_play: bytes = canonical_play(play)
+    diagnostics.log_payload(logger, logging.DEBUG, "Serialized play", serialized_play)
     digest: bytes = create_play_digest(serialized_play)
     try:
         signature: bytes = base64.b64decode(b64_signature)
@@ -151,6 +175,73 @@ def verify_play(play: dict, gpg_key: bytes) -> bytes:
             f"The signature for play '{play_name}' is not a valid base64 string."
         ) from e
 
+    return PreparedPlay(
+        name=play_name,
+        digest=digest,
+        signature=signature,
+        serialized_play=serialized_play,
+    )
+
+
+def verify_prepared_play(play: PreparedPlay, gpg_key: Union[bytes, Keyring]) -> None:
+    """Verify signature of a prepared play.
+
+    :param play: Prepared play.
+    :param gpg_key: Content of public GPG key, or a keyring of trusted keys.
+    :raises GPGValidationError: Digest does not match its signature.
+    """
+    logger.info(f"Cryptographically verifying play '{play.name}'.")
+    try:
+        _verify_digest_signature(play.digest, play.signature, gpg_key)
+    except CalledProcessError as err:
+        raise signature_mismatch(play) from err
+
+
+def signature_mismatch(play: PreparedPlay) -> GPGValidationError:
+    """Log the content of a play that failed verification, and return the error to raise.
+
+    :param play: Prepared play whose signature does not match its digest.
+    """
+    if play.serialized_play is not None:
+        diagnostics.log_payload(
+            logger,
+            logging.ERROR,
+            "Play content failed to match its digest's signature",
+            play.serialized_play,
+        )
+    return GPGValidationError(
+        "Play digest does not match its signature.",
+        serialized_play=play.serialized_play or b"",
+        digest=play.digest,
+        signature=play.signature,
+    )
+
+
+def verify_play(play: dict, gpg_key: Union[bytes, Keyring]) -> bytes:
+    """Verify play's signature.
+
+    :param play: Parsed play.
+    :param gpg_key: Content of public GPG key, or a keyring of trusted keys.
+    :raises PreconditionError: Play doesn't contain a signature.
+    :raises GPGValidationError: Digest does not match its signature.
+    :returns: Play digest.
+    """
+    prepared: PreparedPlay = prepare_play(play)
+    verify_prepared_play(prepared, gpg_key)
+    return prepared.digest
+
+
+def _verify_digest_signature(
+    digest: bytes, signature: bytes, gpg_key: Union[bytes, Keyring]
+) -> None:
+    """Verify the detached signature of a play digest.
+
+    With a keyring, only the key that made the signature is used.
+
+    :raises CalledProcessError: Digest does not match its signature.
+    """
+    if isinstance(gpg_key, Keyring):
+        gpg_key = gpg_key.key_for(signature)
     with tempfile.TemporaryDirectory(prefix=TEMPORARY_DIRECTORY_PREFIX) as temp_dir:
         temp_path = pathlib.Path(temp_dir)
 
@@ -158,32 +249,373 @@ def verify_play(play: dict, gpg_key: bytes) -> bytes:
         digest_file.write_bytes(digest)
         signature_file = temp_path / "signature"
         signature_file.write_bytes(signature)
+
+        if crypto.use_gpgv():
+            crypto.verify_gpgv_signed_file(
+                digest_file, signature_file, keyring_file(gpg_key)
+            )
+            return
+
         key_file = temp_path / "key"
         key_file.write_bytes(gpg_key)
 
-        logger.info(f"Cryptographically verifying play '{play_name}'.")
+        crypto.verify_gpg_signed_file(digest_file, signature_file, key_file)
+
+
+class VerificationSession:
+    """Verify the signatures of any number of prepared plays with one public key.
+
+    With gpgv, the key is written into a keyring file once. Otherwise it is imported into a
+    temporary GPG home directory once, and all plays are verified against that directory. Use as a
+    context manager, the directory is deleted on exit::
+
+        with VerificationSession(key) as session:
+            for play in plays:
+                session.verify(play)
+
+    :param gpg_key: Content of the public GPG key.
+    """
+
+    def __init__(self, gpg_key: bytes):
+        self.gpg_key = gpg_key
+        self._stack = contextlib.ExitStack()
+        self._dir: Optional[pathlib.Path] = None
+        self._keyring: Optional[pathlib.Path] = None
+        self._homedir: Optional[pathlib.Path] = None
+
+    def open(self) -> None:
+        self._dir = pathlib.Path(
+            self._stack.enter_context(
+                tempfile.TemporaryDirectory(prefix=TEMPORARY_DIRECTORY_PREFIX)
+            )
+        )
+        if crypto.use_gpgv():
+            self._keyring = keyring_file(self.gpg_key)
+            return
+        key_file = self._dir / "key"
+        key_file.write_bytes(self.gpg_key)
+        self._homedir = self._stack.enter_context(crypto.temp_gpg_dir(key_file))
+
+    def close(self) -> None:
+        self._dir = self._keyring = self._homedir = None
+        self._stack.close()
+
+    def verify(self, play: PreparedPlay) -> None:
+        """Verify signature of a prepared play.
+
+        :raises GPGValidationError: Digest does not match its signature.
+        """
+        if self._dir is None:
+            raise RuntimeError("Verification session is not open.")
+        logger.info(f"Cryptographically verifying play '{play.name}'.")
+        digest_file = self._dir / "digest"
+        digest_file.write_bytes(play.digest)
+        signature_file = self._dir / "signature"
+        signature_file.write_bytes(play.signature)
         try:
-            crypto.verify_gpg_signed_file(digest_file, signature_file, key_file)
+            if self._keyring is not None:
+                crypto.verify_gpgv_signed_file(
+                    digest_file, signature_file, self._keyring
+                )
+            else:
+                assert self._homedir is not None
+                crypto.run(
+                    crypto.gpg_verify_command(
+                        self._homedir, signature_file, digest_file
+                    ),
+                    check=True,
+                    capture_output=True,
+                )
         except CalledProcessError as err:
-            logger.error(
-                f"Play content failed to match its digest's signature: {serialized_play!r}."
+            raise signature_mismatch(play) from err
+
+    # typing.Self available in Python 3.11+
+    def __enter__(self) -> "VerificationSession":
+        try:
+            self.open()
+        except BaseException:
+            self.close()
+            raise
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+@dataclasses.dataclass(frozen=True)
+class PlannedPlay:
+    """Play of a playbook that passed the checks not needing GPG, see :func:`plan_plays`.
+
+    ``cache_key`` is the key of the play in the digest cache, and ``cached`` tells whether the
+    play was taken from it.
+    """
+
+    node: yaml.Node
+    play: PreparedPlay
+    cache_key: Optional[bytes] = None
+    cached: bool = False
+
+
+def verify_playbook(
+    playbook: str,
+    gpg_key: Union[bytes, Keyring],
+    cache: Optional[DigestCache] = None,
+    revocation_list: Union[str, "RevocationList", None] = None,
+) -> list[tuple[str, bytes]]:
+    """Verify signatures of all plays in a playbook.
+
+    Verification runs in two phases. First, all plays are checked without GPG: their structure,
+    exclusions and signature encoding, and their digests are looked up in the revocation list.
+    Only when every play passes, signatures are verified with GPG. An invalid playbook is rejected
+    before any GPG process is started for its plays. The signature of the revocation list is
+    verified in the background meanwhile, see :class:`RevocationList`.
+
+    Plays are digested straight from their YAML nodes, without constructing them, see
+    :mod:`rhc_playbook_lib.nodes`. Plays the node walk does not cover are constructed and checked
+    by :func:`prepare_play`.
+
+    When a cache is passed, plays whose raw text has been verified before are not digested again,
+    and only have their cached digest checked against the cached signature.
+
+    :param playbook: Raw playbook.
+    :param gpg_key: Content of public GPG key, or a keyring of trusted keys.
+    :param cache: Optional cache of play digests.
+    :param revocation_list: Optional revocation list, or raw playbook containing digests of revoked
+        plays.
+    :raises PreconditionError: Playbook contains no plays, a play cannot be verified, or a play has
+        been revoked.
+    :raises GPGValidationError: Digest does not match its signature.
+    :returns: Names and digests of the plays.
+    """
+    revocation: Optional[RevocationList] = None
+    revoked: set[bytes] = set()
+    if isinstance(revocation_list, str):
+        revocation_list = RevocationList(revocation_list, gpg_key)
+    if revocation_list is not None:
+        revocation, revoked = revocation_list, revocation_list.digests
+
+    try:
+        loader, plan = plan_plays(playbook, cache, revoked)
+    except PlayRevokedError:
+        # A tampered revocation list is reported as such, not as a revoked play
+        if revocation is not None:
+            revocation.wait()
+        raise
+    if revocation is not None:
+        revocation.wait()
+    result: list[tuple[str, bytes]] = []
+    for planned in plan:
+        play: PreparedPlay = _verify_planned_play(
+            loader, planned, gpg_key, cache, revoked
+        )
+        _cache_play(cache, planned, play)
+        result.append((play.name, play.digest))
+    return result
+
+
+@dataclasses.dataclass(frozen=True)
+class PlayResult:
+    """Outcome of verifying a single play, see :func:`verify_plays`."""
+
+    # Name and digest are None when the play could not be read far enough
+    name: Optional[str]
+    digest: Optional[bytes]
+    # None when the play is valid
+    error: Optional[Exception]
+    seconds: float
+
+
+def verify_plays(
+    playbook: str,
+    gpg_key: Union[bytes, Keyring],
+    revoked: Optional[set[bytes]] = None,
+    cache: Optional[DigestCache] = None,
+) -> list[PlayResult]:
+    """Verify each play of a playbook on its own, without stopping at the first invalid one.
+
+    Unlike :func:`verify_playbook`, failures of plays are returned instead of raised, so that all
+    plays of a stored playbook can be audited. The digests of revoked plays have to be verified
+    beforehand, e.g. with :meth:`RevocationList.wait`.
+
+    :param playbook: Raw playbook.
+    :param gpg_key: Content of public GPG key, or a keyring of trusted keys.
+    :param revoked: Digests of revoked plays.
+    :param cache: Optional cache of play digests.
+    :raises PreconditionError: Playbook contains no plays.
+    :returns: Result of each play, in the order of the playbook.
+    """
+    revoked = revoked or set()
+    loader, plays = _compose_plays(playbook)
+    results: list[PlayResult] = []
+    for node in plays:
+        start: float = time.perf_counter()
+        play: Optional[PreparedPlay] = None
+        error: Optional[Exception] = None
+        try:
+            planned: PlannedPlay = _plan_play(loader, node, playbook, cache)
+            play = planned.play
+            check_revocation(play, revoked)
+            play = _verify_planned_play(loader, planned, gpg_key, cache, revoked)
+            _cache_play(cache, planned, play)
+        except Exception as exc:
+            logger.debug(f"Play failed verification: {exc!r}")
+            error = exc
+        results.append(
+            PlayResult(
+                name=play.name if play is not None else None,
+                digest=play.digest if play is not None else None,
+                error=error,
+                seconds=time.perf_counter() - start,
             )
-            raise GPGValidationError(
-                "Play digest does not match its signature.",
-                serialized_play=serialized_play,
-                digest=digest,
-                signature=signature,
-            ) from err
+        )
+    return results
 
-        return digest
 
+def _compose_plays(playbook: str) -> tuple[Loader, list[yaml.Node]]:
+    """Compose a playbook into the YAML nodes of its plays.
 
-def get_revocation_digests(playbook: str, gpg_key: bytes) -> set[bytes]:
-    """Loads and verifies playbook containing revoked digests
+    :raises PreconditionError: Playbook contains no plays.
+    """
+    logger.info("Composing playbook.")
+    loader = Loader(playbook)
+    try:
+        root: Optional[yaml.Node] = loader.get_single_node()
+    finally:
+        loader.dispose()
+    if not isinstance(root, yaml.SequenceNode) or not root.value:
+        raise PreconditionError("Playbook contains no plays.")
+    return loader, root.value
+
+
+def construct_play(loader: Loader, node: yaml.Node) -> PreparedPlay:
+    """Construct the play from its node, and prepare it the reference way.
+
+    :param loader: Loader that composed the node.
+    :param node: Node of the play.
+    :raises PreconditionError: Play doesn't contain a signature.
+    """
+    return prepare_play(loader.construct_document(node))
+
+
+def plan_plays(
+    playbook: str, cache: Optional[DigestCache], revoked: set[bytes]
+) -> tuple[Loader, list[PlannedPlay]]:
+    """Run the checks of all plays of a playbook that do not need GPG.
+
+    :param playbook: Raw playbook.
+    :param cache: Cache of digests, if any.
+    :param revoked: Digests of revoked plays.
+    :raises PreconditionError: Playbook contains no plays, a play cannot be verified, or a play has
+        been revoked.
+    :returns: The loader that composed the plays, which constructs them if needed, and the plays
+        whose signatures are left to verify.
+    """
+    loader, plays = _compose_plays(playbook)
+    logger.info(f"Checking {len(plays)} play(s) before verifying signatures.")
+    plan: list[PlannedPlay] = [
+        _plan_play(loader, node, playbook, cache) for node in plays
+    ]
+    for planned in plan:
+        check_revocation(planned.play, revoked)
+    return loader, plan
+
+
+def _plan_play(
+    loader: Loader, node: yaml.Node, playbook: str, cache: Optional[DigestCache]
+) -> PlannedPlay:
+    """Run the checks of a play that do not need GPG."""
+    key: Optional[bytes] = None
+    if cache is not None:
+        key = play_cache_key(playbook, node)
+        cached: Optional[CachedPlay] = cache.get(key) if key is not None else None
+        if cached is not None:
+            logger.debug(f"Play '{cached.name}' found in the cache.")
+            play = PreparedPlay(
+                name=cached.name, digest=cached.digest, signature=cached.signature
+            )
+            return PlannedPlay(node=node, play=play, cache_key=key, cached=True)
+
+    try:
+        digested = nodes.digest_play(
+            loader, node, keep=logger.isEnabledFor(logging.DEBUG)
+        )
+    except nodes.Unsupported as exc:
+        logger.debug(f"Constructing play, it cannot be digested from its nodes: {exc}")
+        constructed = construct_play(loader, node)
+        return PlannedPlay(node=node, play=constructed, cache_key=key)
+
+    if digested.serialized is not None:
+        diagnostics.log_payload(
+            logger, logging.DEBUG, "Serialized play", digested.serialized
+        )
+    play = PreparedPlay(
+        name=digested.name, digest=digested.digest, signature=digested.signature
+    )
+    return PlannedPlay(node=node, play=play, cache_key=key)
+
+
+def _verify_planned_play(
+    loader: Loader,
+    planned: PlannedPlay,
+    gpg_key: Union[bytes, Keyring],
+    cache: Optional[DigestCache],
+    revoked: set[bytes],
+) -> PreparedPlay:
+    """Verify signature of a play that passed its checks.
+
+    :returns: The verified play; a different one if the play had to be prepared again.
+    """
+    try:
+        verify_prepared_play(planned.play, gpg_key)
+        return planned.play
+    except GPGValidationError:
+        if planned.play.serialized_play is not None:
+            raise
+
+    if cache is not None and planned.cached and planned.cache_key is not None:
+        logger.debug("Cached play failed verification, discarding it.")
+        cache.discard(planned.cache_key)
+    else:
+        logger.debug("Play failed verification, verifying it as a constructed play.")
+    # The reference implementation decides, and its error carries the serialized play
+    play: PreparedPlay = construct_play(loader, planned.node)
+    check_revocation(play, revoked)
+    verify_prepared_play(play, gpg_key)
+    return play
+
+
+def _cache_play(
+    cache: Optional[DigestCache], planned: PlannedPlay, play: PreparedPlay
+) -> None:
+    """Store a verified play in the cache, unless it is there already."""
+    if cache is None or planned.cache_key is None:
+        return
+    if not planned.cached or play is not planned.play:
+        cache.put(
+            planned.cache_key,
+            CachedPlay(name=play.name, digest=play.digest, signature=play.signature),
+        )
+
+
+def check_revocation(play: PreparedPlay, revoked: set[bytes]) -> None:
+    """Check that a play has not been revoked.
+
+    :param play: Prepared play.
+    :param revoked: Digests of revoked plays.
+    :raises PlayRevokedError: The play has been revoked.
+    """
+    if play.digest in revoked:
+        raise PlayRevokedError(
+            f"Digest of play '{play.name}' is on revocation list: '{play.digest.hex()}'."
+        )
+
+
+def prepare_revocation_list(playbook: str) -> tuple[PreparedPlay, set[bytes]]:
+    """Check the playbook containing revoked digests, without verifying its signature.
 
     :param playbook: Content of the playbook containing digests of revoked plays.
-    :param gpg_key: Content of GPG public key.
-    :returns: Set of digests of plays that have been revoked.
+    :raises PreconditionError: The playbook is not a valid revocation list.
+    :returns: The prepared play of the revocation list, and the revoked digests.
     """
     logger.info("Loading revocation digests.")
 
@@ -195,8 +627,156 @@ def get_revocation_digests(playbook: str, gpg_key: bytes) -> set[bytes]:
         )
     play: dict = parsed_plays[0]
 
-    _ = verify_play(play, gpg_key=gpg_key)
+    prepared: PreparedPlay = prepare_play(play)
 
     revoked: list[dict] = play.get("revoked_playbooks", [])
     digests = set(bytes(bytearray.fromhex(item["hash"])) for item in revoked)
+    return prepared, digests
+
+
+class RevocationList:
+    """Playbook containing digests of revoked plays, with its signature verified in the background.
+
+    Checking the list and reading its digests is cheap and done right away. The GPG verification
+    runs in a thread, so it overlaps with reading and parsing the playbook to verify. The digests
+    can only be trusted once :meth:`wait` returns::
+
+        revocation_list = RevocationList(raw_revocation_list, gpg_key)
+        playbook = sys.stdin.read()
+        verify_playbook(playbook, gpg_key, revocation_list=revocation_list)
+
+    Once the verification has finished, :attr:`seconds` holds the time spent checking the list,
+    in the calling thread and in the background; it is ``None`` before.
+
+    :param playbook: Content of the playbook containing digests of revoked plays.
+    :param gpg_key: Content of GPG public key, or a keyring of trusted keys.
+    :raises PreconditionError: The playbook is not a valid revocation list.
+    """
+
+    def __init__(self, playbook: str, gpg_key: Union[bytes, Keyring]):
+        start: float = time.perf_counter()
+        self.play, self.digests = prepare_revocation_list(playbook)
+        self.seconds: Optional[float] = None
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="revocation-list"
+        )
+        self._future = executor.submit(
+            self._verify, gpg_key, time.perf_counter() - start
+        )
+        executor.shutdown(wait=False)
+
+    def _verify(self, gpg_key: Union[bytes, Keyring], prepared: float) -> None:
+        start: float = time.perf_counter()
+        try:
+            verify_prepared_play(self.play, gpg_key)
+        finally:
+            self.seconds = prepared + time.perf_counter() - start
+
+    def wait(self) -> set[bytes]:
+        """Wait until the signature of the list is verified.
+
+        :raises GPGValidationError: Digest does not match its signature.
+        :returns: Set of digests of plays that have been revoked.
+        """
+        self._future.result()
+        return self.digests
+
+
+def get_revocation_digests(playbook: str, gpg_key: Union[bytes, Keyring]) -> set[bytes]:
+    """Loads and verifies playbook containing revoked digests
+
+    :param playbook: Content of the playbook containing digests of revoked plays.
+    :param gpg_key: Content of GPG public key, or a keyring of trusted keys.
+    :returns: Set of digests of plays that have been revoked.
+    """
+    prepared, digests = prepare_revocation_list(playbook)
+    verify_prepared_play(prepared, gpg_key)
     return digests
+
+
+@dataclasses.dataclass(frozen=True)
+class PlaybookReport:
+    """Outcome of verifying a playbook with :class:`Verifier`."""
+
+    plays: list[PlayResult]
+
+    @property
+    def valid(self) -> bool:
+        """Whether all plays are valid."""
+        return all(play.error is None for play in self.plays)
+
+
+class Verifier:
+    """Verifier of playbooks, set up once and shared by all threads of a service.
+
+    The key is read and the revocation list is verified when the verifier is created; verifying a
+    playbook then only pays for the playbook itself::
+
+        verifier = Verifier(gpg_key, revocation_list=raw_revocation_list)
+        report = verifier.verify_playbook(raw_playbook)
+        if not report.valid:
+            ...
+
+    With a cache directory, each thread opens its own connection to the digest cache in it.
+
+    :param gpg_key: Content of public GPG key, or a keyring of trusted keys.
+    :param revocation_list: Optional raw playbook containing digests of revoked plays.
+    :param cache_directory: Optional directory of the digest cache, see :class:`DigestCache`.
+    :raises ValueError: The key cannot be read.
+    :raises PreconditionError: The revocation list is not valid.
+    :raises GPGValidationError: The revocation list failed verification.
+    """
+
+    def __init__(
+        self,
+        gpg_key: Union[bytes, Keyring],
+        revocation_list: Optional[str] = None,
+        cache_directory: Optional[pathlib.Path] = None,
+    ):
+        self.keyring: Keyring = (
+            gpg_key if isinstance(gpg_key, Keyring) else Keyring([gpg_key])
+        )
+        # Only read afterwards, so it can be shared by all threads
+        self.revoked: set[bytes] = (
+            get_revocation_digests(revocation_list, self.keyring)
+            if revocation_list is not None
+            else set()
+        )
+        self.cache_directory = cache_directory
+        self._local = threading.local()
+
+    def _cache(self) -> Optional[DigestCache]:
+        if self.cache_directory is None:
+            return None
+        cache: Optional[DigestCache] = getattr(self._local, "cache", None)
+        if cache is None:
+            cache = self._local.cache = DigestCache(self.cache_directory)
+        return cache
+
+    def verify_playbook(self, playbook: Union[bytes, str]) -> PlaybookReport:
+        """Verify all plays of a playbook.
+
+        Failures of plays are reported, not raised, see :func:`verify_plays`.
+
+        :param playbook: Raw playbook, as UTF-8 encoded bytes or as text.
+        :raises PreconditionError: The playbook is not valid UTF-8, or contains no plays.
+        """
+        if isinstance(playbook, bytes):
+            try:
+                playbook = playbook.decode("utf-8")
+            except UnicodeDecodeError as exc:
+                raise PreconditionError("Playbook is not valid UTF-8.") from exc
+        plays: list[PlayResult] = verify_plays(
+            playbook, self.keyring, self.revoked, cache=self._cache()
+        )
+        return PlaybookReport(plays=plays)
+
+    def close(self) -> None:
+        """Close the digest cache connection of the calling thread.
+
+        Connections of other threads are closed when their thread ends.
+        """
+        cache: Optional[DigestCache] = getattr(self._local, "cache", None)
+        if cache is not None:
+            cache.close()
+            del self._local.cache
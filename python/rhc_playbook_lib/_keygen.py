@@ -1,7 +1,6 @@
 import argparse
 import logging
 import re
-import subprocess
 import sys
 import textwrap
 import traceback
@@ -11,6 +10,7 @@ from tempfile import TemporaryDirectory
 from typing import Generator
 
 import rhc_playbook_lib as lib
+from rhc_playbook_lib import crypto
 from rhc_playbook_lib.constants import TEMPORARY_DIRECTORY_PREFIX
 
 logger = logging.getLogger(__name__)
@@ -41,7 +41,7 @@ def _generate_keys() -> Generator[Path, None, None]:
             ).strip()
         )
         logger.debug(f"Keys generation instructions written to {instructions_file}.")
-        subprocess.run(
+        crypto.run(
             [
                 "/usr/bin/gpg",
                 "--batch",
@@ -67,7 +67,7 @@ def _export_key_pair(gpg_tmp_dir: Path, keys_path: Path) -> None:
         ("--export-secret-keys", keys_path / "key.private.gpg"),
     )
     for flag, path in flags_paths:
-        subprocess.run(
+        crypto.run(
             [
                 "/usr/bin/gpg",
                 "--homedir",
@@ -89,7 +89,7 @@ def _get_fingerprint(gpg_tmp_dir: Path) -> str:
 
     :param gpg_tmp_dir: The GPG home directory where the key pair was generated.
     """
-    result = subprocess.run(
+    result = crypto.run(
         [
             "/usr/bin/gpg",
             "--homedir",
@@ -0,0 +1,322 @@
+"""Verification of playbooks from asyncio code, without blocking the event loop.
+
+GPG runs in subprocesses started with :func:`asyncio.create_subprocess_exec`, and the files it
+reads are written and removed in threads. Composing, digesting and constructing playbooks is
+CPU-bound and runs in an executor. Many playbooks can be
+verified concurrently; the number of signatures verified at once is bounded::
+
+    verifier = await AsyncVerifier.create(gpg_key, revocation_list=raw_revocation_list)
+    plays = await asyncio.gather(*(verifier.verify_playbook(p) for p in playbooks))
+
+Verification follows :func:`rhc_playbook_lib.verify_playbook` and raises the same errors. The
+timeouts configured with :func:`rhc_playbook_lib.crypto.configure_timeouts` and the verification
+backend apply too. Digests are not cached, the cache cannot be shared between threads.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import pathlib
+import tempfile
+from subprocess import PIPE, CalledProcessError, CompletedProcess
+from typing import Any, Callable, Optional, Sequence, TypeVar, Union
+
+from rhc_playbook_lib import (
+    GPGValidationError,
+    PlannedPlay,
+    PreparedPlay,
+    check_revocation,
+    construct_play,
+    crypto,
+    plan_plays,
+    prepare_revocation_list,
+    signature_mismatch,
+)
+from rhc_playbook_lib.constants import TEMPORARY_DIRECTORY_PREFIX
+from rhc_playbook_lib.keyring import Keyring, keyring_file
+from rhc_playbook_lib.serialization import Loader
+
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+# Signatures verified at once by a verifier, i.e. GPG processes running at once
+DEFAULT_CONCURRENCY = 16
+
+
+async def run(
+    args: Sequence[Union[str, pathlib.Path]],
+    *,
+    check: bool = False,
+    cleanup: bool = False,
+    env: Optional[dict[str, str]] = None,
+) -> CompletedProcess:
+    """Run a subprocess like :func:`rhc_playbook_lib.crypto.run`, without blocking the event loop.
+
+    The output is captured. A subprocess that runs out of time, or whose task is cancelled, is
+    killed and reaped before the exception is raised.
+
+    :param args: The command.
+    :param cleanup: The command cleans up after others, it gets ``CLEANUP_TIMEOUT`` seconds even
+        if the deadline has passed.
+    :raises DeadlineExceeded: The subprocess timed out, or the deadline has already passed.
+    :raises CalledProcessError: The subprocess failed, and ``check`` is set.
+    """
+    timeout: Optional[float] = crypto.subprocess_timeout(args[0], cleanup=cleanup)
+    process = await asyncio.create_subprocess_exec(
+        *args, stdin=asyncio.subprocess.DEVNULL, stdout=PIPE, stderr=PIPE, env=env
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except BaseException as exc:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        if isinstance(exc, asyncio.TimeoutError):
+            logger.debug(f"Command '{args[0]}' timed out after {timeout:.1f} seconds.")
+            raise crypto.DeadlineExceeded(
+                f"Command '{args[0]}' did not finish in {timeout:.1f} seconds."
+            ) from exc
+        raise
+
+    returncode: int = await process.wait()
+    result = CompletedProcess(list(args), returncode, stdout, stderr)
+    if check:
+        result.check_returncode()
+    return result
+
+
+def _prepare_files(
+    digest: bytes, signature: bytes, gpg_key: Union[bytes, Keyring]
+) -> tuple[tempfile.TemporaryDirectory, Optional[pathlib.Path]]:
+    """Write the files GPG verifies a play digest with; blocking, run it in a thread.
+
+    :returns: Temporary directory with ``digest`` and ``signature``, and the keyring file with
+        gpgv. With gpg, the directory also holds the ``key`` and an empty ``home`` directory.
+    """
+    if isinstance(gpg_key, Keyring):
+        gpg_key = gpg_key.key_for(signature)
+    temp_dir = tempfile.TemporaryDirectory(prefix=TEMPORARY_DIRECTORY_PREFIX)
+    try:
+        temp_path = pathlib.Path(temp_dir.name)
+        (temp_path / "digest").write_bytes(digest)
+        (temp_path / "signature").write_bytes(signature)
+        if crypto.use_gpgv():
+            return temp_dir, keyring_file(gpg_key)
+        (temp_path / "key").write_bytes(gpg_key)
+        (temp_path / "home").mkdir(mode=0o700)
+    except BaseException:
+        temp_dir.cleanup()
+        raise
+    return temp_dir, None
+
+
+async def _verify_gpg(directory: pathlib.Path) -> None:
+    """Verify ``signature`` of ``digest`` in the directory, with ``key`` imported into GPG.
+
+    :raises CalledProcessError: Digest does not match its signature.
+    """
+    home = directory / "home"
+    await run(crypto.gpg_import_command(home, directory / "key"), check=True)
+    try:
+        await run(
+            crypto.gpg_verify_command(
+                home, directory / "signature", directory / "digest"
+            ),
+            check=True,
+        )
+    finally:
+        # See 'crypto.temp_gpg_dir'
+        try:
+            await run(
+                crypto.GPG_AGENT_KILL_COMMAND,
+                cleanup=True,
+                env={"GNUPGHOME": str(home)},
+                check=True,
+            )
+        except crypto.DeadlineExceeded:
+            logger.warning(f"Could not stop GPG agent of '{home}' in time.")
+
+
+async def _verify_digest_signature(
+    digest: bytes, signature: bytes, gpg_key: Union[bytes, Keyring]
+) -> None:
+    """Verify the detached signature of a play digest.
+
+    Files are written and removed in a thread, so that the event loop is not blocked.
+
+    :raises CalledProcessError: Digest does not match its signature.
+    """
+    temp_dir, keyring = await asyncio.to_thread(
+        _prepare_files, digest, signature, gpg_key
+    )
+    try:
+        temp_path = pathlib.Path(temp_dir.name)
+        if keyring is None:
+            await _verify_gpg(temp_path)
+            return
+
+        logger.debug("Starting gpgv verification process.")
+        await run(
+            crypto.gpgv_verify_command(
+                keyring, temp_path / "signature", temp_path / "digest"
+            ),
+            check=True,
+        )
+    finally:
+        await asyncio.to_thread(temp_dir.cleanup)
+
+
+async def verify_prepared_play(
+    play: PreparedPlay, gpg_key: Union[bytes, Keyring]
+) -> None:
+    """Verify signature of a prepared play, see :func:`rhc_playbook_lib.verify_prepared_play`.
+
+    :param play: Prepared play.
+    :param gpg_key: Content of public GPG key, or a keyring of trusted keys.
+    :raises GPGValidationError: Digest does not match its signature.
+    """
+    logger.info(f"Cryptographically verifying play '{play.name}'.")
+    try:
+        await _verify_digest_signature(play.digest, play.signature, gpg_key)
+    except CalledProcessError as err:
+        raise signature_mismatch(play) from err
+
+
+class AsyncVerifier:
+    """Verifier of playbooks for asyncio code, shared by all tasks of an event loop.
+
+    Create it with :meth:`create`, which reads the key and verifies the revocation list once.
+
+    :param keyring: Trusted keys.
+    :param revoked: Verified digests of revoked plays.
+    :param concurrency: Number of signatures verified at once.
+    :param executor: Executor running CPU-bound work; the default executor of the loop by default.
+        Plays are kept as YAML nodes in between, so it has to be a thread pool.
+    """
+
+    def __init__(
+        self,
+        keyring: Keyring,
+        revoked: Optional[set[bytes]] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        executor: Optional[concurrent.futures.ThreadPoolExecutor] = None,
+    ):
+        self.keyring = keyring
+        self.revoked: set[bytes] = revoked or set()
+        self.concurrency = concurrency
+        self.executor = executor
+        # Created in the running loop, a semaphore may only be used by one loop on Python 3.9
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    async def create(
+        cls,
+        gpg_key: Union[bytes, Keyring],
+        revocation_list: Optional[str] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        executor: Optional[concurrent.futures.ThreadPoolExecutor] = None,
+    ) -> "AsyncVerifier":
+        """Read the key and verify the revocation list, and create the verifier.
+
+        :param gpg_key: Content of public GPG key, or a keyring of trusted keys.
+        :param revocation_list: Optional raw playbook containing digests of revoked plays.
+        :raises ValueError: The key cannot be read.
+        :raises PreconditionError: The revocation list is not valid.
+        :raises GPGValidationError: The revocation list failed verification.
+        """
+        loop = asyncio.get_running_loop()
+        keyring: Keyring = (
+            gpg_key
+            if isinstance(gpg_key, Keyring)
+            else await loop.run_in_executor(executor, Keyring, [gpg_key])
+        )
+        verifier = cls(keyring, concurrency=concurrency, executor=executor)
+        if revocation_list is not None:
+            prepared, revoked = await verifier._in_executor(
+                prepare_revocation_list, revocation_list
+            )
+            await verifier._verify_signature(prepared)
+            verifier.revoked = revoked
+        return verifier
+
+    async def _in_executor(self, func: Callable[..., _T], *args: Any) -> _T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def _verify_signature(self, play: PreparedPlay) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            await verify_prepared_play(play, self.keyring)
+
+    async def verify_playbook(self, playbook: str) -> list[tuple[str, bytes]]:
+        """Verify signatures of all plays in a playbook.
+
+        All plays are checked before any signature is verified, see
+        :func:`rhc_playbook_lib.verify_playbook`. Signatures of the plays are then verified
+        concurrently; when several plays are invalid, the error of the first one is raised.
+
+        :param playbook: Raw playbook.
+        :raises PreconditionError: Playbook contains no plays, a play cannot be verified, or a play
+            has been revoked.
+        :raises GPGValidationError: Digest does not match its signature.
+        :returns: Names and digests of the plays.
+        """
+        loader, plan = await self._in_executor(plan_plays, playbook, None, self.revoked)
+        # The loader constructs one play at a time
+        lock = asyncio.Lock()
+        results: list[Union[PreparedPlay, BaseException]] = await asyncio.gather(
+            *(self._verify_planned_play(loader, planned, lock) for planned in plan),
+            return_exceptions=True,
+        )
+        plays: list[PreparedPlay] = []
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+            plays.append(result)
+        return [(play.name, play.digest) for play in plays]
+
+    async def _verify_planned_play(
+        self, loader: Loader, planned: PlannedPlay, lock: asyncio.Lock
+    ) -> PreparedPlay:
+        """Verify signature of a play that passed its checks.
+
+        :returns: The verified play; a different one if the play had to be prepared again.
+        """
+        try:
+            await self._verify_signature(planned.play)
+            return planned.play
+        except GPGValidationError:
+            if planned.play.serialized_play is not None:
+                raise
+
+        logger.debug("Play failed verification, verifying it as a constructed play.")
+        async with lock:
+            play: PreparedPlay = await self._in_executor(
+                construct_play, loader, planned.node
+            )
+        check_revocation(play, self.revoked)
+        await self._verify_signature(play)
+        return play
+
+
+async def verify_playbook(
+    playbook: str,
+    gpg_key: Union[bytes, Keyring],
+    revocation_list: Optional[str] = None,
+) -> list[tuple[str, bytes]]:
+    """Verify signatures of all plays in a playbook, see :class:`AsyncVerifier`.
+
+    To verify more than one playbook, create the verifier once.
+
+    :param playbook: Raw playbook.
+    :param gpg_key: Content of public GPG key, or a keyring of trusted keys.
+    :param revocation_list: Optional raw playbook containing digests of revoked plays.
+    :raises PreconditionError: Playbook contains no plays, a play cannot be verified, or a play has
+        been revoked.
+    :raises GPGValidationError: Digest does not match its signature.
+    :returns: Names and digests of the plays.
+    """
+    verifier = await AsyncVerifier.create(gpg_key, revocation_list)
+    return await verifier.verify_playbook(playbook)
@@ -0,0 +1,204 @@
+import dataclasses
+import hashlib
+import logging
+import os
+import sqlite3
+import stat
+from pathlib import Path
+from typing import Optional
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# Bump when the canonical form or the layout of the cache entries changes.
+CACHE_FORMAT_VERSION = 2
+CACHE_FILENAME = "digests.sqlite3"
+
+
+@dataclasses.dataclass(frozen=True)
+class CachedPlay:
+    name: str
+    digest: bytes
+    signature: bytes
+
+
+def play_cache_key(playbook: str, node: yaml.Node) -> Optional[bytes]:
+    """Compute the cache key of a play from its raw YAML text span.
+
+    The key covers the column the play starts on, because the meaning of an indented block depends
+    on it, and the directives of the document, because ``%TAG`` changes how tags resolve. Returns ``None`` when the play is not self-contained, i.e. it contains an alias to an
+    anchor defined outside of its own span; such plays cannot be identified by their text alone.
+    """
+    start: int = node.start_mark.index
+    end: int = node.end_mark.index
+
+    stack: list[yaml.Node] = [node]
+    seen: set[int] = set()
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        if current.start_mark.index < start or current.end_mark.index > end:
+            return None
+        if isinstance(current, yaml.MappingNode):
+            for key, value in current.value:
+                stack.append(key)
+                stack.append(value)
+        elif isinstance(current, yaml.SequenceNode):
+            stack.extend(current.value)
+
+    directives: str = _directives(playbook)
+    sha = hashlib.sha256()
+    sha.update(
+        f"v{CACHE_FORMAT_VERSION}:{node.start_mark.column}:{len(directives)}:".encode(
+            "utf-8"
+        )
+    )
+    sha.update(directives.encode("utf-8"))
+    sha.update(playbook[start:end].encode("utf-8"))
+    return sha.digest()
+
+
+def _directives(playbook: str) -> str:
+    """Return the directive lines of the document, read up to its first content line."""
+    directives: list[str] = []
+    start: int = 1 if playbook.startswith("\ufeff") else 0
+    while start < len(playbook):
+        end: int = playbook.find("\n", start)
+        if end == -1:
+            end = len(playbook)
+        line: str = playbook[start:end]
+        if line.startswith("%"):
+            directives.append(line)
+        elif line.strip() and not line.lstrip().startswith("#"):
+            break
+        start = end + 1
+    return "\n".join(directives)
+
+
+def _check_private(path: Path) -> None:
+    """Ensure only the current user can modify the file or directory.
+
+    :raises PermissionError: The path is a symbolic link, is owned by another user, or is writable
+        by group or others.
+    """
+    status: os.stat_result = path.lstat()
+    if stat.S_ISLNK(status.st_mode):
+        raise PermissionError(f"Cache path '{path}' must not be a symbolic link.")
+    if status.st_uid != os.geteuid():
+        raise PermissionError(f"Cache path '{path}' must be owned by the current user.")
+    if stat.S_IMODE(status.st_mode) & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(
+            f"Cache path '{path}' must not be writable by group or others."
+        )
+
+
+class DigestCache:
+    """Bounded on-disk cache of play digests and signatures, evicted by LRU.
+
+    Entries map the key from :func:`play_cache_key` to the play digest and its decoded signature,
+    so a play that has been verified before does not have to be constructed, cleaned and
+    serialized again. The signature is still checked with GPG on every run.
+
+    The cache is trusted to map the play text to its digest, so the directory and the database have
+    to be owned by the current user, and writable only by them; symbolic links are refused. Errors
+    when reading or writing the cache are logged and otherwise ignored; the cache never makes
+    verification fail.
+    """
+
+    def __init__(self, directory: Path, max_entries: int = 1024):
+        if max_entries < 1:
+            raise ValueError("Cache must be able to hold at least one entry.")
+        self.max_entries = max_entries
+        self.path = directory / CACHE_FILENAME
+
+        directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        _check_private(directory)
+        if os.path.lexists(self.path):
+            _check_private(self.path)
+
+        self._connection: Optional[sqlite3.Connection] = None
+        try:
+            self._connection = sqlite3.connect(str(self.path), timeout=5.0)
+            os.chmod(self.path, 0o600)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS plays ("
+                "key BLOB PRIMARY KEY, "
+                "name TEXT NOT NULL, "
+                "digest BLOB NOT NULL, "
+                "signature BLOB NOT NULL, "
+                "used INTEGER NOT NULL)"
+            )
+            self._connection.commit()
+        except sqlite3.Error as exc:
+            logger.warning(f"Digest cache '{self.path}' is not usable: {exc}")
+            self.close()
+
+    def get(self, key: bytes) -> Optional[CachedPlay]:
+        """Look up a play, marking it as recently used."""
+        if self._connection is None:
+            return None
+        try:
+            with self._connection:
+                row = self._connection.execute(
+                    "SELECT name, digest, signature FROM plays WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                self._connection.execute(
+                    "UPDATE plays SET used = (SELECT MAX(used) + 1 FROM plays) WHERE key = ?",
+                    (key,),
+                )
+        except sqlite3.Error as exc:
+            logger.warning(f"Could not read from digest cache: {exc}")
+            return None
+        return CachedPlay(name=row[0], digest=bytes(row[1]), signature=bytes(row[2]))
+
+    def put(self, key: bytes, play: CachedPlay) -> None:
+        """Store a play, evicting the least recently used entries over the limit."""
+        if self._connection is None:
+            return
+        try:
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO plays VALUES "
+                    "(?, ?, ?, ?, (SELECT COALESCE(MAX(used), 0) + 1 FROM plays))",
+                    (key, play.name, play.digest, play.signature),
+                )
+                self._connection.execute(
+                    "DELETE FROM plays WHERE key NOT IN "
+                    "(SELECT key FROM plays ORDER BY used DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error as exc:
+            logger.warning(f"Could not write to digest cache: {exc}")
+
+    def discard(self, key: bytes) -> None:
+        """Remove a play from the cache."""
+        if self._connection is None:
+            return
+        try:
+            with self._connection:
+                self._connection.execute("DELETE FROM plays WHERE key = ?", (key,))
+        except sqlite3.Error as exc:
+            logger.warning(f"Could not write to digest cache: {exc}")
+
+    def __len__(self) -> int:
+        if self._connection is None:
+            return 0
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM plays").fetchone()
+        return int(count)
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    # typing.Self available in Python 3.11+
+    def __enter__(self) -> "DigestCache":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
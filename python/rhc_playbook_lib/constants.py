@@ -1 +1,5 @@
 TEMPORARY_DIRECTORY_PREFIX = "rhc-playbook-verifier-files-"
+# Top-level play fields whose content may be excluded from the play digest.
+VARIABLE_FIELDS: list[str] = ["hosts", "vars"]
+# Exit code of a run that was aborted because it ran out of time, the same as of timeout(1).
+EXIT_TIMEOUT = 124
@@ -1,15 +1,163 @@
 import logging
+import os
 import subprocess
-from contextlib import contextmanager
+import time
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
 from subprocess import CompletedProcess
 from tempfile import TemporaryDirectory
-from typing import Generator
+from typing import Any, Generator, Optional, Sequence, Union
 
 from rhc_playbook_lib.constants import TEMPORARY_DIRECTORY_PREFIX
 
 logger = logging.getLogger(__name__)
 
+# Seconds given to commands that clean up after GPG, even when the deadline has passed.
+CLEANUP_TIMEOUT: float = 10.0
+
+# Signature verification backends, see 'configure_backend'
+BACKENDS: tuple[str, ...] = ("auto", "gpg", "gpgv")
+GPGV: Path = Path("/usr/bin/gpgv")
+
+# Stops the GPG agent of the home directory in 'GNUPGHOME', see 'temp_gpg_dir'
+GPG_AGENT_KILL_COMMAND: tuple[str, ...] = ("/usr/bin/gpgconf", "--kill", "all")
+
+# Fields of 'gpg --with-colons' records, see 'doc/DETAILS' in GnuPG sources
+_COLONS_KEY_ID = 4
+_COLONS_FINGERPRINT = 9
+
+
+class DeadlineExceeded(TimeoutError):
+    """A subprocess did not finish within its timeout, or the run has passed its deadline."""
+
+
+# Seconds a single subprocess may run, and the monotonic time all subprocesses have to finish by
+_timeout: Optional[float] = None
+_deadline: Optional[float] = None
+# Backend verifying signatures; 'auto' uses gpgv when it is installed
+_backend: str = "auto"
+
+
+def configure_timeouts(
+    timeout: Optional[float] = None, deadline: Optional[float] = None
+) -> None:
+    """Limit the time subprocesses started by :func:`run` may take.
+
+    :param timeout: Seconds a single subprocess may run, or ``None`` for no limit.
+    :param deadline: Seconds from now by which all subprocesses have to finish, or ``None``.
+    """
+    global _timeout, _deadline  # noqa: PLW0603
+    _timeout = timeout
+    _deadline = time.monotonic() + deadline if deadline is not None else None
+
+
+def configure_backend(backend: str = "auto") -> None:
+    """Select the program verifying signatures.
+
+    ``gpg`` imports the key into a temporary home directory for each verification, and stops the
+    agent it starts. ``gpgv`` only checks signatures against a keyring file, without importing
+    anything and without an agent. ``auto`` uses ``gpgv`` when it is installed.
+
+    :param backend: One of ``BACKENDS``.
+    :raises ValueError: The backend is not known.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown verification backend '{backend}'.")
+    global _backend  # noqa: PLW0603
+    _backend = backend
+
+
+def use_gpgv() -> bool:
+    """Return whether signatures are verified with ``gpgv``, see :func:`configure_backend`."""
+    if _backend == "auto":
+        return os.access(GPGV, os.X_OK)
+    return _backend == "gpgv"
+
+
+def remaining_time() -> Optional[float]:
+    """Return the seconds left until the deadline, or ``None`` if there is no deadline."""
+    if _deadline is None:
+        return None
+    return _deadline - time.monotonic()
+
+
+def subprocess_timeout(
+    command: Union[str, Path], cleanup: bool = False
+) -> Optional[float]:
+    """Return the seconds a subprocess started now may run, see :func:`configure_timeouts`.
+
+    :param command: The program, for the error message.
+    :param cleanup: The command cleans up after others, it gets ``CLEANUP_TIMEOUT`` seconds even
+        if the deadline has passed.
+    :raises DeadlineExceeded: The deadline has already passed.
+    """
+    if cleanup:
+        return CLEANUP_TIMEOUT
+    timeout: Optional[float] = _timeout
+    remaining: Optional[float] = remaining_time()
+    if remaining is not None:
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Deadline passed before running '{command}'.")
+        timeout = remaining if timeout is None else min(timeout, remaining)
+    return timeout
+
+
+def run(
+    args: Sequence[Union[str, Path]],
+    *,
+    check: bool = False,
+    cleanup: bool = False,
+    **kwargs: Any,
+) -> CompletedProcess:
+    """Run a subprocess like ``subprocess.run``, within the configured timeouts.
+
+    A subprocess that runs out of time is killed and reaped before the exception is raised.
+
+    :param args: The command.
+    :param cleanup: The command cleans up after others, it gets ``CLEANUP_TIMEOUT`` seconds even
+        if the deadline has passed.
+    :raises DeadlineExceeded: The subprocess timed out, or the deadline has already passed.
+    """
+    timeout: Optional[float] = subprocess_timeout(args[0], cleanup=cleanup)
+    try:
+        return subprocess.run(args, check=check, timeout=timeout, **kwargs)
+    except subprocess.TimeoutExpired as exc:
+        logger.debug(f"Command '{args[0]}' timed out after {timeout:.1f} seconds.")
+        raise DeadlineExceeded(
+            f"Command '{args[0]}' did not finish in {timeout:.1f} seconds."
+        ) from exc
+
+
+def gpg_import_command(home: Union[str, Path], key: Path) -> list[Union[str, Path]]:
+    """Return the command importing a key into a GPG home directory."""
+    return ["/usr/bin/gpg", "--homedir", home, "--import", str(key.absolute())]
+
+
+def gpg_verify_command(
+    home: Union[str, Path], signature: Path, file: Path
+) -> list[Union[str, Path]]:
+    """Return the command verifying a detached signature with the keys of a GPG home directory."""
+    return ["/usr/bin/gpg", "--homedir", home, "--verify", signature, file]
+
+
+def gpgv_verify_command(
+    keyring: Path, signature: Path, file: Path
+) -> list[Union[str, Path]]:
+    """Return the command verifying a detached signature with the keys of a keyring file.
+
+    gpgv does not write to its home directory; pointing it to the keyring's directory keeps it
+    away from the configuration and keyrings of the user.
+    """
+    return [
+        GPGV,
+        "--homedir",
+        keyring.absolute().parent,
+        "--keyring",
+        keyring.absolute(),
+        signature,
+        file,
+    ]
+
 
 @contextmanager
 def temp_gpg_dir(key: Path) -> Generator[Path, None, None]:
@@ -19,11 +167,7 @@ def temp_gpg_dir(key: Path) -> Generator[Path, None, None]:
     the GPG socket in the directory, then delete the directory.
     """
     with TemporaryDirectory(prefix=TEMPORARY_DIRECTORY_PREFIX) as dir:
-        subprocess.run(
-            ["/usr/bin/gpg", "--homedir", dir, "--import", str(key.absolute())],
-            check=True,
-            capture_output=True,
-        )
+        run(gpg_import_command(dir, key), check=True, capture_output=True)
         try:
             yield Path(dir)
         finally:
@@ -39,12 +183,18 @@ def temp_gpg_dir(key: Path) -> Generator[Path, None, None]:
             # * rhel-baseos-9.0-update-4-x86_64-kvm.qcow2   gnupg2-2.3.3-2.el9_0.x86_64
             #
             # ...which means this command should work on RHEL 8 and above.
-            subprocess.run(
-                ["/usr/bin/gpgconf", "--kill", "all"],
-                env={"GNUPGHOME": str(dir)},
-                check=True,
-                capture_output=True,
-            )
+            #
+            # The agent is not our child process, it has to be stopped even if the run timed out.
+            try:
+                run(
+                    GPG_AGENT_KILL_COMMAND,
+                    cleanup=True,
+                    env={"GNUPGHOME": str(dir)},
+                    check=True,
+                    capture_output=True,
+                )
+            except DeadlineExceeded:
+                logger.warning(f"Could not stop GPG agent of '{dir}' in time.")
 
 
 def verify_gpg_signed_file(file: Path, signature: Path, key: Path) -> CompletedProcess:
@@ -71,17 +221,132 @@ def verify_gpg_signed_file(file: Path, signature: Path, key: Path) -> CompletedP
 
     with temp_gpg_dir(key) as dir:
         logger.debug(f"Starting GPG verification process for '{file}'.")
-        return subprocess.run(
-            ["/usr/bin/gpg", "--homedir", dir, "--verify", signature, file],
+        return run(
+            gpg_verify_command(dir, signature, file), check=True, capture_output=True
+        )
+
+
+def verify_gpgv_signed_file(
+    file: Path, signature: Path, keyring: Path
+) -> CompletedProcess:
+    """
+    Verify a file that was signed using GPG, with ``gpgv``.
+
+    :param file: A path to the signed file.
+    :param signature: A path to the detached signature.
+    :param keyring: Path to a binary keyring file holding the trusted public keys.
+
+    :returns: Evaluated gpgv command.
+    """
+    if not file.is_file():
+        logger.debug(f"Cannot verify signature of '{file}', file does not exist")
+        raise FileNotFoundError(f"File '{file}' not found")
+
+    if not signature.is_file():
+        logger.debug(
+            f"Cannot verify signature of '{file!s}', signature '{signature!s}' does not exist."
+        )
+        raise FileNotFoundError(
+            f"Signature '{signature!s}' of file '{file!s}' not found."
+        )
+
+    logger.debug(f"Starting gpgv verification process for '{file}'.")
+    return run(
+        gpgv_verify_command(keyring, signature, file), check=True, capture_output=True
+    )
+
+
+class SigningSession:
+    """Sign any number of files with one private key.
+
+    The key is imported into a temporary GPG home directory once, and the gpg-agent started by the
+    first signature is reused by all following ones. Use as a context manager, the agent is killed
+    and the directory is deleted on exit::
+
+        with SigningSession(key) as session:
+            for file in files:
+                session.sign_file(file)
+    """
+
+    def __init__(self, key: Path):
+        if not key.is_file():
+            logger.debug("Cannot start signing session, key does not exist.")
+            raise FileNotFoundError(f"Key '{key}' not found")
+        self.key = key
+        self._stack = ExitStack()
+        self._dir: Optional[Path] = None
+
+    def open(self) -> None:
+        logger.debug(f"Starting GPG signing session with key '{self.key}'.")
+        self._dir = self._stack.enter_context(temp_gpg_dir(self.key))
+
+    def close(self) -> None:
+        logger.debug("Closing GPG signing session.")
+        self._dir = None
+        self._stack.close()
+
+    @property
+    def homedir(self) -> Path:
+        if self._dir is None:
+            raise RuntimeError("Signing session is not open.")
+        return self._dir
+
+    def sign_file(self, file: Path) -> CompletedProcess:
+        """Create an armored detached signature of a file, next to the file.
+
+        :returns: Evaluated GPG command.
+        """
+        if not file.is_file():
+            logger.debug(f"Cannot sign file '{file}', file does not exist.")
+            raise FileNotFoundError(f"File '{file}' not found")
+
+        logger.debug(f"Starting GPG signing process for '{file}'.")
+        return run(
+            [
+                "/usr/bin/gpg",
+                "--homedir",
+                self.homedir,
+                "--detach-sign",
+                "--armor",
+                file,
+            ],
             check=True,
             capture_output=True,
         )
 
+    def sign_data(self, data: bytes) -> bytes:
+        """Create an armored detached signature of data, without touching the filesystem.
+
+        :returns: The signature.
+        """
+        logger.debug("Starting GPG signing process for data.")
+        signature: bytes = run(
+            ["/usr/bin/gpg", "--homedir", self.homedir, "--detach-sign", "--armor"],
+            input=data,
+            check=True,
+            capture_output=True,
+        ).stdout
+        return signature
+
+    # typing.Self available in Python 3.11+
+    def __enter__(self) -> "SigningSession":
+        try:
+            self.open()
+        except BaseException:
+            self.close()
+            raise
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
 
 def sign_file(file: Path, key: Path) -> CompletedProcess:
     """
     Sign a file using GPG.
 
+    To sign multiple files, use :class:`SigningSession`.
+
     :param file: File to be signed.
     :param key: Path to the private GPG key on the filesystem.
 
@@ -91,14 +356,63 @@ def sign_file(file: Path, key: Path) -> CompletedProcess:
         logger.debug(f"Cannot sign file '{file}', file does not exist.")
         raise FileNotFoundError(f"File '{file}' not found")
 
+    with SigningSession(key) as session:
+        return session.sign_file(file)
+
+
+def export_public_key(key: Path) -> bytes:
+    """Export the public half of a private GPG key.
+
+    :param key: Path to the private GPG key on the filesystem.
+    :returns: Binary content of the public key.
+    """
     if not key.is_file():
-        logger.debug(f"Cannot sign file '{file}', key does not exist.")
+        logger.debug("Cannot export public key, key does not exist.")
         raise FileNotFoundError(f"Key '{key}' not found")
 
     with temp_gpg_dir(key) as dir:
-        logger.debug(f"Starting GPG signing process for '{file}'.")
-        return subprocess.run(
-            ["/usr/bin/gpg", "--homedir", dir, "--detach-sign", "--armor", file],
+        logger.debug(f"Exporting public key of '{key}'.")
+        public_key: bytes = run(
+            ["/usr/bin/gpg", "--homedir", dir, "--batch", "--export"],
+            check=True,
+            capture_output=True,
+        ).stdout
+    return public_key
+
+
+def list_key_ids(key: bytes) -> list[list[str]]:
+    """List the key IDs and fingerprints of public keys, without importing them anywhere.
+
+    :param key: Content of one or more public GPG keys, armored or binary.
+    :returns: For each primary key, its fingerprints and key IDs, and those of its subkeys.
+    """
+    with TemporaryDirectory(prefix=TEMPORARY_DIRECTORY_PREFIX) as dir:
+        logger.debug("Listing GPG key IDs.")
+        result = run(
+            [
+                "/usr/bin/gpg",
+                "--homedir",
+                dir,
+                "--batch",
+                "--with-colons",
+                "--import-options",
+                "show-only",
+                "--import",
+            ],
+            input=key,
             check=True,
             capture_output=True,
         )
+
+    keys: list[list[str]] = []
+    for line in result.stdout.decode("utf-8", errors="replace").splitlines():
+        fields: list[str] = line.split(":")
+        if fields[0] == "pub":
+            keys.append([])
+        if not keys:
+            continue
+        if fields[0] in ("pub", "sub") and len(fields) > _COLONS_KEY_ID:
+            keys[-1].append(fields[_COLONS_KEY_ID].upper())
+        elif fields[0] == "fpr" and len(fields) > _COLONS_FINGERPRINT:
+            keys[-1].append(fields[_COLONS_FINGERPRINT].upper())
+    return keys
@@ -0,0 +1,101 @@
+import logging
+import pathlib
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Longest representation of a payload that is put into a log message.
+INLINE_LIMIT: int = 1024
+# Largest size of the debug artifact file.
+ARTIFACT_LIMIT: int = 64 * 1024 * 1024
+
+
+class LazyRepr:
+    """Representation of a payload, computed only when a log record is formatted.
+
+    Only the first ``limit`` bytes of the payload are represented, so logging a multi-megabyte play
+    does not copy it. Pass it as an argument of the log call, not inside an f-string::
+
+        logger.debug("Serialized play as %s", LazyRepr(serialized_play))
+    """
+
+    __slots__ = ("payload", "limit")
+
+    def __init__(self, payload: bytes, limit: int = INLINE_LIMIT):
+        self.payload = payload
+        self.limit = limit
+
+    def __str__(self) -> str:
+        if len(self.payload) <= self.limit:
+            return repr(self.payload)
+        return f"{self.payload[: self.limit]!r}... ({len(self.payload)} bytes in total)"
+
+
+class ArtifactFile:
+    """Append-only file collecting large debug payloads, capped in size.
+
+    Once the file reaches its limit, further payloads are truncated and then dropped.
+    """
+
+    def __init__(self, path: pathlib.Path, limit: int = ARTIFACT_LIMIT):
+        self.path = path
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._size: int = 0
+        self._counter: int = 0
+        path.write_bytes(b"")
+
+    def write(self, title: str, payload: bytes) -> Optional[str]:
+        """Store a payload.
+
+        :returns: Reference to the stored payload, or ``None`` if the file is full.
+        """
+        with self._lock:
+            self._counter += 1
+            reference = f"{self.path}#{self._counter}"
+            header: bytes = f"==> {reference} {title} ({len(payload)} bytes)\n".encode()
+            remaining: int = self.limit - self._size - len(header) - 1
+            if remaining <= 0:
+                return None
+            with self.path.open("ab") as f:
+                f.write(header)
+                f.write(payload[:remaining])
+                f.write(b"\n")
+            self._size += len(header) + min(len(payload), remaining) + 1
+            return reference
+
+
+_artifacts: Optional[ArtifactFile] = None
+
+
+def configure(path: Optional[pathlib.Path], limit: int = ARTIFACT_LIMIT) -> None:
+    """Set the file large payloads are written to, or disable it with ``None``."""
+    global _artifacts  # noqa: PLW0603
+    _artifacts = ArtifactFile(path, limit) if path is not None else None
+
+
+def log_payload(
+    target: logging.Logger, level: int, message: str, payload: bytes
+) -> None:
+    """Log a message with a potentially large payload.
+
+    Nothing is formatted unless the logger is enabled for the level. The message carries a capped
+    representation of the payload; the full payload goes into the artifact file, if configured.
+    """
+    if not target.isEnabledFor(level):
+        return
+    reference: Optional[str] = None
+    if _artifacts is not None and len(payload) > INLINE_LIMIT:
+        reference = _artifacts.write(message, payload)
+    if reference is None:
+        target.log(level, "%s: %s", message, LazyRepr(payload), stacklevel=2)
+    else:
+        target.log(
+            level,
+            "%s: %s (stored in '%s')",
+            message,
+            LazyRepr(payload),
+            reference,
+            stacklevel=2,
+        )
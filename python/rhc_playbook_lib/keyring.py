@@ -0,0 +1,239 @@
+"""Set of trusted public keys, indexed by key ID and fingerprint.
+
+While the playbook signing key is being rotated, plays signed by any of several keys have to be
+accepted. Instead of trying the keys one by one, :class:`Keyring` reads the issuer of each detached
+signature and selects the key that made it, so verification runs GPG once, with a single key,
+however many keys are trusted.
+"""
+
+import base64
+import binascii
+import hashlib
+import logging
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+from subprocess import CalledProcessError
+from tempfile import TemporaryDirectory
+from typing import Optional
+
+from rhc_playbook_lib import crypto
+from rhc_playbook_lib.constants import TEMPORARY_DIRECTORY_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# OpenPGP packet and subpacket types, RFC 4880 sections 4.3 and 5.2.3.1
+_SIGNATURE_PACKET = 2
+_ISSUER_SUBPACKET = 16
+_ISSUER_FINGERPRINT_SUBPACKET = 33
+# Signature packet versions, RFC 4880 section 5.2 and RFC 9580 section 5.2
+_V3, _V4, _V6 = 3, 4, 6
+# Boundaries of the length encodings, RFC 4880 section 4.2.2
+_ONE_OCTET_LENGTH = 192
+_TWO_OCTET_LENGTH = 224
+_FIVE_OCTET_LENGTH = 255
+# Length of the armor checksum line, '=' followed by 4 base64 characters
+_ARMOR_CHECKSUM_LENGTH = 5
+
+# Keyring files written for gpgv, by hash of the key content; removed when the interpreter exits
+_keyring_directory: Optional[TemporaryDirectory] = None
+_keyring_files: dict[str, Path] = {}
+_keyring_lock = threading.Lock()
+
+
+def dearmor(data: bytes) -> bytes:
+    """Convert ASCII armored OpenPGP data to binary, keep binary data as it is.
+
+    All armored blocks are concatenated, their headers and checksums are dropped.
+    """
+    if b"-----BEGIN PGP" not in data:
+        return data
+
+    result: list[bytes] = []
+    block: Optional[list[bytes]] = None
+    in_headers: bool = False
+    for raw_line in data.splitlines():
+        line: bytes = raw_line.strip()
+        if line.startswith(b"-----BEGIN PGP"):
+            block, in_headers = [], True
+        elif block is None:
+            continue
+        elif line.startswith(b"-----END PGP"):
+            result.append(base64.b64decode(b"".join(block)))
+            block = None
+        elif in_headers:
+            # Headers end with an empty line; some writers omit headers and the empty line
+            if not line or b":" not in line:
+                in_headers = False
+                if line:
+                    block.append(line)
+        elif line.startswith(b"=") and len(line) == _ARMOR_CHECKSUM_LENGTH:
+            continue  # checksum
+        else:
+            block.append(line)
+    return b"".join(result)
+
+
+def keyring_file(key: bytes) -> Path:
+    """Write public keys into a binary keyring file that ``gpgv`` can read.
+
+    Each key content is converted once per process; later calls return the same file.
+
+    :param key: Content of one or more public GPG keys, armored or binary.
+    """
+    global _keyring_directory  # noqa: PLW0603
+    name: str = hashlib.sha256(key).hexdigest()
+    with _keyring_lock:
+        path: Optional[Path] = _keyring_files.get(name)
+        if path is None:
+            if _keyring_directory is None:
+                _keyring_directory = TemporaryDirectory(
+                    prefix=TEMPORARY_DIRECTORY_PREFIX
+                )
+            path = Path(_keyring_directory.name) / f"{name}.gpg"
+            logger.debug(f"Writing keyring file '{path}'.")
+            path.write_bytes(dearmor(key))
+            _keyring_files[name] = path
+    return path
+
+
+def _read_packet(data: bytes, offset: int) -> tuple[int, bytes, int]:
+    """Read an OpenPGP packet.
+
+    :returns: Packet type, packet body and offset of the next packet.
+    :raises ValueError: Packet is malformed or uses partial body lengths.
+    """
+    header: int = data[offset]
+    if not header & 0x80:
+        raise ValueError("Not an OpenPGP packet.")
+    if header & 0x40:
+        # New format
+        tag: int = header & 0x3F
+        length, offset = _read_length(data, offset + 1)
+    else:
+        # Old format
+        tag = (header >> 2) & 0x0F
+        size: int = {0: 1, 1: 2, 2: 4}.get(header & 0x03, 0)
+        if not size:
+            raise ValueError("Packets of indeterminate length are not supported.")
+        length = int.from_bytes(data[offset + 1 : offset + 1 + size], "big")
+        offset += 1 + size
+    if offset + length > len(data):
+        raise ValueError("Packet is truncated.")
+    return tag, data[offset : offset + length], offset + length
+
+
+def _read_length(data: bytes, offset: int) -> tuple[int, int]:
+    """Read a new format packet length or a subpacket length.
+
+    :returns: The length and the offset right after it.
+    """
+    first: int = data[offset]
+    if first < _ONE_OCTET_LENGTH:
+        return first, offset + 1
+    if first < _TWO_OCTET_LENGTH:
+        length: int = ((first - _ONE_OCTET_LENGTH) << 8) + data[offset + 1]
+        return length + _ONE_OCTET_LENGTH, offset + 2
+    if first == _FIVE_OCTET_LENGTH:
+        return int.from_bytes(data[offset + 1 : offset + 5], "big"), offset + 5
+    raise ValueError("Partial body lengths are not supported.")
+
+
+def _subpacket_issuers(subpackets: bytes) -> list[str]:
+    issuers: list[str] = []
+    offset: int = 0
+    while offset < len(subpackets):
+        length, offset = _read_length(subpackets, offset)
+        kind: int = subpackets[offset] & 0x7F
+        body: bytes = subpackets[offset + 1 : offset + length]
+        offset += length
+        if kind == _ISSUER_SUBPACKET:
+            issuers.append(body.hex().upper())
+        elif kind == _ISSUER_FINGERPRINT_SUBPACKET:
+            # The first octet is the key version
+            issuers.insert(0, body[1:].hex().upper())
+    return issuers
+
+
+def signature_issuers(signature: bytes) -> list[str]:
+    """Read the fingerprints and key IDs of the keys that made a detached signature.
+
+    Fingerprints are listed before key IDs. Returns an empty list if the signature cannot be
+    parsed, GPG then reports the actual problem.
+
+    :param signature: Armored or binary detached signature.
+    """
+    issuers: list[str] = []
+    try:
+        data: bytes = dearmor(signature)
+        offset: int = 0
+        while offset < len(data):
+            tag, body, offset = _read_packet(data, offset)
+            if tag != _SIGNATURE_PACKET:
+                continue
+            if body[0] == _V3:
+                issuers.append(body[7:15].hex().upper())
+                continue
+            if body[0] not in (_V4, _V6):
+                continue
+            size: int = 2 if body[0] == _V4 else 4
+            start: int = 4
+            for _ in range(2):
+                # Hashed subpackets, then unhashed subpackets
+                length: int = int.from_bytes(body[start : start + size], "big")
+                issuers += _subpacket_issuers(
+                    body[start + size : start + size + length]
+                )
+                start += size + length
+    except (binascii.Error, IndexError, ValueError) as exc:
+        logger.debug(f"Cannot read signature issuers: {exc}")
+        return []
+    return issuers
+
+
+class Keyring:
+    """Trusted public keys.
+
+    Each key is read once, when the keyring is created. Key IDs and fingerprints of primary keys
+    and subkeys are all indexed.
+
+    :param keys: Contents of public GPG keys, armored or binary. One content may hold several keys.
+    :raises ValueError: A content cannot be read or does not contain any public key.
+    """
+
+    def __init__(self, keys: Iterable[bytes]):
+        self._keys: list[bytes] = []
+        self._index: dict[str, int] = {}
+        for key in keys:
+            try:
+                ids: list[list[str]] = crypto.list_key_ids(key)
+            except CalledProcessError as err:
+                raise ValueError("GPG key content could not be read.") from err
+            if not ids:
+                raise ValueError("GPG key content does not contain any public key.")
+            self._keys.append(dearmor(key))
+            for key_ids in ids:
+                logger.debug(f"Trusting GPG key '{key_ids[0]}'.")
+                for key_id in key_ids:
+                    self._index.setdefault(key_id, len(self._keys) - 1)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key_id: object) -> bool:
+        return isinstance(key_id, str) and key_id.upper() in self._index
+
+    def key_for(self, signature: bytes) -> bytes:
+        """Select the key to verify a detached signature with.
+
+        When the issuer of the signature is not known, all keys are returned, so that GPG reports
+        the missing key or the invalid signature.
+
+        :returns: Binary content of the key.
+        """
+        for issuer in signature_issuers(signature):
+            if issuer in self._index:
+                logger.debug(f"Signature was made by GPG key '{issuer}'.")
+                return self._keys[self._index[issuer]]
+        logger.debug("Signature issuer is not in the keyring, using all keys.")
+        return b"".join(self._keys)
@@ -0,0 +1,222 @@
+"""Check playbooks against the rules of ``SPECIFICATION.md``, before they are signed.
+
+Playbooks are checked from the events of the YAML parser, no play is built, serialized or digested.
+The parser of :class:`Loader` is used, or the parser of libyaml when PyYAML is built with it: it
+produces the same events about twenty times faster. The rules are:
+
+* ``tag``: YAML tags MUST NOT be used, except ``!!binary`` of the ``insights_signature`` the signer
+  writes.
+* ``alias``: values MUST NOT parse as aliases; every alias is reported, whether its anchor is
+  defined or not, as well as an unquoted value starting with ``*`` that is not a valid alias.
+* ``non-ascii``: characters outside of ASCII MUST be escaped.
+* ``boolean``: unquoted ``yes``, ``on`` and the like stay strings, although YAML 1.1 reads them as
+  booleans; they are reported as warnings.
+
+Files that cannot be read or parsed are reported with the ``syntax`` rule, and files exceeding the
+size budget of :class:`Loader` with the ``budget`` rule; nodes are not composed, so the other
+budgets do not apply. Files are checked in a pool of worker processes.
+"""
+
+import bisect
+import concurrent.futures
+import dataclasses
+import logging
+import os
+import pathlib
+from collections.abc import Iterator, Sequence
+from typing import Any, Optional
+
+import yaml
+
+from rhc_playbook_lib import PreconditionError
+from rhc_playbook_lib.serialization import HAS_LIBYAML, Loader
+
+logger = logging.getLogger(__name__)
+
+ERROR = "error"
+WARNING = "warning"
+# Plain scalars that YAML 1.1 reads as booleans, but the verifier keeps as strings
+AMBIGUOUS_BOOLEANS: frozenset[str] = frozenset(
+    variant
+    for word in ("y", "n", "yes", "no", "on", "off")
+    for variant in (word, word.capitalize(), word.upper())
+)
+# The signer writes signatures as binary values
+_SIGNATURE_KEY = "insights_signature"
+_SIGNATURE_TAG = "tag:yaml.org,2002:binary"
+# Files sent to a worker process at once, per worker
+_CHUNKS_PER_WORKER = 4
+
+
+@dataclasses.dataclass(frozen=True)
+class Finding:
+    file: str
+    # Position of the finding, counted from 1; None if it concerns the whole file
+    line: Optional[int]
+    column: Optional[int]
+    severity: str
+    rule: str
+    message: str
+
+    def __str__(self) -> str:
+        position: str = self.file
+        if self.line is not None:
+            position += f":{self.line}:{self.column}"
+        return f"{position}: {self.severity}: {self.message} [{self.rule}]"
+
+
+class _Positions:
+    """Line and column of characters of a document, by their index."""
+
+    def __init__(self, document: str) -> None:
+        self._starts: list[int] = [0]
+        index: int = document.find("\n")
+        while index != -1:
+            self._starts.append(index + 1)
+            index = document.find("\n", index + 1)
+
+    def of(self, index: int) -> tuple[int, int]:
+        line: int = bisect.bisect_right(self._starts, index) - 1
+        return line + 1, index - self._starts[line] + 1
+
+
+def _first_non_ascii(text: str) -> int:
+    return next(i for i, char in enumerate(text) if not char.isascii())
+
+
+def _parser(document: str) -> Any:
+    """Return a parser of the document, see the module documentation.
+
+    :raises PreconditionError: The document exceeds the size budget of :class:`Loader`.
+    """
+    Loader.check_size(document)
+    if HAS_LIBYAML:
+        return yaml.CBaseLoader(document)
+    return Loader(document)
+
+
+def _check_events(
+    parser: Any, document: str, file: str, findings: list[Finding]
+) -> None:
+    ascii_only: bool = document.isascii()
+    positions: Optional[_Positions] = None
+    anchors: set[str] = set()
+    # Value of the previous scalar, the key of a mapping value
+    key: Optional[str] = None
+
+    def add(mark: Any, severity: str, rule: str, message: str) -> None:
+        findings.append(
+            Finding(file, mark.line + 1, mark.column + 1, severity, rule, message)
+        )
+
+    while parser.check_event():
+        event: yaml.Event = parser.get_event()
+        previous_key, key = key, None
+        if isinstance(event, yaml.DocumentStartEvent):
+            anchors.clear()
+        elif isinstance(event, yaml.AliasEvent):
+            message: str = f"Undefined alias '*{event.anchor}'."
+            if event.anchor in anchors:
+                message = f"Value parses as the alias '*{event.anchor}', quote it if it is a string."
+            add(event.start_mark, ERROR, "alias", message)
+            continue
+        if not isinstance(event, (yaml.ScalarEvent, yaml.CollectionStartEvent)):
+            continue
+        if event.anchor is not None:
+            anchors.add(event.anchor)
+        if event.tag is not None and (
+            event.tag != _SIGNATURE_TAG or previous_key != _SIGNATURE_KEY
+        ):
+            add(event.start_mark, ERROR, "tag", f"YAML tag '{event.tag}' is used.")
+        if not isinstance(event, yaml.ScalarEvent):
+            continue
+        key = event.value
+        # Plain scalars have no style, the style of libyaml is empty
+        if not event.style and event.value in AMBIGUOUS_BOOLEANS:
+            add(
+                event.start_mark,
+                WARNING,
+                "boolean",
+                f"Unquoted '{event.value}' is a string here, but a boolean in YAML 1.1.",
+            )
+        if ascii_only:
+            continue
+        start: Any = event.start_mark
+        end: Any = event.end_mark
+        source: str = document[start.index : end.index]
+        if not source.isascii():
+            positions = positions or _Positions(document)
+            index: int = start.index + _first_non_ascii(source)
+            line, column = positions.of(index)
+            findings.append(
+                Finding(
+                    file,
+                    line,
+                    column,
+                    ERROR,
+                    "non-ascii",
+                    f"Character U+{ord(document[index]):04X} is not escaped.",
+                )
+            )
+
+
+def lint_playbook(document: str, file: str = "<string>") -> list[Finding]:
+    """Check a playbook against the rules of the specification.
+
+    :param document: Raw playbook.
+    :param file: Name of the playbook in findings.
+    :returns: Findings, in the order of the document.
+    """
+    findings: list[Finding] = []
+    # libyaml does not count a byte order mark in the indexes of its marks
+    document = document.removeprefix("\ufeff")
+    try:
+        parser: Any = _parser(document)
+    except PreconditionError as exc:
+        return [Finding(file, None, None, ERROR, "budget", str(exc))]
+    try:
+        _check_events(parser, document, file, findings)
+    except PreconditionError as exc:
+        findings.append(Finding(file, None, None, ERROR, "budget", str(exc)))
+    except yaml.MarkedYAMLError as exc:
+        mark: Optional[yaml.Mark] = exc.problem_mark
+        rule: str = "alias" if exc.context == "while scanning an alias" else "syntax"
+        findings.append(
+            Finding(
+                file,
+                mark.line + 1 if mark is not None else None,
+                mark.column + 1 if mark is not None else None,
+                ERROR,
+                rule,
+                f"{exc.context + ', ' if exc.context else ''}{exc.problem}.",
+            )
+        )
+    finally:
+        parser.dispose()
+    return findings
+
+
+def lint_file(path: pathlib.Path) -> list[Finding]:
+    """Check a playbook file, see :func:`lint_playbook`."""
+    try:
+        document: str = path.read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError) as exc:
+        return [Finding(str(path), None, None, ERROR, "syntax", f"Cannot read: {exc}")]
+    return lint_playbook(document, str(path))
+
+
+def lint_files(
+    paths: Sequence[pathlib.Path], *, jobs: Optional[int] = None
+) -> Iterator[Finding]:
+    """Check many playbook files, in parallel.
+
+    :param paths: The playbook files.
+    :param jobs: Number of worker processes, the number of CPUs by default.
+    :returns: Findings of all files, in the order of the files.
+    """
+    workers: int = jobs or os.cpu_count() or 1
+    chunksize: int = max(1, len(paths) // (workers * _CHUNKS_PER_WORKER))
+    logger.info(f"Checking {len(paths)} playbook(s) with {workers} process(es).")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for findings in executor.map(lint_file, paths, chunksize=chunksize):
+            yield from findings
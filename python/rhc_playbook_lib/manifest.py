@@ -0,0 +1,136 @@
+"""Canonical digests of all plays in a catalogue of playbooks.
+
+The digest of a play is the SHA-256 hash its signature is made over, and the hash revocation lists
+refer to. A manifest lists the digest of every play of every file, without any key. Files are
+digested in a pool of worker processes.
+
+The manifest is written as a YAML list whose items have the ``name`` and ``hash`` keys of the
+``revoked_playbooks`` list, followed by the file and the index of the play in it.
+"""
+
+import concurrent.futures
+import dataclasses
+import functools
+import logging
+import os
+import pathlib
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Callable, Optional, TextIO
+
+import yaml
+
+from rhc_playbook_lib import (
+    PreconditionError,
+    canonical_play,
+    create_play_digest,
+    parse_playbook,
+)
+
+logger = logging.getLogger(__name__)
+
+# Suffixes of files considered to be playbooks
+PLAYBOOK_SUFFIXES: tuple[str, ...] = (".yml", ".yaml")
+# Files sent to a worker process at once, per worker
+_CHUNKS_PER_WORKER = 4
+
+
+@dataclasses.dataclass(frozen=True)
+class ManifestEntry:
+    file: str
+    play: int
+    name: str
+    digest: bytes
+
+
+def find_playbooks(directory: pathlib.Path) -> list[pathlib.Path]:
+    """List playbook files in a directory tree, in a stable order."""
+    return sorted(
+        path
+        for path in directory.rglob("*")
+        if path.suffix in PLAYBOOK_SUFFIXES and path.is_file()
+    )
+
+
+def play_digest(play: dict) -> bytes:
+    """Compute the canonical digest of a play.
+
+    Unlike :func:`rhc_playbook_lib.prepare_play`, the play does not need a signature.
+
+    :param play: Parsed play, with the ``vars/insights_signature_exclude`` key.
+    :raises PreconditionError: The play has no exclusions, or it cannot be cleaned.
+    """
+    return create_play_digest(canonical_play(play))
+
+
+def digest_file(
+    path: pathlib.Path, prepare: Optional[Callable[[dict], dict]] = None
+) -> list[ManifestEntry]:
+    """Digest all plays of a playbook file.
+
+    :param path: The playbook file.
+    :param prepare: Function applied to each parsed play before it is digested.
+    :raises PreconditionError: The file does not contain plays, or a play cannot be digested.
+    """
+    try:
+        plays: list[dict] = parse_playbook(path.read_text())
+        if not isinstance(plays, list) or not plays:
+            raise PreconditionError("Playbook contains no plays.")
+        entries: list[ManifestEntry] = []
+        for i, raw_play in enumerate(plays, 1):
+            play: dict = prepare(raw_play) if prepare is not None else raw_play
+            entries.append(
+                ManifestEntry(
+                    file=str(path),
+                    play=i,
+                    name=play.get("name", "???"),
+                    digest=play_digest(play),
+                )
+            )
+    except Exception as exc:
+        # Only the message crosses the process boundary
+        raise PreconditionError(f"Cannot digest '{path}': {exc}") from exc
+    return entries
+
+
+def digest_files(
+    paths: Sequence[pathlib.Path],
+    *,
+    prepare: Optional[Callable[[dict], dict]] = None,
+    jobs: Optional[int] = None,
+) -> Iterator[ManifestEntry]:
+    """Digest all plays of many playbook files, in parallel.
+
+    :param paths: The playbook files.
+    :param prepare: Function applied to each parsed play before it is digested. It is sent to the
+        worker processes, so it has to be defined at the top level of a module.
+    :param jobs: Number of worker processes, the number of CPUs by default.
+    :raises PreconditionError: A file does not contain plays, or a play cannot be digested.
+    :returns: Entries of all plays, in the order of the files.
+    """
+    workers: int = jobs or os.cpu_count() or 1
+    chunksize: int = max(1, len(paths) // (workers * _CHUNKS_PER_WORKER))
+    logger.info(f"Digesting {len(paths)} playbook(s) with {workers} process(es).")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for entries in executor.map(
+            functools.partial(digest_file, prepare=prepare), paths, chunksize=chunksize
+        ):
+            yield from entries
+
+
+def write_manifest(entries: Iterable[ManifestEntry], output: TextIO) -> int:
+    """Write manifest entries as a YAML list, as soon as each one is available.
+
+    :returns: Number of entries written.
+    """
+    count: int = 0
+    for entry in entries:
+        item: dict = {
+            "name": entry.name,
+            "hash": entry.digest.hex(),
+            "file": entry.file,
+            "play": entry.play,
+        }
+        yaml.safe_dump([item], output, sort_keys=False, allow_unicode=True)
+        count += 1
+    output.flush()
+    return count
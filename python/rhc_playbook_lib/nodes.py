@@ -0,0 +1,251 @@
+"""Play digests computed from the composed YAML node graph.
+
+The reference pipeline constructs the play into Python objects, deep-copies it to remove excluded
+fields, serializes it into a string and hashes it. :func:`digest_play` walks the nodes returned by
+``Loader.get_single_node()`` instead, and feeds the canonical form into SHA-256 in chunks. Only
+scalars that are not plain strings, and the excluded fields, are constructed, using the same
+constructors as the loader.
+
+The walk only covers plays of the usual shape. Anything else (recursive aliases, mappings used as
+keys, custom collection tags, missing or malformed signature variables) raises :class:`Unsupported`,
+and the play has to be constructed and verified the reference way, which also produces the proper
+error for invalid plays.
+"""
+
+import base64
+import binascii
+import dataclasses
+import hashlib
+import logging
+import typing
+from typing import Any, Optional
+
+import yaml
+
+from rhc_playbook_lib.constants import VARIABLE_FIELDS
+from rhc_playbook_lib.serialization import IterativeSerializer, Loader, Serializer
+
+logger = logging.getLogger(__name__)
+
+_MAP_TAG = "tag:yaml.org,2002:map"
+_SEQ_TAG = "tag:yaml.org,2002:seq"
+_STR_TAG = "tag:yaml.org,2002:str"
+
+# Number of canonical form parts joined before they are hashed.
+_CHUNK_PARTS: int = 4096
+
+# Marks that the item below it on the stack is already serialized text.
+_EMIT = object()
+# Marks that the node below it on the stack has been fully serialized.
+_LEAVE = object()
+
+
+class Unsupported(Exception):
+    """The play cannot be canonicalized from its nodes and has to be constructed."""
+
+
+@dataclasses.dataclass(frozen=True)
+class PlayDigest:
+    name: Any
+    digest: bytes
+    signature: bytes
+    # Canonical form of the play, only kept when requested
+    serialized: Optional[bytes] = None
+
+
+class _Walker:
+    """Single-use canonicalizer of one play node."""
+
+    def __init__(self, loader: Loader) -> None:
+        self.loader = loader
+        # Entries of mapping nodes that were needed before the walk, by node identity
+        self.entries: dict[int, dict[Any, yaml.Node]] = {}
+        # Keys removed from mapping nodes by the exclusions, by node identity
+        self.excluded: dict[int, set[Any]] = {}
+        # Value nodes of the removed keys
+        self.excluded_nodes: list[yaml.Node] = []
+
+    def mapping(self, node: yaml.Node) -> dict[Any, yaml.Node]:
+        """Return the entries of a mapping node and remember them for the walk."""
+        entries: Optional[dict[Any, yaml.Node]] = self.entries.get(id(node))
+        if entries is None:
+            entries = self.entries[id(node)] = self.construct_entries(node)
+        return entries
+
+    def construct_entries(self, node: yaml.Node) -> dict[Any, yaml.Node]:
+        """Return the entries of a mapping node, the way the constructor would see them."""
+        if not isinstance(node, yaml.MappingNode) or node.tag != _MAP_TAG:
+            raise Unsupported(f"Node '{node.tag}' is not a plain mapping.")
+        self.loader.flatten_mapping(node)
+        entries: dict[Any, yaml.Node] = {}
+        for key_node, value_node in node.value:
+            if not isinstance(key_node, yaml.ScalarNode):
+                raise Unsupported("Mapping key is not a scalar.")
+            # Duplicate keys keep the position of the first and the value of the last one
+            entries[self.scalar(key_node)] = value_node
+        return entries
+
+    def scalar(self, node: yaml.ScalarNode) -> Any:
+        if node.tag == _STR_TAG:
+            return node.value
+        return self.loader.construct_object(node)
+
+    def serialize_scalar(self, node: yaml.ScalarNode) -> str:
+        if node.tag == _STR_TAG:
+            return Serializer._str(node.value)
+        return IterativeSerializer.serialize(self.loader.construct_object(node))
+
+    def exclude(self, play: yaml.Node, fields: str) -> None:
+        """Apply the exclusions of ``clean_play``."""
+        for field in fields.split(","):
+            elements: list[str] = [string for string in field.split("/") if string]
+            if len(elements) not in (1, 2) or elements[0] not in VARIABLE_FIELDS:
+                raise Unsupported(f"Variable field '{field}' cannot be excluded.")
+
+            target: yaml.Node = play
+            if len(elements) > 1:
+                if not self.present(play, elements[0]):
+                    raise Unsupported(f"Variable field '{field}' is not present.")
+                target = self.mapping(play)[elements[0]]
+            if not self.present(target, elements[-1]):
+                raise Unsupported(f"Variable field '{field}' is not present.")
+            self.excluded.setdefault(id(target), set()).add(elements[-1])
+            self.excluded_nodes.append(self.mapping(target)[elements[-1]])
+
+    def present(self, node: yaml.Node, key: str) -> bool:
+        """Check that the mapping node has the key and that it has not been excluded."""
+        return key in self.mapping(node) and key not in self.excluded.get(id(node), ())
+
+    def visible(self, node: yaml.Node) -> list[tuple[Any, yaml.Node]]:
+        """Return the entries of a mapping node that have not been excluded."""
+        entries: Optional[dict[Any, yaml.Node]] = self.entries.get(id(node))
+        if entries is None:
+            entries = self.construct_entries(node)
+        excluded: Optional[set[Any]] = self.excluded.get(id(node))
+        if not excluded:
+            return list(entries.items())
+        return [(key, value) for key, value in entries.items() if key not in excluded]
+
+    def walk(self, root: yaml.Node, write: typing.Callable[[str], None]) -> None:
+        """Write the canonical form of the node, as ``Serializer`` would serialize it."""
+        stack: list[Any] = [root]
+        push = stack.append
+        pop = stack.pop
+        # Collection nodes that are being serialized, by identity
+        active: set[int] = set()
+
+        while stack:
+            item = pop()
+            if item is _EMIT:
+                write(pop())
+            elif item is _LEAVE:
+                node = pop()
+                active.discard(id(node))
+                write(")])" if isinstance(node, yaml.MappingNode) else "]")
+            elif isinstance(item, yaml.ScalarNode):
+                write(self.serialize_scalar(item))
+            elif isinstance(item, yaml.MappingNode):
+                entries = self.visible(item)
+                if not entries:
+                    write("ordereddict()")
+                    continue
+                self.enter(item, active)
+                push(item)
+                push(_LEAVE)
+                for key, value in reversed(entries[1:]):
+                    push(value)
+                    push(f"), ('{key}', ")
+                    push(_EMIT)
+                key, value = entries[0]
+                push(value)
+                write(f"ordereddict([('{key}', ")
+            elif isinstance(item, yaml.SequenceNode) and item.tag == _SEQ_TAG:
+                self.enter(item, active)
+                push(item)
+                push(_LEAVE)
+                for value in reversed(item.value[1:]):
+                    push(value)
+                    push(", ")
+                    push(_EMIT)
+                if item.value:
+                    push(item.value[0])
+                write("[")
+            else:
+                raise Unsupported(f"Node '{item.tag}' is not supported.")
+
+    @staticmethod
+    def enter(node: yaml.Node, active: set[int]) -> None:
+        if id(node) in active:
+            raise Unsupported("Play contains a recursive structure.")
+        active.add(id(node))
+
+
+def digest_play(loader: Loader, node: yaml.Node, keep: bool = False) -> PlayDigest:
+    """Compute the digest of a play from its node.
+
+    The digest is equal to the one of ``serialize_play(clean_play(play))``, where ``play`` is the
+    node constructed by the loader.
+
+    :param loader: Loader that composed the node.
+    :param node: Node of the play.
+    :param keep: Keep the canonical form of the play in the result.
+    :raises Unsupported: The play has to be constructed and verified the reference way.
+    """
+    walker = _Walker(loader)
+    try:
+        play: dict[Any, yaml.Node] = walker.mapping(node)
+        if "vars" not in play:
+            raise Unsupported("Play does not contain its signature variables.")
+        variables: dict[Any, yaml.Node] = walker.mapping(play["vars"])
+
+        name: Any = "???"
+        if "name" in play:
+            name = loader.construct_object(play["name"], deep=True)
+        signature_node: Optional[yaml.Node] = variables.get("insights_signature")
+        exclude_node: Optional[yaml.Node] = variables.get("insights_signature_exclude")
+        if signature_node is None or not isinstance(exclude_node, yaml.ScalarNode):
+            raise Unsupported("Play does not contain its signature variables.")
+        b64_signature: Any = loader.construct_object(signature_node, deep=True)
+        fields: Any = walker.scalar(exclude_node)
+        if not b64_signature or not isinstance(fields, str):
+            raise Unsupported("Play does not contain its signature variables.")
+        try:
+            signature: bytes = base64.b64decode(b64_signature)
+        except (binascii.Error, TypeError, ValueError) as exc:
+            raise Unsupported("Play signature is not a valid base64 string.") from exc
+
+        walker.exclude(node, fields)
+        # The reference way constructs excluded fields before removing them; values it cannot
+        # construct are rejected here the same way
+        for excluded in walker.excluded_nodes:
+            loader.construct_object(excluded, deep=True)
+
+        sha = hashlib.sha256()
+        parts: list[str] = []
+        kept: list[bytes] = []
+
+        def flush() -> None:
+            chunk: bytes = "".join(parts).encode("utf-8")
+            parts.clear()
+            sha.update(chunk)
+            if keep:
+                kept.append(chunk)
+
+        def write(part: str) -> None:
+            parts.append(part)
+            if len(parts) >= _CHUNK_PARTS:
+                flush()
+
+        walker.walk(node, write)
+        flush()
+    finally:
+        # Same as the end of 'construct_document'
+        loader.constructed_objects = {}
+        loader.recursive_objects = {}
+
+    return PlayDigest(
+        name=name,
+        digest=sha.digest(),
+        signature=signature,
+        serialized=b"".join(kept) if keep else None,
+    )
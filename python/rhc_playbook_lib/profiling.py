@@ -0,0 +1,141 @@
+"""Profiling of a whole command line run, to diagnose slow runs reported from the field.
+
+The verifier and the signer have hidden options enabling it on the installed package:
+
+* ``--profile FILE`` writes ``cProfile`` statistics of the main thread, readable with
+  :mod:`pstats`.
+* ``--trace-memory FILE`` traces allocations with :mod:`tracemalloc`, and writes a summary of the
+  stages of the run: the peak of traced memory during each stage, and the allocations it left
+  behind.
+
+Output only goes to the given files; standard output carries the playbook.
+"""
+
+import contextlib
+import cProfile
+import dataclasses
+import logging
+import pathlib
+import tracemalloc
+from typing import Iterator, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+# Allocations listed for each stage
+TOP_ALLOCATIONS = 10
+
+# Allocations made by tracing itself are not reported
+_FILTERS: tuple[tracemalloc.Filter, ...] = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class StageMemory:
+    name: str
+    # Highest traced memory during the stage
+    peak: int
+    # Traced memory at the end of the stage minus at its start
+    retained: int
+    # Sources of the memory retained, largest first
+    top: list[tracemalloc.StatisticDiff]
+
+
+class MemoryTrace:
+    """Memory traced during consecutive stages of a run; tracing has to be started already."""
+
+    def __init__(self) -> None:
+        self.stages: list[StageMemory] = []
+        self.peak: int = 0
+
+    def _take_peak(self) -> int:
+        """Return the peak since the previous call, and keep the peak of the whole run."""
+        peak: int = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        self.peak = max(self.peak, peak)
+        return peak
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self._take_peak()
+        start: tracemalloc.Snapshot = tracemalloc.take_snapshot().filter_traces(
+            _FILTERS
+        )
+        before: int = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            peak: int = self._take_peak()
+            after: int = tracemalloc.get_traced_memory()[0]
+            end: tracemalloc.Snapshot = tracemalloc.take_snapshot().filter_traces(
+                _FILTERS
+            )
+            top: list[tracemalloc.StatisticDiff] = [
+                diff for diff in end.compare_to(start, "lineno") if diff.size_diff > 0
+            ][:TOP_ALLOCATIONS]
+            self.stages.append(StageMemory(name, peak, after - before, top))
+
+    def write(self, output: TextIO) -> None:
+        self._take_peak()
+        output.write(f"Peak of traced memory: {self.peak / 1024:.1f} KiB\n\n")
+        output.write(f"{'stage':<20} {'peak KiB':>12} {'retained KiB':>14}\n")
+        for stage in self.stages:
+            output.write(
+                f"{stage.name:<20} {stage.peak / 1024:>12.1f} "
+                f"{stage.retained / 1024:>+14.1f}\n"
+            )
+        for stage in self.stages:
+            output.write(f"\nTop allocations retained by '{stage.name}':\n")
+            for diff in stage.top:
+                output.write(f"  {diff}\n")
+
+
+_memory: Optional[MemoryTrace] = None
+
+
+@contextlib.contextmanager
+def session(
+    profile: Optional[pathlib.Path] = None, trace_memory: Optional[pathlib.Path] = None
+) -> Iterator[None]:
+    """Profile the code run in the context, and write the results when it exits.
+
+    :param profile: File to write ``cProfile`` statistics to, or ``None``.
+    :param trace_memory: File to write the memory summary to, or ``None``. Stages are marked
+        with :func:`stage`.
+    """
+    global _memory  # noqa: PLW0603
+    profiler: Optional[cProfile.Profile] = None
+    if trace_memory is not None:
+        tracemalloc.start()
+        _memory = MemoryTrace()
+    if profile is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None and profile is not None:
+            profiler.disable()
+            profiler.dump_stats(profile)
+            logger.info(f"Wrote profile to '{profile}'.")
+        if _memory is not None and trace_memory is not None:
+            with trace_memory.open("w") as output:
+                _memory.write(output)
+            tracemalloc.stop()
+            _memory = None
+            logger.info(f"Wrote memory summary to '{trace_memory}'.")
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mark a stage of the run for the memory summary, see :func:`session`.
+
+    Stages are consecutive, they run in the main thread and are not nested. Outside of a session
+    tracing memory, this does nothing.
+    """
+    if _memory is None:
+        yield
+        return
+    with _memory.stage(name):
+        yield
@@ -9,10 +9,44 @@ import yaml.scanner
 logger = logging.getLogger(__name__)
 
 
-__all__ = ["Loader", "serialize_play"]
+__all__ = ["Loader", "dump_playbook", "serialize_play"]
+
+
+# The backslash has to be escaped first, so the backslashes of other escapes are kept intact.
+_ESCAPES: tuple[tuple[str, str], ...] = (
+    ("\\", "\\\\"),
+    ("\n", "\\n"),
+    ("\t", "\\t"),
+)
+# Only looked for in strings containing non-ASCII characters.
+_NON_ASCII_ESCAPES: tuple[tuple[str, str], ...] = (
+    ("\u200b", "\\u200b"),  # Zero-width space
+    ("\u200c", "\\u200c"),  # Zero-width non-joiner
+    ("\u200d", "\\u200d"),  # Zero-width joiner
+)
 
 
 class CustomSafeConstructor(yaml.constructor.SafeConstructor):
+    """Constructor of playbooks.
+
+    Playbooks repeat the same keys and values (``name``, ``when``, ``ansible.builtin.shell``) many
+    times. Equal short strings are constructed as a single object, shared by all places they occur
+    in the document; the values, and so the serialization of plays, do not change.
+    """
+
+    #: Longest string to deduplicate, ``None`` disables deduplication.
+    intern_max_length: typing.Optional[int] = 64
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._strings: dict[str, str] = {}
+
+    def construct_scalar(self, node: "yaml.ScalarNode") -> str:  # type: ignore[override]
+        value: str = super().construct_scalar(node)
+        if self.intern_max_length is None or len(value) > self.intern_max_length:
+            return value
+        return self._strings.setdefault(value, value)
+
     def construct_yaml_bool(self, node: "yaml.ScalarNode"):  # type: ignore
         value = self.construct_scalar(node)
         if str(value).lower() not in ("true", "false"):
@@ -28,11 +62,167 @@ class CustomSafeConstructor(yaml.constructor.SafeConstructor):
         return int(value)
 
 
+# Registered once, when the module is imported; loaders can then be created concurrently without
+# modifying shared class state.
+CustomSafeConstructor.add_constructor(
+    "tag:yaml.org,2002:bool", CustomSafeConstructor.construct_yaml_bool
+)  # type: ignore
+CustomSafeConstructor.add_constructor(
+    "tag:yaml.org,2002:int", CustomSafeConstructor.construct_yaml_int
+)  # type: ignore
+
+
 class CustomYamlDumper(yaml.Dumper):
-    def represent_none(self: yaml.Dumper, data: None) -> yaml.ScalarNode:
+    """Dumper of signed playbooks, writing ``None`` as an empty value."""
+
+    def represent_none(
+        self: yaml.representer.BaseRepresenter, data: None
+    ) -> yaml.ScalarNode:
         return self.represent_scalar("tag:yaml.org,2002:null", "")
 
 
+# Registered on the class, dumpers of other code keep writing 'null'
+CustomYamlDumper.add_representer(type(None), CustomYamlDumper.represent_none)
+
+#: Whether PyYAML is built with libyaml, which provides a faster emitter.
+HAS_LIBYAML: bool = getattr(yaml, "__with_libyaml__", False)
+
+if HAS_LIBYAML:
+
+    class CustomYamlCDumper(yaml.CDumper):
+        """Dumper of signed playbooks emitting with libyaml, see :func:`playbook_dumper`."""
+
+    CustomYamlCDumper.add_representer(type(None), CustomYamlDumper.represent_none)
+
+# Default width of the emitters, longer scalars may be folded
+_LINE_WIDTH = 80
+# Longer keys are written as complex keys ('? key') by the Python emitter only
+_LIBYAML_MAX_KEY_LENGTH = 64
+# Longest escape sequence of a double-quoted scalar, '\\UXXXXXXXX'
+_MAX_ESCAPE_LENGTH = 10
+
+
+def _libyaml_safe_key(key: str) -> bool:
+    """Check that both emitters write the key as a simple key, in the same style."""
+    return (
+        0 < len(key) <= _LIBYAML_MAX_KEY_LENGTH and key.isascii() and key.isprintable()
+    )
+
+
+def _libyaml_safe(plays: list) -> bool:
+    """Check that libyaml emits the plays exactly as the Python emitter does.
+
+    The emitters differ in how they fold long scalars that have to be escaped, and in which keys
+    they write as complex keys. Strings of printable ASCII are emitted the same way; other strings
+    are only accepted if, with every character escaped, they still fit on their line. String keys
+    have to be non-empty, short and of printable ASCII.
+    """
+    # Values with their nesting depth and the length of their key
+    stack: list[tuple[typing.Any, int, int]] = [(plays, 0, 0)]
+    while stack:
+        value, depth, key_length = stack.pop()
+        if isinstance(value, str):
+            if value.isascii() and value.isprintable():
+                continue
+            column: int = 2 * depth + key_length + 4
+            if column + _MAX_ESCAPE_LENGTH * len(value) + 2 > _LINE_WIDTH:
+                return False
+        elif isinstance(value, dict):
+            for key, entry in value.items():
+                if isinstance(key, str):
+                    if not _libyaml_safe_key(key):
+                        return False
+                    stack.append((entry, depth + 1, len(key)))
+                else:
+                    stack.append((key, depth + 1, 0))
+                    stack.append((entry, depth + 1, _LIBYAML_MAX_KEY_LENGTH))
+        elif isinstance(value, list):
+            stack.extend((entry, depth + 1, 0) for entry in value)
+    return True
+
+
+def playbook_dumper(plays: list) -> type:
+    """Return the fastest dumper writing the plays exactly as :class:`CustomYamlDumper` does.
+
+    That is :class:`CustomYamlCDumper` if PyYAML is built with libyaml and the emitters agree on
+    the plays, :class:`CustomYamlDumper` otherwise.
+    """
+    if HAS_LIBYAML and _libyaml_safe(plays):
+        return CustomYamlCDumper
+    return CustomYamlDumper
+
+
+def dump_playbook(plays: list, stream: typing.TextIO) -> None:
+    """Write plays into a stream as a YAML sequence, see :func:`playbook_dumper`."""
+    yaml.dump(plays, stream, Dumper=playbook_dumper(plays), sort_keys=False)
+
+
+class PlaybookWriter:
+    """Write plays into a stream as a YAML sequence, one play at a time.
+
+    The output is the same as of ``yaml.dump(plays, stream, Dumper=dumper, sort_keys=False)``, but
+    each play is emitted and flushed as soon as it is written, and the playbook is never kept in
+    memory as a whole. Use as a context manager::
+
+        with PlaybookWriter(sys.stdout) as writer:
+            for play in plays:
+                writer.write(play)
+
+    If the block exits with an exception, a line that is not valid YAML is written instead of the
+    end of the playbook, so the plays written so far cannot be mistaken for a complete playbook.
+    """
+
+    FAILURE_MARKER = "%PLAYBOOK-INCOMPLETE\n"
+
+    def __init__(
+        self, stream: typing.TextIO, dumper: type[yaml.Dumper] = yaml.Dumper
+    ) -> None:
+        self.stream = stream
+        self.dumper = dumper(stream, sort_keys=False)
+
+    def open(self) -> None:
+        self.dumper.open()
+        self.dumper.emit(yaml.DocumentStartEvent(explicit=False))
+        self.dumper.emit(
+            yaml.SequenceStartEvent(
+                anchor=None, tag=None, implicit=True, flow_style=False
+            )
+        )
+
+    def write(self, play: dict) -> None:
+        node: yaml.Node = self.dumper.represent_data(play)
+        self.dumper.anchor_node(node)
+        self.dumper.serialize_node(node, None, None)
+        # Anchors of the next play have to be unique, keep 'last_anchor_id'
+        self.dumper.serialized_nodes = {}
+        self.dumper.anchors = {}
+        self.dumper.represented_objects = {}
+        self.dumper.object_keeper = []
+        self.dumper.alias_key = None
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.dumper.emit(yaml.SequenceEndEvent())
+        self.dumper.emit(yaml.DocumentEndEvent(explicit=False))
+        self.dumper.close()
+        self.dumper.dispose()
+        self.stream.flush()
+
+    # typing.Self available in Python 3.11+
+    def __enter__(self) -> "PlaybookWriter":
+        self.open()
+        return self
+
+    def __exit__(
+        self, exc_type: typing.Optional[type[BaseException]], *_: object
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.stream.write("\n" + self.FAILURE_MARKER)
+            self.stream.flush()
+
+
 class Loader(
     yaml.reader.Reader,
     yaml.scanner.Scanner,
@@ -41,7 +231,28 @@ class Loader(
     CustomSafeConstructor,
     yaml.resolver.Resolver,
 ):
+    """Loader of playbooks, with budgets limiting the resources a document may take.
+
+    The budgets are enforced while the document is composed, before any object is constructed.
+    Aliases are counted with the size of the node they refer to, so the size of the document with
+    all aliases expanded, which is what serializing a play walks, is bounded too. Budgets can be
+    changed by subclassing or by setting the class attributes; ``None`` disables a budget.
+
+    :raises PreconditionError: The document exceeds a budget.
+    """
+
+    #: Largest size of the input, in UTF-8 bytes.
+    max_bytes: typing.Optional[int] = 32 * 1024 * 1024
+    #: Deepest nesting of nodes, a scalar in a top-level list is at depth 2.
+    max_depth: typing.Optional[int] = 128
+    #: Largest number of nodes in the document, not counting aliases.
+    max_nodes: typing.Optional[int] = 1_000_000
+    #: Largest number of nodes added to the document by expanding its aliases.
+    max_alias_expansions: typing.Optional[int] = 100_000
+
     def __init__(self, stream: str):
+        self.check_size(stream)
+
         yaml.reader.Reader.__init__(self, stream)
         yaml.scanner.Scanner.__init__(self)
         yaml.parser.Parser.__init__(self)
@@ -49,12 +260,99 @@ class Loader(
         CustomSafeConstructor.__init__(self)
         yaml.resolver.Resolver.__init__(self)
 
-        type(self).add_constructor(
-            "tag:yaml.org,2002:bool", CustomSafeConstructor.construct_yaml_bool
-        )  # type: ignore
-        type(self).add_constructor(
-            "tag:yaml.org,2002:int", CustomSafeConstructor.construct_yaml_int
-        )  # type: ignore
+        self._depth: int = 0
+        self._nodes: int = 0
+        self._alias_expansions: int = 0
+        # Number of nodes of each anchored node, with aliases expanded
+        self._anchor_sizes: dict[str, int] = {}
+
+    @classmethod
+    def check_size(cls, stream: str) -> None:
+        """Check the size of a document against ``max_bytes``, without loading it.
+
+        :raises PreconditionError: The document is too large.
+        """
+        if cls.max_bytes is None:
+            return
+        # A character takes one to four bytes, only encode when it matters
+        if len(stream) > cls.max_bytes or (
+            len(stream) * 4 > cls.max_bytes
+            and len(stream.encode("utf-8", errors="surrogatepass")) > cls.max_bytes
+        ):
+            raise _budget_exceeded(
+                f"Playbook is larger than {cls.max_bytes} bytes.", None
+            )
+
+    def fetch_flow_collection_start(self, token_class: type) -> None:
+        # The scanner looks ahead over opening brackets, stop it before composition would
+        super().fetch_flow_collection_start(token_class)
+        if self.max_depth is not None and self.flow_level > self.max_depth:
+            raise _budget_exceeded(
+                f"Playbook is nested deeper than {self.max_depth} levels.",
+                self.tokens[-1].start_mark,
+            )
+
+    def compose_node(
+        self, parent: typing.Optional[yaml.Node], index: typing.Any
+    ) -> yaml.Node:
+        event: yaml.NodeEvent = self.peek_event()  # type: ignore[no-untyped-call]
+        if isinstance(event, yaml.AliasEvent):
+            size: typing.Optional[int] = self._anchor_sizes.get(event.anchor or "")
+            if size is None and event.anchor in self.anchors:
+                raise _budget_exceeded(
+                    f"Alias '{event.anchor}' refers to its own node.", event.start_mark
+                )
+            self._alias_expansions += size or 0
+            if (
+                self.max_alias_expansions is not None
+                and self._alias_expansions > self.max_alias_expansions
+            ):
+                raise _budget_exceeded(
+                    f"Aliases expand to more than {self.max_alias_expansions} nodes.",
+                    event.start_mark,
+                )
+            return self._compose_node(parent, index)
+
+        self._nodes += 1
+        if self.max_nodes is not None and self._nodes > self.max_nodes:
+            raise _budget_exceeded(
+                f"Playbook has more than {self.max_nodes} nodes.", event.start_mark
+            )
+        self._depth += 1
+        if self.max_depth is not None and self._depth > self.max_depth:
+            raise _budget_exceeded(
+                f"Playbook is nested deeper than {self.max_depth} levels.",
+                event.start_mark,
+            )
+
+        # Nodes composed so far, with aliases expanded
+        before: int = self._nodes + self._alias_expansions
+        try:
+            node: yaml.Node = self._compose_node(parent, index)
+        finally:
+            self._depth -= 1
+        if event.anchor is not None:
+            self._anchor_sizes[event.anchor] = (
+                self._nodes + self._alias_expansions - before + 1
+            )
+        return node
+
+    def _compose_node(
+        self, parent: typing.Optional[yaml.Node], index: typing.Any
+    ) -> yaml.Node:
+        node: typing.Optional[yaml.Node] = super().compose_node(parent, index)
+        assert node is not None
+        return node
+
+
+def _budget_exceeded(message: str, mark: typing.Any) -> Exception:
+    # The package imports this module, import its exception lazily
+    from rhc_playbook_lib import PreconditionError  # noqa: PLC0415
+
+    if mark is not None:
+        message = f"{message} (line {mark.line + 1}, column {mark.column + 1})"
+    logger.debug(message)
+    return PreconditionError(message)
 
 
 class Serializer:
@@ -100,19 +398,14 @@ class Serializer:
         # new\nline     'new\\nline'
         # tab\tchar     'tab\\tchar'
 
-        special_chars: dict[str, str] = {
-            "\\": "\\\\",
-            "\n": "\\n",
-            "\t": "\\t",
-            "\u200b": "\\u200b",  # Zero-width space
-            "\u200c": "\\u200c",  # Zero-width non-joiner
-            "\u200d": "\\u200d",  # Zero-width joiner
-        }
-        escaped_string: str = ""
-        for char in value:
-            escaped_string += special_chars.get(char, char)
-
-        value = escaped_string
+        for char, escaped in _ESCAPES:
+            if char in value:
+                value = value.replace(char, escaped)
+        if not value.isascii():
+            for char, escaped in _NON_ASCII_ESCAPES:
+                if char in value:
+                    value = value.replace(char, escaped)
+
         quote: str = "'"
         if "'" in value:
             if '"' not in value:
@@ -123,5 +416,85 @@ class Serializer:
         return quote + value + quote
 
 
+# Marks that the item below it on the stack is already serialized text.
+_EMIT = object()
+# Marks that the container below it on the stack has been fully serialized.
+_LEAVE = object()
+
+
+class IterativeSerializer:
+    """Serializer walking the play with an explicit stack instead of recursion.
+
+    The output is identical to :class:`Serializer`, but the depth of the play is not limited by
+    the recursion limit and there is no function call per node.
+    """
+
+    @staticmethod
+    def _push_entries(
+        container: typing.Union[dict, list], push: typing.Callable[[typing.Any], None]
+    ) -> str:
+        """Push the entries of a non-empty container, last one first.
+
+        :returns: The text opening the container.
+        """
+        if isinstance(container, dict):
+            entries = list(container.items())
+            for key, entry in reversed(entries[1:]):
+                push(entry)
+                push(f"), ('{key}', ")
+                push(_EMIT)
+            key, entry = entries[0]
+            push(entry)
+            return f"ordereddict([('{key}', "
+        for entry in reversed(container[1:]):
+            push(entry)
+            push(", ")
+            push(_EMIT)
+        push(container[0])
+        return "["
+
+    @classmethod
+    def serialize(cls, value: typing.Any) -> str:
+        """Serialize the value.
+
+        :raises ValueError: The value contains itself, e.g. through a recursive YAML alias.
+        """
+        parts: list[str] = []
+        append = parts.append
+        stack: list[typing.Any] = [value]
+        push = stack.append
+        pop = stack.pop
+        # Containers that are being serialized, by identity
+        active: set[int] = set()
+
+        while stack:
+            item = pop()
+            if item is _EMIT:
+                append(pop())
+            elif item is _LEAVE:
+                container = pop()
+                active.discard(id(container))
+                append(")])" if isinstance(container, dict) else "]")
+            elif isinstance(item, (dict, list)):
+                if not item:
+                    append("ordereddict()" if isinstance(item, dict) else "[]")
+                    continue
+                if id(item) in active:
+                    raise ValueError("Play contains a recursive structure.")
+                active.add(id(item))
+                push(item)
+                push(_LEAVE)
+                append(cls._push_entries(item, push))
+            elif isinstance(item, int) or isinstance(item, float):
+                append(str(item))
+            elif isinstance(item, str):
+                append(Serializer._str(item))
+            else:
+                logger.debug(f"Value type unknown: {item} {type(item).__name__}")
+                append(f"{item}")
+
+        return "".join(parts)
+
+
 def serialize_play(play: dict) -> str:
-    return Serializer._obj(play)
+    return IterativeSerializer.serialize(play)
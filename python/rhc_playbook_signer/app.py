@@ -2,31 +2,68 @@ import argparse
 import base64
 import contextlib
 import copy
+import functools
+import io
 import logging
 import pathlib
-import subprocess
 import sys
 import tempfile
+import time
 import traceback
 from subprocess import CalledProcessError
-from typing import Optional
+from typing import Callable, Generator, Iterator, Optional
 
 import rhc_playbook_lib as lib
-import yaml
-from rhc_playbook_lib import crypto
-from rhc_playbook_lib.constants import TEMPORARY_DIRECTORY_PREFIX
-from rhc_playbook_lib.serialization import CustomYamlDumper
+from rhc_playbook_lib import crypto, diagnostics, lint, manifest, profiling
+from rhc_playbook_lib.constants import EXIT_TIMEOUT, TEMPORARY_DIRECTORY_PREFIX
+from rhc_playbook_lib.serialization import (
+    CustomYamlDumper,
+    PlaybookWriter,
+    dump_playbook,
+)
 from rhc_playbook_verifier.app import get_version_from_package
 
 logger = logging.getLogger(__name__)
 
+# Seconds a single GPG or signing server call may take, unless set on the command line.
+DEFAULT_TIMEOUT: float = 60.0
+# Attempts of a signing server request, and the delay before the first retry, doubled each time.
+SIGNING_ATTEMPTS: int = 3
+SIGNING_RETRY_DELAY: float = 2.0
+
 
 def send_signing_request(play_digest: bytes, key: str) -> bytes:
     """Use remote signing server to sign the digest.
 
+    Failed and timed out requests are retried up to ``SIGNING_ATTEMPTS`` times in total, with an
+    exponential backoff, unless the retry would not fit before the deadline.
+
     :param play_digest: Hash of a play.
     :param key: Name of the GPG key to use on the remote signing server.
+    :raises CalledProcessError: The last request failed.
+    :raises DeadlineExceeded: The last request timed out, or the deadline has passed.
     """
+    delay: float = SIGNING_RETRY_DELAY
+    attempt: int = 1
+    while True:
+        try:
+            return _send_signing_request(play_digest, key)
+        except (CalledProcessError, crypto.DeadlineExceeded) as exc:
+            remaining: Optional[float] = crypto.remaining_time()
+            if attempt >= SIGNING_ATTEMPTS or (
+                remaining is not None and remaining <= delay
+            ):
+                raise
+            logger.warning(
+                f"Signing request {attempt}/{SIGNING_ATTEMPTS} failed ({exc}), "
+                f"retrying in {delay:.0f} seconds."
+            )
+        time.sleep(delay)
+        delay *= 2
+        attempt += 1
+
+
+def _send_signing_request(play_digest: bytes, key: str) -> bytes:
     logger.info("Requesting play signature from a signing server.")
 
     with tempfile.TemporaryDirectory(prefix=TEMPORARY_DIRECTORY_PREFIX) as temp_dir:
@@ -35,7 +72,7 @@ def send_signing_request(play_digest: bytes, key: str) -> bytes:
         digest_file = temp_path / "digest"
         digest_file.write_bytes(play_digest)
 
-        subprocess.run(
+        crypto.run(
             ["rpm-sign", "--detachsign", "--key", key, "--nat", str(digest_file)],
             check=True,
             capture_output=True,
@@ -44,28 +81,42 @@ def send_signing_request(play_digest: bytes, key: str) -> bytes:
         return (temp_path / "digest.asc").read_bytes()
 
 
-def sign_play_digest(play_digest: bytes, key: pathlib.Path) -> bytes:
+def sign_play_digest(play_digest: bytes, session: crypto.SigningSession) -> bytes:
     """Get the GPG signature of the play digest.
 
     :param play_digest: Hash of a play.
-    :param key: Path to the GPG key to use.
+    :param session: Signing session holding the GPG key to use.
     """
     logger.debug("Signing play.")
 
-    if not key.is_file():
-        raise RuntimeError(f"Key '{key}' does not exist.")
+    try:
+        return session.sign_data(play_digest)
+    except CalledProcessError as err:
+        raise RuntimeError("Could not sign the digest") from err
 
-    with tempfile.TemporaryDirectory(prefix=TEMPORARY_DIRECTORY_PREFIX) as temp_dir:
-        temp_path = pathlib.Path(temp_dir)
 
-        digest_file = temp_path / "digest"
-        digest_file.write_bytes(play_digest)
+@contextlib.contextmanager
+def digest_signer(
+    *,
+    local_key: Optional[pathlib.Path],
+    remote_key: Optional[str],
+) -> Generator[Callable[[bytes], bytes], None, None]:
+    """Prepare signing of play digests, and yield a function that signs a digest.
 
-        try:
-            crypto.sign_file(digest_file, key)
-        except CalledProcessError as err:
-            raise RuntimeError("Could not sign the digest") from err
-        return (temp_path / "digest.asc").read_bytes()
+    A local key is imported once, and all digests are signed in the same signing session.
+
+    :param local_key: Path to private GPG key. Must not be used together with `remote_key`.
+    :param remote_key: Name of remote GPG key. Must not be used together with `local_key`.
+    """
+    if remote_key is not None:
+        yield functools.partial(send_signing_request, key=remote_key)
+    elif local_key is not None:
+        if not local_key.is_file():
+            raise RuntimeError(f"Key '{local_key}' does not exist.")
+        with crypto.SigningSession(local_key) as session:
+            yield functools.partial(sign_play_digest, session=session)
+    else:
+        raise RuntimeError("Either 'remote_key' or 'local_key' must be set.")
 
 
 def sign_revocation_list(
@@ -73,12 +124,15 @@ def sign_revocation_list(
     *,
     local_key: Optional[pathlib.Path],
     remote_key: Optional[str],
+    verify_with: Optional[bytes] = None,
 ) -> None:
     """Sign revocation list.
 
     :param raw_data: A map containing the revocation play references.
     :param local_key: Path to private GPG key. Must not be used together with `remote_key`.
     :param remote_key: Name of remote GPG key. Must not be used together with `local_key`.
+    :param verify_with: Public key to verify the signed revocation list with before it is written,
+        see `self_verify`.
     """
     if len(raw_data) != 1:
         raise RuntimeError("Revocation file must contain exactly one entry.")
@@ -98,20 +152,123 @@ def sign_revocation_list(
     serialized_data: bytes = lib.serialize_play(cleaned_data).encode("utf-8")
     digest: bytes = lib.create_play_digest(serialized_data)
 
-    logger.debug(f"Serialized revocation list as {serialized_data!r}.")
+    diagnostics.log_payload(
+        logger, logging.DEBUG, "Serialized revocation list", serialized_data
+    )
     logger.debug(f"Revocation list digest is '{bytearray(digest).hex()}'.")
 
-    signature: bytes
-    if remote_key is not None:
-        signature = send_signing_request(digest, key=remote_key)
-    elif local_key is not None:
-        signature = sign_play_digest(digest, key=local_key)
-    else:
-        raise RuntimeError("Either 'remote_key' or 'local_key' must be set.")
+    with digest_signer(local_key=local_key, remote_key=remote_key) as sign:
+        signature: bytes = sign(digest)
 
     data["vars"]["insights_signature"] = base64.b64encode(signature)
 
-    yaml.dump([data], sys.stdout, sort_keys=False)
+    _release([data], verify_with=verify_with)
+
+
+def prepare_play(raw_play: dict) -> dict:
+    """Add the fields a signed play has, so that the play can be digested.
+
+    :param raw_play: Play as it was loaded from the file.
+    :returns: Copy of the play, with an empty signature.
+    """
+    play: dict = copy.deepcopy(raw_play)
+
+    if "vars" not in play.keys():
+        logger.debug("Filling in missing 'vars' map.")
+        play["vars"] = {}
+    if "insights_signature_exclude" not in play["vars"].keys():
+        logger.debug("Filling in missing 'insights_signature_exclude' pair.")
+        play["vars"]["insights_signature_exclude"] = "/hosts,/vars/insights_signature"
+
+    if "insights_signature" not in play["vars"].keys():
+        # The 'clean_play' method requires this to be included.
+        # It will be overwritten later.
+        play["vars"]["insights_signature"] = ""
+
+    # Ensure 'tasks' are the last element
+    if "tasks" in play.keys():
+        play["tasks"] = play.pop("tasks")
+    else:
+        raise RuntimeError("Play does not contain key 'tasks'.")
+
+    return play
+
+
+def sign_play(raw_play: dict, *, sign: Callable[[bytes], bytes]) -> dict:
+    """Sign a play.
+
+    :param raw_play: Play as it was loaded from the file.
+    :param sign: Function signing the play digest, see `digest_signer`.
+    :returns: Play with embedded signature.
+    """
+    play_name: str = raw_play.get("name", "???")
+    logger.debug(f"Preparing to sign play {play_name}.")
+    play: dict = prepare_play(raw_play)
+
+    cleaned_play: dict = lib.clean_play(play)
+    serialized_play: bytes = lib.serialize_play(cleaned_play).encode("utf-8")
+    digest: bytes = lib.create_play_digest(serialized_play)
+
+    diagnostics.log_payload(
+        logger, logging.DEBUG, f"Serialized play '{play_name}'", serialized_play
+    )
+    logger.debug(f"Play digest is '{bytearray(digest).hex()}'.")
+
+    signature: bytes = sign(digest)
+    play["vars"]["insights_signature"] = base64.b64encode(signature)
+    return play
+
+
+def _prepare_manifest_play(raw_play: dict) -> dict:
+    """Digest signed plays as they are, and unsigned plays as they would be signed."""
+    if raw_play.get("vars", {}).get("insights_signature"):
+        return raw_play
+    return prepare_play(raw_play)
+
+
+def write_manifest(paths: list[pathlib.Path], jobs: Optional[int] = None) -> None:
+    """Write the digests of all plays in playbook files and directory trees.
+
+    :param paths: Playbook files, or directories to search for playbooks.
+    :param jobs: Number of worker processes, the number of CPUs by default.
+    :raises PreconditionError: A file does not contain plays, or a play cannot be digested; nothing
+        is written then.
+    """
+    files: list[pathlib.Path] = []
+    for path in paths:
+        files += manifest.find_playbooks(path) if path.is_dir() else [path]
+    # All files are digested before anything is written, a bad file must not leave a partial
+    # manifest on the output
+    entries: list[manifest.ManifestEntry] = list(
+        manifest.digest_files(files, prepare=_prepare_manifest_play, jobs=jobs)
+    )
+    count: int = manifest.write_manifest(entries, sys.stdout)
+    logger.info(f"Digested {count} play(s) in {len(files)} playbook(s).")
+
+
+def lint_playbooks(paths: list[pathlib.Path], jobs: Optional[int] = None) -> None:
+    """Check playbooks against the specification, and print the findings.
+
+    :param paths: Playbook files, or directories to search for playbooks.
+    :param jobs: Number of worker processes, the number of CPUs by default.
+    :raises PreconditionError: A playbook violates the specification.
+    """
+    files: list[pathlib.Path] = []
+    for path in paths:
+        files += manifest.find_playbooks(path) if path.is_dir() else [path]
+    errors: int = 0
+    warnings: int = 0
+    for finding in lint.lint_files(files, jobs=jobs):
+        print(finding)
+        errors += finding.severity == lint.ERROR
+        warnings += finding.severity == lint.WARNING
+    logger.info(
+        f"Checked {len(files)} playbook(s): {errors} error(s), {warnings} warning(s)."
+    )
+    if errors:
+        raise lib.PreconditionError(
+            f"Playbooks violate the specification, found {errors} error(s)."
+        )
 
 
 def sign_playbook(
@@ -119,63 +276,103 @@ def sign_playbook(
     *,
     local_key: Optional[pathlib.Path],
     remote_key: Optional[str],
+    stream: bool = False,
+    verify_with: Optional[bytes] = None,
 ) -> None:
     """Sign one or more plays in a playbook.
 
     :param raw_plays: Plays as they were loaded from the file.
     :param local_key: Path to private GPG key. Must not be used together with `remote_key`.
     :param remote_key: Name of remote GPG key. Must not be used together with `local_key`.
+    :param stream: Write each play as soon as it is signed, instead of the whole playbook at once.
+        Must not be used together with `verify_with`.
+    :param verify_with: Public key to verify the signed playbook with before it is written, see
+        `self_verify`.
     """
-    plays: list[dict] = []
-    for i, raw_play in enumerate(raw_plays, 1):
-        play_name: str = raw_play.get("name", "???")
-        logger.debug(f"Preparing to sign play {play_name}.")
-        play: dict = copy.deepcopy(raw_play)
-
-        if "vars" not in play.keys():
-            logger.debug("Filling in missing 'vars' map.")
-            play["vars"] = {}
-        if "insights_signature_exclude" not in play["vars"].keys():
-            logger.debug("Filling in missing 'insights_signature_exclude' pair.")
-            play["vars"]["insights_signature_exclude"] = (
-                "/hosts,/vars/insights_signature"
-            )
+    if stream and verify_with is not None:
+        raise RuntimeError(
+            "Streamed playbooks cannot be verified before they are written."
+        )
+    with digest_signer(local_key=local_key, remote_key=remote_key) as sign:
+        signed_plays: Iterator[dict] = _sign_plays(raw_plays, sign=sign)
+        if stream:
+            # The C emitter only writes its output when it is closed
+            with PlaybookWriter(sys.stdout, dumper=CustomYamlDumper) as writer:
+                for play in signed_plays:
+                    writer.write(play)
+            logger.info("All plays were signed.")
+            return
+
+        plays: list[dict] = list(signed_plays)
 
-        if "insights_signature" not in play["vars"].keys():
-            # The 'clean_play' method requires this to be included.
-            # It will be overwritten later.
-            play["vars"]["insights_signature"] = ""
+    logger.info("All plays were signed.")
+    _release(plays, verify_with=verify_with)
 
-        # Ensure 'tasks' are the last element
-        if "tasks" in play.keys():
-            play["tasks"] = play.pop("tasks")
-        else:
-            raise RuntimeError("Play does not contain key 'tasks'.")
 
-        cleaned_play: dict = lib.clean_play(play)
-        serialized_play: bytes = lib.serialize_play(cleaned_play).encode("utf-8")
-        digest: bytes = lib.create_play_digest(serialized_play)
+def _release(plays: list[dict], *, verify_with: Optional[bytes]) -> None:
+    """Write signed plays to standard output, verifying them first if a public key is given."""
+    if verify_with is None:
+        dump_playbook(plays, sys.stdout)
+        return
+    output = io.StringIO()
+    dump_playbook(plays, output)
+    self_verify(output.getvalue(), verify_with, plays=len(plays))
+    sys.stdout.write(output.getvalue())
 
-        logger.debug(f"Serialized play '{play_name}' as {serialized_play!r}")
-        logger.debug(f"Play digest is '{bytearray(digest).hex()}'.")
 
-        signature: bytes
-        if remote_key is not None:
-            signature = send_signing_request(digest, key=remote_key)
-        elif local_key is not None:
-            signature = sign_play_digest(digest, key=local_key)
-        else:
-            raise RuntimeError("Either 'remote_key' or 'local_key' must be set.")
+def self_verify(document: str, public_key: bytes, *, plays: int) -> None:
+    """Verify signed output in this process, before it is released.
 
-        play["vars"]["insights_signature"] = base64.b64encode(signature)
-        plays.append(play)
-        logger.debug(f"Play {i}/{len(raw_plays)} ('{play_name}'): OK.")
+    The document is parsed again, and the signature of each of its plays is verified with the
+    public key, the way the verifier would check it. All plays are verified in one
+    :class:`~rhc_playbook_lib.VerificationSession`, the key is imported at most once.
 
-    logger.info("All plays were signed.")
-    yaml.dump(plays, sys.stdout, sort_keys=False)
+    :param document: Signed playbook or revocation list, as it would be written.
+    :param public_key: Content of the public half of the signing key.
+    :param plays: Number of plays that were signed.
+    :raises PreconditionError: A play cannot be verified.
+    :raises GPGValidationError: A digest does not match its signature.
+    """
+    logger.info("Verifying signed output.")
+    parsed: list[dict] = lib.parse_playbook(document)
+    if len(parsed) != plays:
+        raise RuntimeError(
+            f"Signed output contains {len(parsed)} plays instead of {plays}."
+        )
+    prepared: list[lib.PreparedPlay] = [lib.prepare_play(play) for play in parsed]
+    with lib.VerificationSession(public_key) as session:
+        for i, play in enumerate(prepared, 1):
+            session.verify(play)
+            logger.debug(f"Play {i}/{plays} ('{play.name}'): verified.")
+    logger.info("All signed plays were verified.")
 
 
-def run() -> None:
+def _self_verify_key(
+    local_key: Optional[pathlib.Path], public_key: Optional[pathlib.Path]
+) -> bytes:
+    """Load the key to verify signed output with, see `self_verify`.
+
+    :param local_key: Path to private GPG key, whose public half is used by default.
+    :param public_key: Path to public GPG key, required with a remote key.
+    """
+    if public_key is not None:
+        return public_key.read_bytes()
+    if local_key is None:
+        raise RuntimeError("A public key is required to verify remotely signed output.")
+    return crypto.export_public_key(local_key)
+
+
+def _sign_plays(
+    raw_plays: list[dict], *, sign: Callable[[bytes], bytes]
+) -> Iterator[dict]:
+    """Sign plays one by one, in order."""
+    for i, raw_play in enumerate(raw_plays, 1):
+        play: dict = sign_play(raw_play, sign=sign)
+        logger.debug(f"Play {i}/{len(raw_plays)} ('{play.get('name', '???')}'): OK.")
+        yield play
+
+
+def _parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--version",
@@ -187,12 +384,18 @@ def run() -> None:
         action="store_true",
         help="Display logs",
     )
+    parser.add_argument(
+        "--debug-artifacts",
+        type=pathlib.Path,
+        metavar="FILE",
+        help="Write large debug payloads to a file instead of the log",
+    )
     parser.add_argument(
         "--revocation-list",
         action="store_true",
         help="Sign revocation list instead of a playbook",
     )
-    keys = parser.add_mutually_exclusive_group(required=True)
+    keys = parser.add_mutually_exclusive_group()
     keys.add_argument(
         "--key",
         type=pathlib.Path,
@@ -203,6 +406,34 @@ def run() -> None:
         type=str,
         help="Name of a key for a remote signing server",
     )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        metavar="SECONDS",
+        help=f"Stop a GPG or signing server call that takes longer (default: {DEFAULT_TIMEOUT:.0f})",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SECONDS",
+        help=f"Abort the whole run if it takes longer, with exit code {EXIT_TIMEOUT}",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write each play as soon as it is signed",
+    )
+    parser.add_argument(
+        "--self-verify",
+        action="store_true",
+        help="Verify the signed output before writing it",
+    )
+    parser.add_argument(
+        "--public-key",
+        type=pathlib.Path,
+        help="Path to public GPG key for --self-verify (default: public half of --key)",
+    )
     playbook = parser.add_mutually_exclusive_group(required=True)
     playbook.add_argument(
         "--playbook",
@@ -214,35 +445,107 @@ def run() -> None:
         action="store_true",
         help="Load playbook from stdin (the default)",
     )
+    playbook.add_argument(
+        "--manifest",
+        type=pathlib.Path,
+        nargs="+",
+        metavar="PATH",
+        help="Print the digest of every play in playbook files or directories, no key is needed",
+    )
+    playbook.add_argument(
+        "--lint",
+        type=pathlib.Path,
+        nargs="+",
+        metavar="PATH",
+        help="Check playbook files or directories against the specification, no key is needed",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        metavar="N",
+        help="Number of processes for --manifest and --lint (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--profile",
+        type=pathlib.Path,
+        help=argparse.SUPPRESS,
+    )
+    parser.add_argument(
+        "--trace-memory",
+        type=pathlib.Path,
+        help=argparse.SUPPRESS,
+    )
+    return parser
+
+
+def run() -> None:
+    parser: argparse.ArgumentParser = _parser()
     args = parser.parse_args()
+    needs_key: bool = args.manifest is None and args.lint is None
+    if needs_key and args.key is None and args.remote_key is None:
+        parser.error("one of the arguments --key --remote-key is required")
+    if args.self_verify and args.stream:
+        parser.error("argument --self-verify: not allowed with argument --stream")
+    if args.self_verify and args.remote_key is not None and args.public_key is None:
+        parser.error(
+            "argument --self-verify: --public-key is required with --remote-key"
+        )
+    diagnostics.configure(args.debug_artifacts)
+    crypto.configure_timeouts(args.timeout, args.deadline)
+
+    with profiling.session(args.profile, args.trace_memory):
+        sign(args)
 
-    # Configure YAML to handle None values
-    yaml.add_representer(type(None), CustomYamlDumper.represent_none)
+
+def sign(args: argparse.Namespace) -> None:
+    """Sign the playbook, write the manifest, or lint the playbooks given on the command line."""
+    if args.manifest is not None:
+        with profiling.stage("manifest"):
+            return write_manifest(args.manifest, jobs=args.jobs)
+    if args.lint is not None:
+        with profiling.stage("lint"):
+            return lint_playbooks(args.lint, jobs=args.jobs)
 
     # Load playbook to sign
     raw_playbook: str = ""
-    if args.stdin:
-        with contextlib.suppress(KeyboardInterrupt):
-            raw_playbook = sys.stdin.read()
-    else:
-        raw_playbook = args.playbook.read_text()
+    with profiling.stage("read playbook"):
+        if args.stdin:
+            with contextlib.suppress(KeyboardInterrupt):
+                raw_playbook = sys.stdin.read()
+        else:
+            raw_playbook = args.playbook.read_text()
     if len(raw_playbook) == 0:
         logger.error("Received empty playbook.")
         raise RuntimeError("Received empty playbook.")
 
     # Load plays
-    raw_plays: list[dict] = lib.parse_playbook(raw_playbook)
+    with profiling.stage("parse"):
+        raw_plays: list[dict] = lib.parse_playbook(raw_playbook)
     if not raw_plays:
         raise lib.PreconditionError("Playbook contains no plays.")
 
-    if args.revocation_list:
-        logger.info("Signing revocation list.")
-        return sign_revocation_list(
-            raw_plays, local_key=args.key, remote_key=args.remote_key
-        )
+    with profiling.stage("sign"):
+        verify_with: Optional[bytes] = None
+        if args.self_verify:
+            verify_with = _self_verify_key(args.key, args.public_key)
+
+        if args.revocation_list:
+            logger.info("Signing revocation list.")
+            return sign_revocation_list(
+                raw_plays,
+                local_key=args.key,
+                remote_key=args.remote_key,
+                verify_with=verify_with,
+            )
 
-    logger.debug(f"Playbook contains {len(raw_plays)} plays.")
-    return sign_playbook(raw_plays, local_key=args.key, remote_key=args.remote_key)
+        logger.debug(f"Playbook contains {len(raw_plays)} plays.")
+        return sign_playbook(
+            raw_plays,
+            local_key=args.key,
+            remote_key=args.remote_key,
+            stream=args.stream,
+            verify_with=verify_with,
+        )
 
 
 def main() -> None:
@@ -251,6 +554,13 @@ def main() -> None:
 
     try:
         run()
+    except crypto.DeadlineExceeded as exc:
+        logger.critical("Ran out of time, aborting.")
+        if debug:
+            traceback.print_exc()
+        else:
+            print(exc)
+        sys.exit(EXIT_TIMEOUT)
     except Exception as exc:
         logger.critical("Unhandled exception occurred, aborting.")
         if debug:
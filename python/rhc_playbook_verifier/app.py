@@ -6,11 +6,21 @@ import pathlib
 import pkgutil
 import sys
 import traceback
+from typing import Iterator, Optional, Union
 
 import rhc_playbook_lib as lib
+from rhc_playbook_lib import crypto, diagnostics, profiling
+from rhc_playbook_lib.cache import DigestCache
+from rhc_playbook_lib.constants import EXIT_TIMEOUT
+from rhc_playbook_lib.keyring import Keyring
+
+from rhc_playbook_verifier import audit, metrics
 
 logger = logging.getLogger(__name__)
 
+# Seconds a single GPG call may take, unless set on the command line.
+DEFAULT_TIMEOUT: float = 60.0
+
 
 def read_revocation_playbook_from_package() -> str:
     """Read revocation playbook content saved in the package."""
@@ -30,6 +40,19 @@ def get_gpg_key_from_package() -> bytes:
     return data
 
 
+def load_gpg_keys(paths: Optional[list[pathlib.Path]]) -> Union[bytes, Keyring]:
+    """Read the public GPG keys to verify the plays with.
+
+    A single key is used as it is, several keys are indexed in a keyring.
+    """
+    if not paths:
+        return get_gpg_key_from_package()
+    if len(paths) == 1:
+        return paths[0].read_bytes()
+    logger.debug(f"Trusting {len(paths)} GPG keys.")
+    return Keyring(path.read_bytes() for path in paths)
+
+
 def get_version_from_package() -> str:
     """Read the package metadata to obtain version."""
     try:
@@ -39,7 +62,7 @@ def get_version_from_package() -> str:
     return version
 
 
-def run() -> None:
+def _parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--version",
@@ -51,10 +74,17 @@ def run() -> None:
         action="store_true",
         help="Display logs",
     )
+    parser.add_argument(
+        "--debug-artifacts",
+        type=pathlib.Path,
+        metavar="FILE",
+        help="Write large debug payloads to a file instead of the log",
+    )
     parser.add_argument(
         "--key",
         type=pathlib.Path,
-        help="Path to custom GPG key to verify against",
+        action="append",
+        help="Path to custom GPG key to verify against, repeat to accept any of several keys",
     )
     playbook = parser.add_mutually_exclusive_group(required=True)
     playbook.add_argument(
@@ -67,61 +97,172 @@ def run() -> None:
         action="store_true",
         help="Load playbook from stdin (the default)",
     )
+    playbook.add_argument(
+        "--audit",
+        type=pathlib.Path,
+        metavar="DIR",
+        help="Verify all playbooks in a directory tree and print a JSON Lines report",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        metavar="N",
+        help="Number of processes verifying playbooks in audit mode (default: number of CPUs)",
+    )
     parser.add_argument(
         "--revocation-list",
         type=pathlib.Path,
         help=argparse.SUPPRESS,
     )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        metavar="SECONDS",
+        help=f"Stop a GPG call that takes longer (default: {DEFAULT_TIMEOUT:.0f})",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SECONDS",
+        help=f"Abort the whole run if it takes longer, with exit code {EXIT_TIMEOUT}",
+    )
+    parser.add_argument(
+        "--gpg-backend",
+        choices=crypto.BACKENDS,
+        default="auto",
+        help="Verify signatures with gpg, or with gpgv and no GPG agent (default: gpgv if installed)",
+    )
+    parser.add_argument(
+        "--cache",
+        type=pathlib.Path,
+        metavar="DIR",
+        help="Cache digests of verified plays in a directory writable only by its owner",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=pathlib.Path,
+        metavar="FILE",
+        help="Add counts and durations of the run to a Prometheus textfile collector file",
+    )
+    parser.add_argument(
+        "--profile",
+        type=pathlib.Path,
+        help=argparse.SUPPRESS,
+    )
+    parser.add_argument(
+        "--trace-memory",
+        type=pathlib.Path,
+        help=argparse.SUPPRESS,
+    )
+    return parser
+
+
+def run() -> None:
+    parser: argparse.ArgumentParser = _parser()
     args = parser.parse_args()
+    if args.audit is not None and args.cache is not None:
+        parser.error("argument --cache: not allowed with argument --audit")
+    if args.audit is not None and args.metrics_file is not None:
+        parser.error("argument --metrics-file: not allowed with argument --audit")
+    diagnostics.configure(args.debug_artifacts)
+    crypto.configure_timeouts(args.timeout, args.deadline)
+    crypto.configure_backend(args.gpg_backend)
+
+    with profiling.session(args.profile, args.trace_memory):
+        with metrics.session(args.metrics_file):
+            verify(args)
+
+
+@contextlib.contextmanager
+def _stage(name: str) -> Iterator[None]:
+    """Mark a stage of the run for profiling and metrics."""
+    with profiling.stage(name), metrics.stage(name):
+        yield
+
+
+def verify(args: argparse.Namespace) -> None:
+    """Verify the playbook, or audit the directory, given on the command line."""
+    # Load public GPG keys
+    with _stage("keys"):
+        gpg_key: Union[bytes, Keyring] = load_gpg_keys(args.key)
+
+    # Load revocation list; its signature is verified while the playbook is read and parsed
+    revocation_list: lib.RevocationList
+    with profiling.stage("revocation list"):
+        if args.revocation_list is None:
+            logger.debug("Using packaged play revocation list.")
+            revocation_list = lib.RevocationList(
+                read_revocation_playbook_from_package(), gpg_key
+            )
+        else:
+            logger.debug(
+                f"Using custom revocation list '{args.revocation_list.absolute()}'."
+            )
+            revocation_list = lib.RevocationList(
+                args.revocation_list.read_text(), gpg_key
+            )
+
+    try:
+        _verify(args, gpg_key, revocation_list)
+    finally:
+        # The stage includes the verification in the background, whichever stage waited for it
+        if revocation_list.seconds is not None:
+            metrics.observe_stage("revocation list", revocation_list.seconds)
 
-    # Load public GPG key
-    gpg_key: bytes = args.key.read_bytes() if args.key else get_gpg_key_from_package()
-
-    digests: set[bytes]
-    # Load digests of revoked plays
-    if args.revocation_list is None:
-        logger.debug("Using packaged play revocation list.")
-        digests = lib.get_revocation_digests(
-            playbook=read_revocation_playbook_from_package(),
-            gpg_key=gpg_key,
-        )
-    else:
-        logger.debug(
-            f"Using custom revocation list '{args.revocation_list.absolute()}'."
-        )
-        digests = lib.get_revocation_digests(
-            playbook=args.revocation_list.read_text(),
-            gpg_key=gpg_key,
-        )
-    logger.debug("Revocation digests obtained, can proceed to verification.")
+
+def _verify(
+    args: argparse.Namespace,
+    gpg_key: Union[bytes, Keyring],
+    revocation_list: lib.RevocationList,
+) -> None:
+    """Verify the playbook, or audit the directory, once the revocation list is loaded."""
+    if args.audit is not None:
+        with _stage("audit"):
+            valid: bool = audit.write_report(
+                audit.audit(
+                    args.audit,
+                    gpg_key,
+                    revocation_list,
+                    jobs=args.jobs,
+                    timeout=args.timeout,
+                ),
+                sys.stdout,
+            )
+        sys.exit(0 if valid else 1)
 
     # Load playbook with plays to verify
     raw_playbook: str
-    if args.stdin:
-        with contextlib.suppress(KeyboardInterrupt):
-            raw_playbook = sys.stdin.read()
-    else:
-        raw_playbook = pathlib.Path(args.playbook).read_text()
+    with _stage("read playbook"):
+        if args.stdin:
+            with contextlib.suppress(KeyboardInterrupt):
+                raw_playbook = sys.stdin.read()
+        else:
+            raw_playbook = pathlib.Path(args.playbook).read_text()
     if len(raw_playbook) == 0:
         logger.error("Received empty playbook.")
         raise RuntimeError("Received empty playbook.")
+    metrics.add_playbook(raw_playbook)
 
-    # Load plays
-    plays: list[dict] = lib.parse_playbook(raw_playbook)
-    if not plays:
-        raise lib.PreconditionError("Playbook contains no plays.")
-    logger.debug(f"Playbook contains {len(plays)} play(s).")
-
-    # Verify plays
-    for i, play in enumerate(plays, 1):
-        play_name: str = play.get("name", "???")
-        digest: bytes = lib.verify_play(play, gpg_key=gpg_key)
-        if digest in digests:
-            raise RuntimeError(
-                f"Digest of play '{play_name}' is on revocation list: '{bytearray(digest).hex()}'."
+    # Verify plays; all plays are checked against the revocation list before any GPG call for them
+    verified: list[tuple[str, bytes]]
+    with _stage("verify"):
+        if args.cache is None:
+            verified = lib.verify_playbook(
+                raw_playbook, gpg_key=gpg_key, revocation_list=revocation_list
             )
         else:
-            logger.debug(f"Play {i}/{len(plays)} ('{play_name}'): OK.")
+            logger.debug(f"Using digest cache in '{args.cache.absolute()}'.")
+            with DigestCache(args.cache) as cache:
+                verified = lib.verify_playbook(
+                    raw_playbook,
+                    gpg_key=gpg_key,
+                    cache=cache,
+                    revocation_list=revocation_list,
+                )
+    metrics.add_plays(len(verified))
+    for i, (play_name, _) in enumerate(verified, 1):
+        logger.debug(f"Play {i}/{len(verified)} ('{play_name}'): OK.")
 
     logger.info("All plays are OK.")
     print(raw_playbook)
@@ -133,6 +274,13 @@ def main() -> None:
 
     try:
         run()
+    except crypto.DeadlineExceeded as exc:
+        logger.critical("Ran out of time, aborting.")
+        if debug:
+            traceback.print_exc()
+        else:
+            print(exc)
+        sys.exit(EXIT_TIMEOUT)
     except Exception as exc:
         logger.critical("Unhandled exception occurred, aborting.")
         if debug:
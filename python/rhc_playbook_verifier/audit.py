@@ -0,0 +1,164 @@
+"""Verification of a whole catalogue of stored playbooks, see ``rhc-playbook-verifier --audit``.
+
+The key and the revocation list are loaded and verified once. Playbook files are then verified in a
+pool of worker processes, every play of every file is verified even after a failure, and the
+outcome is written as a JSON Lines report: one record per play, followed by one record for its
+file. Play records carry the index of the play in ``play``, file records the number of plays in
+``plays``. A file that could not be read or composed only has its file record.
+"""
+
+import concurrent.futures
+import functools
+import json
+import logging
+import pathlib
+import time
+from collections.abc import Iterable, Iterator
+from typing import Any, Optional, TextIO, Union
+
+import rhc_playbook_lib as lib
+from rhc_playbook_lib import crypto
+from rhc_playbook_lib.keyring import Keyring
+from rhc_playbook_lib.manifest import find_playbooks
+
+logger = logging.getLogger(__name__)
+
+
+def _error_name(exc: Exception) -> str:
+    cls: type = type(exc)
+    if cls.__module__ == "builtins":
+        return cls.__qualname__
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _error_fields(exc: Optional[Exception]) -> dict[str, Any]:
+    if exc is None:
+        return {"status": "ok", "error": None, "message": None}
+    message: str = exc.message if isinstance(exc, lib.GPGValidationError) else str(exc)
+    return {"status": "failed", "error": _error_name(exc), "message": message}
+
+
+def audit_file(
+    path: pathlib.Path,
+    directory: pathlib.Path,
+    gpg_key: Union[bytes, Keyring],
+    revoked: set[bytes],
+) -> list[dict[str, Any]]:
+    """Verify all plays of a playbook file.
+
+    :param path: The playbook file.
+    :param directory: Directory the file path is reported relative to.
+    :param gpg_key: Content of public GPG key, or a keyring of trusted keys.
+    :param revoked: Verified digests of revoked plays.
+    :returns: Report records of the plays, followed by the record of the file.
+    """
+    name: str = str(path.relative_to(directory))
+    start: float = time.perf_counter()
+    try:
+        results: list[lib.PlayResult] = lib.verify_plays(
+            path.read_text(), gpg_key, revoked
+        )
+    except Exception as exc:
+        logger.debug(f"Playbook '{name}' could not be verified: {exc!r}")
+        return [
+            {
+                "file": name,
+                "plays": 0,
+                **_error_fields(exc),
+                "seconds": round(time.perf_counter() - start, 6),
+            }
+        ]
+
+    records: list[dict[str, Any]] = [
+        {
+            "file": name,
+            "play": i,
+            # YAML may construct other types than strings, e.g. dates
+            "name": str(result.name) if result.name is not None else None,
+            "digest": result.digest.hex() if result.digest is not None else None,
+            **_error_fields(result.error),
+            "seconds": round(result.seconds, 6),
+        }
+        for i, result in enumerate(results, 1)
+    ]
+    failed: list[dict[str, Any]] = [r for r in records if r["status"] != "ok"]
+    record: dict[str, Any] = {
+        "file": name,
+        "plays": len(results),
+        **_error_fields(None),
+    }
+    if failed:
+        record.update(
+            status="failed",
+            error=failed[0]["error"],
+            message=f"{len(failed)} of {len(results)} play(s) failed",
+        )
+    record["seconds"] = round(time.perf_counter() - start, 6)
+    records.append(record)
+    return records
+
+
+def audit(
+    directory: pathlib.Path,
+    gpg_key: Union[bytes, Keyring],
+    revocation_list: lib.RevocationList,
+    jobs: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Iterator[list[dict[str, Any]]]:
+    """Verify all playbooks in a directory tree.
+
+    :param directory: Directory to search for playbooks.
+    :param gpg_key: Content of public GPG key, or a keyring of trusted keys.
+    :param revocation_list: Revocation list; it is verified before any playbook.
+    :param jobs: Number of worker processes, the number of CPUs by default.
+    :param timeout: Seconds a single GPG call may take in the workers. The deadline configured with
+        :func:`rhc_playbook_lib.crypto.configure_timeouts` and the verification backend apply to
+        the workers too.
+    :raises GPGValidationError: The revocation list failed verification.
+    :returns: Report records of each playbook, see :func:`audit_file`, in the order of the files.
+    """
+    revoked: set[bytes] = revocation_list.wait()
+    paths: list[pathlib.Path] = find_playbooks(directory)
+    logger.info(f"Auditing {len(paths)} playbook(s) in '{directory}'.")
+
+    worker = functools.partial(
+        audit_file, directory=directory, gpg_key=gpg_key, revoked=revoked
+    )
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_configure_worker,
+        initargs=(
+            timeout,
+            crypto.remaining_time(),
+            "gpgv" if crypto.use_gpgv() else "gpg",
+        ),
+    ) as executor:
+        yield from executor.map(worker, paths)
+
+
+def _configure_worker(
+    timeout: Optional[float], deadline: Optional[float], backend: str
+) -> None:
+    crypto.configure_timeouts(timeout, deadline)
+    crypto.configure_backend(backend)
+
+
+def write_report(files: Iterable[list[dict[str, Any]]], output: TextIO) -> bool:
+    """Write report records as JSON Lines, as soon as each playbook is verified.
+
+    :returns: Whether all plays of all playbooks are valid.
+    """
+    valid: bool = True
+    count: int = 0
+    for records in files:
+        for record in records:
+            output.write(json.dumps(record) + "\n")
+        output.flush()
+        count += 1
+        if records[-1]["status"] != "ok":
+            valid = False
+            logger.warning(
+                f"Playbook '{records[-1]['file']}' failed: {records[-1]['message']}"
+            )
+    logger.info(f"Audited {count} playbook(s).")
+    return valid
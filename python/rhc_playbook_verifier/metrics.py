@@ -0,0 +1,213 @@
+"""Prometheus metrics of verifier runs, for the textfile collector of the node exporter.
+
+Enabled with ``rhc-playbook-verifier --metrics-file FILE.prom``. Each run adds its counts to the
+file: runs by result, failures by reason, plays verified, bytes of playbooks, and histograms of the
+duration of the run and its stages. The file is read, updated and atomically replaced under an
+exclusive lock of ``FILE.prom.lock``, so concurrent runs do not lose updates and the collector never
+reads a partial file.
+"""
+
+import contextlib
+import fcntl
+import logging
+import os
+import pathlib
+import tempfile
+import time
+from typing import Iterator, Optional, TextIO
+
+import rhc_playbook_lib as lib
+from rhc_playbook_lib import crypto
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "rhc_playbook_verifier"
+# Upper bounds of histogram buckets, in seconds; the defaults of Prometheus client libraries
+BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Type and help of each metric family, in the order they are written
+FAMILIES: dict[str, tuple[str, str]] = {
+    "runs_total": ("counter", "Verifier runs, by result."),
+    "failures_total": ("counter", "Failed verifier runs, by reason."),
+    "plays_verified_total": ("counter", "Plays whose signature was verified."),
+    "playbook_bytes_total": ("counter", "Bytes of playbooks read for verification."),
+    "duration_seconds": ("histogram", "Duration of verifier runs and of their stages."),
+}
+_HISTOGRAM_SUFFIXES: tuple[str, ...] = ("_bucket", "_sum", "_count")
+
+
+def failure_reason(exc: BaseException) -> str:
+    """Classify the exception a run failed with."""
+    if isinstance(exc, lib.PlayRevokedError):
+        return "revoked"
+    if isinstance(
+        exc, (lib.PreconditionError, lib.GPGValidationError, crypto.DeadlineExceeded)
+    ):
+        return type(exc).__name__
+    return "other"
+
+
+def _series(name: str, **labels: str) -> str:
+    if not labels:
+        return f"{PREFIX}_{name}"
+    pairs: str = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return f"{PREFIX}_{name}{{{pairs}}}"
+
+
+def _family(series: str) -> Optional[str]:
+    """Return the metric family of a series, or ``None`` if it is not one of ``FAMILIES``."""
+    if not series.startswith(f"{PREFIX}_"):
+        return None
+    name: str = series.split("{", 1)[0][len(PREFIX) + 1 :]
+    if name in FAMILIES:
+        return name
+    for suffix in _HISTOGRAM_SUFFIXES:
+        base: str = name[: -len(suffix)]
+        if name.endswith(suffix) and FAMILIES.get(base, ("",))[0] == "histogram":
+            return base
+    return None
+
+
+class Run:
+    """Counts of a single run, added to the file when the run ends."""
+
+    def __init__(self) -> None:
+        self.samples: dict[str, float] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        series: str = _series(name, **labels)
+        self.samples[series] = self.samples.get(series, 0.0) + float(value)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        for bound in BUCKETS:
+            self.inc(f"{name}_bucket", int(value <= bound), **labels, le=str(bound))
+        self.inc(f"{name}_bucket", 1, **labels, le="+Inf")
+        self.inc(f"{name}_sum", value, **labels)
+        self.inc(f"{name}_count", 1, **labels)
+
+
+def read_samples(path: pathlib.Path) -> dict[str, float]:
+    """Read the samples of a metrics file written by :func:`write_samples`.
+
+    Samples of unknown metrics and malformed lines are dropped.
+    """
+    samples: dict[str, float] = {}
+    try:
+        text: str = path.read_text()
+    except FileNotFoundError:
+        return samples
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        series, _, value = line.rpartition(" ")
+        if _family(series) is None:
+            continue
+        try:
+            samples[series] = float(value)
+        except ValueError:
+            logger.debug(f"Dropping malformed metrics line '{line}'.")
+    return samples
+
+
+def write_samples(samples: dict[str, float], output: TextIO) -> None:
+    """Write samples in the Prometheus text format, grouped by family."""
+    families: dict[str, list[str]] = {name: [] for name in FAMILIES}
+    for series in samples:
+        family: Optional[str] = _family(series)
+        if family is not None:
+            families[family].append(series)
+    for name, series_list in families.items():
+        if not series_list:
+            continue
+        kind, description = FAMILIES[name]
+        output.write(f"# HELP {PREFIX}_{name} {description}\n")
+        output.write(f"# TYPE {PREFIX}_{name} {kind}\n")
+        for series in series_list:
+            value: float = samples[series]
+            number: str = str(int(value)) if value.is_integer() else repr(value)
+            output.write(f"{series} {number}\n")
+
+
+def update(path: pathlib.Path, run: Run) -> None:
+    """Add the counts of a run to a metrics file, atomically."""
+    with open(path.with_name(f"{path.name}.lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        samples: dict[str, float] = read_samples(path)
+        for series, value in run.samples.items():
+            samples[series] = samples.get(series, 0) + value
+
+        # The collector only reads files ending with '.prom'
+        fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "w") as output:
+                write_samples(samples, output)
+            os.chmod(temp, 0o644)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+
+_run: Optional[Run] = None
+
+
+@contextlib.contextmanager
+def session(path: Optional[pathlib.Path]) -> Iterator[None]:
+    """Count the run in the context, and add it to the metrics file when it exits.
+
+    Failing to update the file is logged, it does not fail the run.
+
+    :param path: The metrics file, or ``None`` to disable metrics.
+    """
+    global _run  # noqa: PLW0603
+    if path is None:
+        yield
+        return
+    _run = run = Run()
+    start: float = time.perf_counter()
+    result: str = "ok"
+    try:
+        yield
+    except BaseException as exc:
+        result = "failed"
+        run.inc("failures_total", reason=failure_reason(exc))
+        raise
+    finally:
+        _run = None
+        run.inc("runs_total", result=result)
+        run.observe("duration_seconds", time.perf_counter() - start, stage="run")
+        try:
+            update(path, run)
+        except OSError as exc:
+            logger.warning(f"Could not update metrics file '{path}': {exc}")
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Measure the duration of a stage of the run; this does nothing without metrics."""
+    run: Optional[Run] = _run
+    if run is None:
+        yield
+        return
+    start: float = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.observe("duration_seconds", time.perf_counter() - start, stage=name)
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    """Count the duration of a stage that was measured elsewhere, e.g. in a background thread."""
+    if _run is not None:
+        _run.observe("duration_seconds", seconds, stage=name)
+
+
+def add_plays(count: int) -> None:
+    """Count verified plays."""
+    if _run is not None:
+        _run.inc("plays_verified_total", count)
+
+
+def add_playbook(playbook: str) -> None:
+    """Count the bytes of a playbook read for verification."""
+    if _run is not None:
+        _run.inc("playbook_bytes_total", len(playbook.encode("utf-8")))
@@ -10,6 +10,8 @@ from types import TracebackType
 from typing import Literal, Optional
 from unittest import TestCase
 
+import yaml
+
 
 class PlaybookTestCase(TestCase):
     """Execute ``rhc-playbook-signer --playbook=...``."""
@@ -59,7 +61,150 @@ class PlaybookTestCase(TestCase):
                 verified_playbook = self._verify_playbook(playbook, rev_list_out_path)
                 self.assertEqual(playbook.strip(), verified_playbook.strip())
 
-    def _sign_rev_list(self, rev_list: str) -> str:
+    def test_stream(self) -> None:
+        """Sign a playbook play by play, and verify it."""
+        data_dir = Path(__file__).parents[3].absolute() / "data"
+        with NamedTemporaryFile(
+            mode="xt", prefix="rev-list-", suffix=".yml", delete=False
+        ) as rev_list_out_fd:
+            rev_list_out_path = Path(rev_list_out_fd.name)
+            self.stack.callback(rev_list_out_path.unlink)
+            rev_list_out_fd.write(
+                self._sign_rev_list((data_dir / "revoked_playbooks.yml").read_text())
+            )
+
+        playbook = self._sign_playbook(
+            (data_dir / "playbooks" / "bugs.yml").read_text(), "--stream"
+        )
+        verified_playbook = self._verify_playbook(playbook, rev_list_out_path)
+        self.assertEqual(playbook.strip(), verified_playbook.strip())
+
+    def test_self_verify(self) -> None:
+        """Signed output is verified before it is written."""
+        data_dir = Path(__file__).parents[3].absolute() / "data"
+        rev_list: str = self._sign_rev_list(
+            (data_dir / "revoked_playbooks.yml").read_text(), "--self-verify"
+        )
+        self.assertIn("revoked_playbooks", rev_list)
+        for playbook_path in (
+            data_dir / "playbooks" / "bugs.yml",
+            data_dir / "playbooks-unsigned" / "sample.yml",
+        ):
+            with self.subTest(playbook_path=playbook_path):
+                playbook = self._sign_playbook(
+                    playbook_path.read_text(),
+                    "--self-verify",
+                    "--public-key",
+                    str(self.key_pair.pubkey_path),
+                )
+                self.assertEqual(
+                    len(yaml.safe_load(playbook)),
+                    len(yaml.safe_load(playbook_path.read_text())),
+                )
+
+        # Signatures made by the test key do not verify with the Red Hat key
+        proc = subprocess.run(
+            [
+                "rhc-playbook-signer",
+                "--stdin",
+                "--key",
+                self.key_pair.privkey_path,
+                "--self-verify",
+                "--public-key",
+                data_dir / "public.gpg",
+            ],
+            input=(data_dir / "playbooks-unsigned" / "sample.yml").read_text(),
+            capture_output=True,
+            text=True,
+            check=False,
+            env={**os.environ, "LC_ALL": "C.UTF-8"},
+        )
+        self.assertEqual(proc.returncode, 1)
+        self.assertNotIn("insights_signature:", proc.stdout)
+        self.assertIn("does not match its signature", proc.stdout)
+
+    def test_manifest(self) -> None:
+        """Unsigned plays have the digest they are signed with, no key is needed."""
+        data_dir = Path(__file__).parents[3].absolute() / "data"
+        unsigned_path = data_dir / "playbooks-unsigned" / "sample.yml"
+        with NamedTemporaryFile(
+            mode="xt", prefix="signed-", suffix=".yml", delete=False
+        ) as signed_fd:
+            signed_path = Path(signed_fd.name)
+            self.stack.callback(signed_path.unlink)
+            signed_fd.write(self._sign_playbook(unsigned_path.read_text()))
+
+        proc = subprocess.run(
+            [
+                "rhc-playbook-signer",
+                "--manifest",
+                unsigned_path,
+                signed_path,
+                data_dir / "playbooks",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, "LC_ALL": "C.UTF-8"},
+        )
+        items: list[dict] = yaml.safe_load(proc.stdout)
+        self.assertEqual(items[0]["hash"], items[1]["hash"])
+        self.assertEqual(
+            [item["file"] for item in items[:2]], [str(unsigned_path), str(signed_path)]
+        )
+        digest: bytes = (
+            data_dir / "playbooks" / "insights_remove.digest.bin"
+        ).read_bytes()
+        self.assertIn(digest.hex(), [item["hash"] for item in items])
+
+    def test_manifest_error(self) -> None:
+        """Nothing is written when a file cannot be digested."""
+        data_dir = Path(__file__).parents[3].absolute() / "data"
+        with NamedTemporaryFile(mode="xt", prefix="bad-", suffix=".yml") as bad_fd:
+            bad_fd.write("- name: play without tasks\n")
+            bad_fd.flush()
+            proc = subprocess.run(
+                [
+                    "rhc-playbook-signer",
+                    "--manifest",
+                    data_dir / "playbooks" / "insights_remove.yml",
+                    bad_fd.name,
+                ],
+                capture_output=True,
+                text=True,
+                check=False,
+                env={**os.environ, "LC_ALL": "C.UTF-8"},
+            )
+        self.assertEqual(proc.returncode, 1)
+        self.assertNotIn("hash:", proc.stdout)
+        self.assertIn("Cannot digest", proc.stdout + proc.stderr)
+
+    def test_lint(self) -> None:
+        """Violations of the specification are reported, no key is needed."""
+        data_dir = Path(__file__).parents[3].absolute() / "data"
+        proc = subprocess.run(
+            ["rhc-playbook-signer", "--lint", data_dir, "--jobs", "2"],
+            capture_output=True,
+            text=True,
+            check=False,
+            env={**os.environ, "LC_ALL": "C.UTF-8"},
+        )
+        self.assertEqual(proc.returncode, 1)
+        self.assertIn(
+            f"{data_dir / 'playbooks' / 'unicode.yml'}:32:15: error: ", proc.stdout
+        )
+        self.assertNotIn("insights_remove.yml:8", proc.stdout)
+
+        proc = subprocess.run(
+            ["rhc-playbook-signer", "--lint", data_dir / "playbooks" / "bugs.yml"],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, "LC_ALL": "C.UTF-8"},
+        )
+        self.assertEqual(proc.stdout, "")
+
+    def _sign_rev_list(self, rev_list: str, *args: str) -> str:
         """Sign the given revocation list."""
         proc = subprocess.run(
             [
@@ -69,6 +214,7 @@ class PlaybookTestCase(TestCase):
                 "--key",
                 self.key_pair.privkey_path,
                 "--debug",
+                *args,
             ],
             input=rev_list,
             capture_output=True,
@@ -78,7 +224,7 @@ class PlaybookTestCase(TestCase):
         )
         return proc.stdout
 
-    def _sign_playbook(self, playbook: str) -> str:
+    def _sign_playbook(self, playbook: str, *args: str) -> str:
         """Sign the given playbook, and return stdout."""
         proc = subprocess.run(
             [
@@ -87,6 +233,7 @@ class PlaybookTestCase(TestCase):
                 "--key",
                 self.key_pair.privkey_path,
                 "--debug",
+                *args,
             ],
             input=playbook,
             capture_output=True,
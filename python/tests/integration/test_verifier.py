@@ -1,8 +1,11 @@
 """Tests for the ``rhc-playbook-verifier`` executable."""
 
+import json
 import os
+import shutil
 import subprocess
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from typing import ClassVar
 from unittest import TestCase
 
@@ -32,6 +35,23 @@ class PlaybookTestCase(TestCase):
                 playbook_content: str = playbook_path.read_text()
                 self.assertEqual(result.stdout.strip(), playbook_content.strip())
 
+    def test_several_keys(self) -> None:
+        """Accept plays signed by any of the given keys."""
+        playbook_path = self.data_dir / "playbooks" / "bugs.yml"
+        key_path = self.data_dir / "public.gpg"
+        result = self._verify_playbook(
+            playbook_path, "--key", str(key_path), "--key", str(key_path)
+        )
+        self.assertEqual(result.returncode, 0, result.stderr.strip())
+        self.assertIn("Signature was made by GPG key", result.stderr)
+
+    def test_deadline(self) -> None:
+        """Abort with a distinct exit code when out of time."""
+        playbook_path = self.data_dir / "playbooks" / "insights_remove.yml"
+        result = self._verify_playbook(playbook_path, "--deadline", "0")
+        self.assertEqual(result.returncode, 124, result.stderr.strip())
+        self.assertIn("DeadlineExceeded", result.stderr)
+
     def test_invalid_signature(self) -> None:
         """Consume a playbook with an invalid signature."""
         playbook_path = self.data_dir / "playbooks-unsigned" / "invalid-signature.yml"
@@ -48,8 +68,88 @@ class PlaybookTestCase(TestCase):
         self.assertIn("rhc_playbook_lib.PreconditionError", result.stderr)
         self.assertIn("does not contain a signature", result.stderr)
 
+    def test_audit(self) -> None:
+        """Verify a directory tree of playbooks, reporting every play."""
+        with TemporaryDirectory() as directory:
+            root = Path(directory)
+            (root / "signed").mkdir()
+            shutil.copy(self.data_dir / "playbooks" / "bugs.yml", root / "signed")
+            shutil.copy(self.data_dir / "playbooks-unsigned" / "sample.yml", root)
+            (root / "broken.yaml").write_text("- [")
+            (root / "dated.yml").write_text(
+                "- name: 2024-01-01\n"
+                "  hosts: localhost\n"
+                "  tasks: []\n"
+                "  vars:\n"
+                "    insights_signature: Zm9v\n"
+                "    insights_signature_exclude: /hosts,/vars/insights_signature\n"
+            )
+            (root / "notes.txt").write_text("not a playbook")
+            result = subprocess.run(
+                ["rhc-playbook-verifier", "--audit", directory, "--jobs", "2"],
+                capture_output=True,
+                text=True,
+                check=False,
+                env={**os.environ, "LC_ALL": "C.UTF-8"},
+            )
+        self.assertEqual(result.returncode, 1, result.stderr.strip())
+        records: list[dict] = [json.loads(line) for line in result.stdout.splitlines()]
+        files: dict[str, dict] = {r["file"]: r for r in records if "plays" in r}
+        self.assertEqual(
+            list(files), ["broken.yaml", "dated.yml", "sample.yml", "signed/bugs.yml"]
+        )
+        [dated] = [r for r in records if r["file"] == "dated.yml" and "play" in r]
+        self.assertEqual(dated["name"], "2024-01-01")
+        self.assertEqual(dated["status"], "failed")
+        self.assertEqual(files["broken.yaml"]["error"], "yaml.parser.ParserError")
+        self.assertEqual(
+            files["sample.yml"]["error"], "rhc_playbook_lib.PreconditionError"
+        )
+        self.assertEqual(files["signed/bugs.yml"]["status"], "ok")
+        plays: list[dict] = [r for r in records if r["file"] == "signed/bugs.yml"]
+        self.assertEqual([r.get("play") for r in plays], [1, 2, 3, 4, None])
+        self.assertTrue(all(r["status"] == "ok" and r["digest"] for r in plays[:-1]))
+
+    def test_profiling(self) -> None:
+        """Profiles are written to files, the playbook alone to standard output."""
+        playbook_path = self.data_dir / "playbooks" / "bugs.yml"
+        with TemporaryDirectory() as directory:
+            profile = Path(directory) / "profile.pstats"
+            memory = Path(directory) / "memory.txt"
+            result = self._verify_playbook(
+                playbook_path, "--profile", str(profile), "--trace-memory", str(memory)
+            )
+            self.assertEqual(result.returncode, 0, result.stderr.strip())
+            self.assertEqual(result.stdout.strip(), playbook_path.read_text().strip())
+            self.assertGreater(profile.stat().st_size, 0)
+            summary: str = memory.read_text()
+        for stage in ("keys", "revocation list", "read playbook", "verify"):
+            self.assertIn(f"Top allocations retained by '{stage}':", summary)
+
+    def test_metrics(self) -> None:
+        """Runs add their counts to the metrics file."""
+        with TemporaryDirectory() as directory:
+            metrics = Path(directory) / "verifier.prom"
+            for playbook in ("playbooks/bugs.yml", "playbooks-unsigned/sample.yml"):
+                self._verify_playbook(
+                    self.data_dir / playbook, "--metrics-file", str(metrics)
+                )
+            text: str = metrics.read_text()
+        self.assertIn('rhc_playbook_verifier_runs_total{result="ok"} 1\n', text)
+        self.assertIn('rhc_playbook_verifier_runs_total{result="failed"} 1\n', text)
+        self.assertIn(
+            'rhc_playbook_verifier_failures_total{reason="PreconditionError"} 1\n', text
+        )
+        self.assertIn("rhc_playbook_verifier_plays_verified_total 4\n", text)
+        self.assertIn(
+            'rhc_playbook_verifier_duration_seconds_count{stage="revocation list"}',
+            text,
+        )
+
     @staticmethod
-    def _verify_playbook(playbook_path: Path) -> subprocess.CompletedProcess:
+    def _verify_playbook(
+        playbook_path: Path, *args: str
+    ) -> subprocess.CompletedProcess:
         """Call rhc-playbook-verifier; do not assert on return code."""
         return subprocess.run(
             [
@@ -57,6 +157,7 @@ class PlaybookTestCase(TestCase):
                 "--playbook",
                 str(playbook_path),
                 "--debug",
+                *args,
             ],
             capture_output=True,
             text=True,
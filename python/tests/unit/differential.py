@@ -0,0 +1,483 @@
+"""Differential harness of the engines computing the canonical form and digest of plays.
+
+Random playbooks are generated as YAML text, so plain scalars go through the resolvers and
+constructors: quoted strings with escapes, zero-width and other non-ASCII characters, numbers with
+bases, underscores and colons, YAML 1.1 booleans and nulls, literal blocks, flow and block
+collections, anchors, aliases and merge keys. Every engine has to produce byte-identical
+serialization and digests to the reference one:
+
+* ``reference``: strings are not interned by the constructor, variable fields are excluded by a
+  copy of the original ``clean_play``, the play is serialized recursively and strings are escaped
+  character by character, the way the original implementation did.
+* ``recursive``: :func:`rhc_playbook_lib.parse_playbook`, then ``Serializer``.
+* ``iterative``: :func:`rhc_playbook_lib.parse_playbook`, then ``serialize_play``; the path of
+  ``prepare_play`` and the manifest.
+* ``nodes``: :func:`rhc_playbook_lib.nodes.digest_play` on the composed nodes; plays it does not
+  support are verified the reference way by the verifier, and are only counted here.
+
+Used by ``test_differential`` and ``test_serializer``; ``benchmarks/bench_differential.py`` runs it
+on more cases and reports the throughput of each engine.
+"""
+
+import base64
+import copy
+import random
+import string
+import time
+from collections.abc import Callable
+from typing import Optional
+
+import rhc_playbook_lib
+import yaml
+from rhc_playbook_lib import nodes
+from rhc_playbook_lib.serialization import Loader, Serializer, serialize_play
+
+# Canonical form and digest of a play, ``None`` if the engine does not support the play
+Result = Optional[tuple[bytes, bytes]]
+Engine = Callable[[str], list[Result]]
+
+NUMBERS = (
+    "0",
+    "42",
+    "-7",
+    "+12",
+    "007",
+    "08",
+    "0_7",
+    "0x1F",
+    "-0x1a",
+    "0o17",
+    "0b101",
+    "+0b1_1",
+    "1_000",
+    "1.5",
+    "-0.0",
+    "1e3",
+    "6.02e+23",
+    ".inf",
+    "-.Inf",
+    ".nan",
+)
+BOOLEANS = (
+    "true",
+    "True",
+    "TRUE",
+    "false",
+    "False",
+    "yes",
+    "No",
+    "on",
+    "OFF",
+    "y",
+    "n",
+)
+NULLS = ("~", "null", "Null")
+# Plain scalars that are only valid outside of flow collections
+BLOCK_WORDS = (
+    "12:30",
+    "1:2:3",
+    "-1:30",
+    "190:20:30.15",
+    "2024-01-31",
+    "a:b",
+    "/usr/bin/env",
+    "ansible.builtin.shell",
+    "hello world",
+    "echo {{ item }}",
+)
+KEYS = ("name", "when", "become", "src", "dest", "register", "ansible.builtin.copy")
+CHARACTERS = (
+    string.ascii_letters
+    + string.digits
+    + " '\"\\\t:#-{}[],&*!|>%@`/."
+    + "\u00e1\u0161\u0159\u00a0\U0001f34f"
+    + "\u200b\u200c\u200d" * 3
+)
+# Only written escaped, in double-quoted strings
+LINE_BREAKS = "\n\r\u0085\u2028\u2029"
+# Nesting of generated collections
+MAX_DEPTH = 5
+_NODE_KINDS = ("scalar", "flow", "mapping", "sequence")
+_SCALAR_KINDS = ("number", "boolean", "word", "literal", "quoted")
+# Characters above it are escaped with ``\U``
+_MAX_BMP = 0xFFFF
+
+
+def reference_str(value: str) -> str:
+    """Escape the string character by character, the way the reference implementation does.
+
+    This is the oracle of ``Serializer._str``, benchmarks and tests compare against it.
+    """
+    special_chars: dict[str, str] = {
+        "\\": "\\\\",
+        "\n": "\\n",
+        "\t": "\\t",
+        "\u200b": "\\u200b",
+        "\u200c": "\\u200c",
+        "\u200d": "\\u200d",
+    }
+    escaped_string: str = ""
+    for char in value:
+        escaped_string += special_chars.get(char, char)
+    value = escaped_string
+    quote: str = "'"
+    if "'" in value:
+        if '"' not in value:
+            quote = '"'
+        else:
+            value = value.replace("'", "\\'")
+    return quote + value + quote
+
+
+class _ReferenceSerializer(Serializer):
+    @classmethod
+    def _str(cls, value: str) -> str:
+        return reference_str(value)
+
+
+class _ReferenceLoader(Loader):
+    intern_max_length = None
+
+
+def reference_clean_play(play: dict) -> dict:
+    """Remove variable fields from the play, the way the reference implementation does.
+
+    A copy of the original ``clean_play``, so that changes to it show up as mismatches.
+    """
+    fields: list[str] = play["vars"]["insights_signature_exclude"].split(",")
+    result: dict = copy.deepcopy(play)
+
+    for field in fields:
+        elements: list[str] = [string for string in field.split("/") if string != ""]
+        if len(elements) not in (1, 2):
+            raise rhc_playbook_lib.PreconditionError(
+                f"Variable field '{field}' is too deep or shallow."
+            )
+        if elements[0] not in ("hosts", "vars"):
+            raise rhc_playbook_lib.PreconditionError(
+                f"Variable field '{field}' cannot be excluded."
+            )
+
+        if len(elements) == 1:
+            if elements[0] not in result.keys():
+                raise rhc_playbook_lib.PreconditionError(
+                    f"Variable field '{field}' is not present in the play."
+                )
+            del result[elements[0]]
+        else:
+            if elements[1] not in result[elements[0]].keys():
+                raise rhc_playbook_lib.PreconditionError(
+                    f"Variable field '{field}' is not present in the play."
+                )
+            del result[elements[0]][elements[1]]
+
+    return result
+
+
+class PlaybookGenerator:
+    """Writer of random signed-looking playbooks.
+
+    :param rng: Source of randomness; the same seed produces the same playbooks.
+    """
+
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+        self._anchors: list[str] = []
+        self._mapping_anchors: list[str] = []
+
+    def playbook(self, plays: int) -> str:
+        self._anchors = []
+        self._mapping_anchors = []
+        header: str = "---\n" if self._chance(0.2) else ""
+        return header + "".join(self.play() for _ in range(plays))
+
+    def play(self) -> str:
+        rng = self.rng
+        keys: list[str] = ["hosts", "tasks", "vars"]
+        keys += [rng.choice(KEYS) for _ in range(rng.randint(0, 3))]
+        # Shuffled before the values are written, anchors have to precede their aliases
+        rng.shuffle(keys)
+        text: str = "- name: " + self._scalar(2, flow=False) + "\n"
+        for key in keys:
+            if key == "hosts":
+                text += "  hosts: " + rng.choice(("all", "localhost", '"web"')) + "\n"
+            elif key == "tasks":
+                text += "  tasks:\n" + self._sequence(1, 4)
+            elif key == "vars":
+                text += "  vars:\n" + self._variables()
+            else:
+                text += "  " + self._entry(key, 1, 2)
+        return text
+
+    def _variables(self) -> str:
+        rng = self.rng
+        keys: list[str] = [f"var_{i}" for i in range(rng.randint(0, 3))]
+        excluded: list[str] = ["/vars/insights_signature"]
+        excluded += [f"/vars/{key}" for key in keys if self._chance(0.3)]
+        if self._chance(0.8):
+            excluded.append("/hosts")
+        rng.shuffle(excluded)
+        keys += ["insights_signature", "insights_signature_exclude"]
+        rng.shuffle(keys)
+        text: str = ""
+        for key in keys:
+            if key == "insights_signature":
+                signature: bytes = rng.randbytes(rng.randint(1, 24))
+                text += f"    {key}: {base64.b64encode(signature).decode()}\n"
+            elif key == "insights_signature_exclude":
+                text += f"    {key}: {','.join(excluded)}\n"
+            else:
+                text += "    " + self._entry(key, 2, 4)
+        return text
+
+    def _chance(self, probability: float) -> bool:
+        return self.rng.random() < probability
+
+    def _entry(self, key: str, depth: int, indent: int) -> str:
+        return key + ":" + self._value(depth, indent)
+
+    def _value(self, depth: int, indent: int) -> str:
+        """Return the value following ``key:`` or ``-``, up to the end of its last line."""
+        rng = self.rng
+        if self._anchors and self._chance(0.04):
+            return f" *{rng.choice(self._anchors)}\n"
+        anchor: str = ""
+        if self._chance(0.05):
+            anchor = f" &a{rng.getrandbits(32):x}"
+        kind: str = "scalar"
+        if depth < MAX_DEPTH:
+            kind = rng.choices(_NODE_KINDS, weights=(5, 1, 2, 2))[0]
+        if kind == "scalar":
+            text: str = anchor + " " + self._scalar(indent, flow=False) + "\n"
+        elif kind == "flow":
+            text = anchor + " " + self._flow(depth + 1) + "\n"
+        elif kind == "mapping":
+            text = anchor + "\n" + self._mapping(depth + 1, indent + 2)
+            if anchor:
+                self._mapping_anchors.append(anchor[2:])
+        else:
+            text = anchor + "\n" + self._sequence(depth + 1, indent + 2)
+        if anchor:
+            self._anchors.append(anchor[2:])
+        return text
+
+    def _mapping(self, depth: int, indent: int) -> str:
+        lines: list[str] = []
+        if self._mapping_anchors and self._chance(0.1):
+            lines.append(
+                " " * indent + f"<<: *{self.rng.choice(self._mapping_anchors)}\n"
+            )
+        for _ in range(self.rng.randint(1, 4)):
+            lines.append(" " * indent + self._entry(self._key(), depth, indent))
+        return "".join(lines)
+
+    def _sequence(self, depth: int, indent: int) -> str:
+        return "".join(
+            " " * indent + "-" + self._value(depth, indent)
+            for _ in range(self.rng.randint(1, 4))
+        )
+
+    def _flow(self, depth: int) -> str:
+        rng = self.rng
+        items: list[str] = []
+        for _ in range(rng.randint(0, 4)):
+            if depth < MAX_DEPTH and self._chance(0.2):
+                items.append(self._flow(depth + 1))
+            else:
+                items.append(self._scalar(0, flow=True))
+        if self._chance(0.5):
+            return "[" + ", ".join(items) + "]"
+        return "{" + ", ".join(f"{self._key()}: {item}" for item in items) + "}"
+
+    def _key(self) -> str:
+        rng = self.rng
+        kind: str = rng.choices(("word", "plain", "quoted"), weights=(6, 1, 3))[0]
+        if kind == "word":
+            return rng.choice(KEYS)
+        if kind == "plain":
+            return rng.choice(NUMBERS + BOOLEANS + NULLS)
+        return self._quoted(rng.randint(0, 12))
+
+    def _scalar(self, indent: int, *, flow: bool) -> str:
+        rng = self.rng
+        kind: str = rng.choices(
+            _SCALAR_KINDS, weights=(3, 2, 0 if flow else 2, 0 if flow else 2, 11)
+        )[0]
+        if kind == "number":
+            return rng.choice(NUMBERS)
+        if kind == "boolean":
+            return rng.choice(BOOLEANS + NULLS)
+        if kind == "word":
+            return rng.choice(BLOCK_WORDS)
+        if kind == "literal":
+            return self._literal(indent)
+        return self._quoted(rng.randint(0, 40))
+
+    def _text(self, length: int) -> str:
+        return "".join(self.rng.choice(CHARACTERS) for _ in range(length))
+
+    def _quoted(self, length: int) -> str:
+        rng = self.rng
+        text: str = self._text(length)
+        if self._chance(0.4):
+            return "'" + text.replace("'", "''") + "'"
+        parts: list[str] = []
+        for char in text + rng.choice(("", *LINE_BREAKS)):
+            if char in '\\"':
+                parts.append("\\" + char)
+            elif char in LINE_BREAKS:
+                parts.append(_yaml_escape(char))
+            elif char == "\t" or not char.isascii():
+                parts.append(rng.choice((char, _yaml_escape(char))))
+            else:
+                parts.append(char)
+        return '"' + "".join(parts) + '"'
+
+    def _literal(self, indent: int) -> str:
+        lines: list[str] = []
+        for _ in range(self.rng.randint(1, 3)):
+            line: str = self._text(self.rng.randint(0, 30)).strip()
+            lines.append(" " * (indent + 2) + (line or "x") + "\n")
+        return self.rng.choice(("|", "|-", "|+")) + "\n" + "".join(lines).rstrip("\n")
+
+
+def _yaml_escape(char: str) -> str:
+    if char in "\t\n\r":
+        return repr(char)[1:-1]
+    if ord(char) > _MAX_BMP:
+        return f"\\U{ord(char):08x}"
+    return f"\\u{ord(char):04x}"
+
+
+def _digested(serialized: str) -> tuple[bytes, bytes]:
+    data: bytes = serialized.encode("utf-8")
+    return data, rhc_playbook_lib.create_play_digest(data)
+
+
+def _load(playbook: str, loader_class: type[Loader]) -> list[dict]:
+    loader = loader_class(playbook)
+    try:
+        plays: list[dict] = loader.get_single_data()
+        return plays
+    finally:
+        loader.dispose()
+
+
+def reference(playbook: str) -> list[Result]:
+    return [
+        _digested(_ReferenceSerializer._obj(reference_clean_play(play)))
+        for play in _load(playbook, _ReferenceLoader)
+    ]
+
+
+def recursive(playbook: str) -> list[Result]:
+    return [
+        _digested(Serializer._obj(rhc_playbook_lib.clean_play(play)))
+        for play in rhc_playbook_lib.parse_playbook(playbook)
+    ]
+
+
+def iterative(playbook: str) -> list[Result]:
+    return [
+        _digested(serialize_play(rhc_playbook_lib.clean_play(play)))
+        for play in rhc_playbook_lib.parse_playbook(playbook)
+    ]
+
+
+def from_nodes(playbook: str) -> list[Result]:
+    loader = Loader(playbook)
+    try:
+        root: Optional[yaml.Node] = loader.get_single_node()
+    finally:
+        loader.dispose()
+    assert isinstance(root, yaml.SequenceNode)
+    results: list[Result] = []
+    for node in root.value:
+        try:
+            digested = nodes.digest_play(loader, node, keep=True)
+        except nodes.Unsupported:
+            results.append(None)
+            continue
+        assert digested.serialized is not None
+        results.append((digested.serialized, digested.digest))
+    return results
+
+
+ENGINES: dict[str, Engine] = {
+    "reference": reference,
+    "recursive": recursive,
+    "iterative": iterative,
+    "nodes": from_nodes,
+}
+
+
+class Mismatch(AssertionError):
+    """An engine disagrees with the reference one."""
+
+
+def compare(playbook: str, expected: list[Result], engine: str) -> int:
+    """Run an engine on the playbook, and compare its results with the reference ones.
+
+    :returns: Number of plays the engine does not support.
+    :raises Mismatch: The engine fails, or its serialization or digest of a play differs.
+    """
+    try:
+        actual: list[Result] = ENGINES[engine](playbook)
+    except Exception as exc:
+        raise Mismatch(f"Engine '{engine}' failed: {exc!r}") from exc
+    if len(actual) != len(expected):
+        raise Mismatch(
+            f"Engine '{engine}' found {len(actual)} play(s), not {len(expected)}."
+        )
+    unsupported: int = 0
+    for index, (result, reference_result) in enumerate(zip(actual, expected)):
+        if result is None:
+            unsupported += 1
+        elif result != reference_result:
+            assert reference_result is not None
+            offset: int = next(
+                (
+                    i
+                    for i, (a, b) in enumerate(zip(result[0], reference_result[0]))
+                    if a != b
+                ),
+                min(len(result[0]), len(reference_result[0])),
+            )
+            raise Mismatch(
+                f"Engine '{engine}' differs in play {index} at byte {offset}:\n"
+                f"  reference: {reference_result[0][offset - 20 : offset + 40]!r}\n"
+                f"  {engine}: {result[0][offset - 20 : offset + 40]!r}"
+            )
+    return unsupported
+
+
+def run(
+    seed: int, cases: int, plays: int = 3
+) -> tuple[dict[str, float], dict[str, int], int]:
+    """Generate playbooks and compare all engines on them.
+
+    :returns: Seconds spent in each engine, unsupported plays of each engine, and plays compared.
+    :raises Mismatch: An engine disagrees with the reference one. The playbook is in the message.
+    """
+    generator = PlaybookGenerator(random.Random(seed))
+    seconds: dict[str, float] = dict.fromkeys(ENGINES, 0.0)
+    unsupported: dict[str, int] = dict.fromkeys(ENGINES, 0)
+    compared: int = 0
+    for case in range(cases):
+        playbook: str = generator.playbook(generator.rng.randint(1, plays))
+        start: float = time.perf_counter()
+        expected: list[Result] = reference(playbook)
+        seconds["reference"] += time.perf_counter() - start
+        compared += len(expected)
+        for engine in ENGINES:
+            if engine == "reference":
+                continue
+            start = time.perf_counter()
+            try:
+                unsupported[engine] += compare(playbook, expected, engine)
+            except Mismatch as exc:
+                raise Mismatch(
+                    f"{exc}\nCase {case} of seed {seed}:\n{playbook}"
+                ) from exc
+            seconds[engine] += time.perf_counter() - start
+    return seconds, unsupported, compared
@@ -0,0 +1,142 @@
+"""Unit tests for module ``rhc_playbook_lib.aio``."""
+
+import asyncio
+import pathlib
+import threading
+import time
+from unittest import IsolatedAsyncioTestCase, mock
+
+import rhc_playbook_lib
+from rhc_playbook_lib import GPGValidationError, PreconditionError, aio, crypto
+from rhc_playbook_lib.keyring import Keyring
+
+DATA = pathlib.Path(__file__).parents[3].absolute() / "data"
+GPG_KEY = (DATA / "public.gpg").read_bytes()
+REVOKED = (DATA / "revoked_playbooks.yml").read_text()
+PLAYBOOKS = DATA / "playbooks"
+NAMES: tuple[str, ...] = ("insights_remove", "document-from-hell", "bugs")
+
+
+class TestAsyncVerifier(IsolatedAsyncioTestCase):
+    def tearDown(self) -> None:
+        crypto.configure_backend()
+        crypto.configure_timeouts()
+
+    async def test_same_as_sync(self) -> None:
+        verifier = await aio.AsyncVerifier.create(GPG_KEY, revocation_list=REVOKED)
+        for name in NAMES:
+            playbook: str = (PLAYBOOKS / f"{name}.yml").read_text()
+            with self.subTest(playbook=name):
+                self.assertEqual(
+                    await verifier.verify_playbook(playbook),
+                    rhc_playbook_lib.verify_playbook(playbook, GPG_KEY),
+                )
+
+    async def test_gpg_backend(self) -> None:
+        crypto.configure_backend("gpg")
+        playbook: str = (PLAYBOOKS / "insights_remove.yml").read_text()
+        digest: bytes = (PLAYBOOKS / "insights_remove.digest.bin").read_bytes()
+        self.assertEqual(
+            await aio.verify_playbook(playbook, GPG_KEY),
+            [("Insights Disable", digest)],
+        )
+
+    async def test_shared_commands(self) -> None:
+        """GPG is run with the same command lines as by the synchronous verifier."""
+        playbook: str = (PLAYBOOKS / "insights_remove.yml").read_text()
+        for backend, helper in (
+            ("gpg", "gpg_verify_command"),
+            ("gpgv", "gpgv_verify_command"),
+        ):
+            crypto.configure_backend(backend)
+            with self.subTest(backend=backend):
+                with mock.patch.object(
+                    crypto, helper, wraps=getattr(crypto, helper)
+                ) as command:
+                    await aio.verify_playbook(playbook, GPG_KEY)
+                command.assert_called_once()
+
+    async def test_files_off_loop(self) -> None:
+        """Files for GPG are written and removed outside of the event loop thread."""
+        playbook: str = (PLAYBOOKS / "insights_remove.yml").read_text()
+        loop_thread: str = threading.current_thread().name
+        threads: list[str] = []
+        write_bytes = pathlib.Path.write_bytes
+
+        def recording_write_bytes(path: pathlib.Path, data: bytes) -> int:
+            threads.append(threading.current_thread().name)
+            return write_bytes(path, data)
+
+        for backend in ("gpg", "gpgv"):
+            crypto.configure_backend(backend)
+            with self.subTest(backend=backend):
+                threads.clear()
+                with mock.patch.object(
+                    pathlib.Path, "write_bytes", recording_write_bytes
+                ):
+                    await aio.verify_playbook(playbook, GPG_KEY)
+                self.assertTrue(threads)
+                self.assertNotIn(loop_thread, threads)
+
+    async def test_concurrent(self) -> None:
+        """Playbooks verify concurrently, with a bounded number of GPG processes."""
+        verifier = await aio.AsyncVerifier.create(GPG_KEY, concurrency=2)
+        playbooks: list[str] = [
+            (PLAYBOOKS / f"{name}.yml").read_text() for name in NAMES
+        ] * 4
+        running: int = 0
+        most: int = 0
+        run = aio.run
+
+        async def counting_run(*args, **kwargs):  # type: ignore[no-untyped-def]
+            nonlocal running, most
+            running += 1
+            most = max(most, running)
+            try:
+                return await run(*args, **kwargs)
+            finally:
+                running -= 1
+
+        with mock.patch.object(aio, "run", counting_run):
+            results = await asyncio.gather(
+                *(verifier.verify_playbook(playbook) for playbook in playbooks)
+            )
+        self.assertEqual(results[3:6], results[:3])
+        self.assertEqual(most, 2)
+
+    async def test_not_blocking(self) -> None:
+        """No subprocess is waited for on the event loop."""
+        verifier = aio.AsyncVerifier(Keyring([GPG_KEY]))
+        playbook: str = (PLAYBOOKS / "insights_remove.yml").read_text()
+        with mock.patch.object(
+            crypto.subprocess, "run", side_effect=AssertionError("blocking")
+        ):
+            await verifier.verify_playbook(playbook)
+
+    async def test_invalid_signature(self) -> None:
+        verifier = await aio.AsyncVerifier.create(GPG_KEY)
+        playbook: str = (PLAYBOOKS / "insights_remove.yml").read_text()
+        playbook = playbook.replace("Insights Disable", "Insights Enable", 1)
+        with self.assertRaises(GPGValidationError) as context:
+            await verifier.verify_playbook(playbook)
+        self.assertIn(b"Insights Enable", context.exception.serialized_play)
+
+    async def test_revoked(self) -> None:
+        digest: bytes = (PLAYBOOKS / "insights_remove.digest.bin").read_bytes()
+        verifier = aio.AsyncVerifier(Keyring([GPG_KEY]), revoked={digest})
+        playbook: str = (PLAYBOOKS / "insights_remove.yml").read_text()
+        with mock.patch.object(aio, "run") as run:
+            with self.assertRaisesRegex(PreconditionError, "is on revocation list"):
+                await verifier.verify_playbook(playbook)
+        run.assert_not_called()
+
+    async def test_no_plays(self) -> None:
+        with self.assertRaisesRegex(PreconditionError, "contains no plays"):
+            await aio.AsyncVerifier(Keyring([GPG_KEY])).verify_playbook("[]")
+
+    async def test_timeout(self) -> None:
+        crypto.configure_timeouts(timeout=0.1)
+        start: float = time.monotonic()
+        with self.assertRaises(crypto.DeadlineExceeded):
+            await aio.run(["sleep", "10"])
+        self.assertLess(time.monotonic() - start, 5)
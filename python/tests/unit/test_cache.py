@@ -0,0 +1,226 @@
+"""Unit tests for module ``rhc_playbook_lib.cache``."""
+
+import os
+import pathlib
+from contextlib import ExitStack
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, mock
+
+import rhc_playbook_lib
+import yaml
+from rhc_playbook_lib.cache import (
+    CACHE_FILENAME,
+    CachedPlay,
+    DigestCache,
+    play_cache_key,
+)
+from rhc_playbook_lib.serialization import Loader
+
+DATA = pathlib.Path(__file__).parents[3].absolute() / "data"
+GPG_KEY = (DATA / "public.gpg").read_bytes()
+PLAYBOOKS = DATA / "playbooks"
+
+
+def _play_nodes(playbook: str) -> list[yaml.Node]:
+    loader = Loader(playbook)
+    try:
+        root = loader.get_single_node()
+    finally:
+        loader.dispose()
+    assert isinstance(root, yaml.SequenceNode)
+    return list(root.value)
+
+
+class TestPlayCacheKey(TestCase):
+    def test_same_text(self) -> None:
+        first = _play_nodes("- name: a\n  tasks: []\n- name: b\n")[0]
+        second = _play_nodes("# comment\n- name: a\n  tasks: []\n")[0]
+        self.assertEqual(
+            play_cache_key("- name: a\n  tasks: []\n- name: b\n", first),
+            play_cache_key("# comment\n- name: a\n  tasks: []\n", second),
+        )
+
+    def test_different_text(self) -> None:
+        raw = "- name: a\n- name: b\n"
+        first, second = _play_nodes(raw)
+        self.assertNotEqual(play_cache_key(raw, first), play_cache_key(raw, second))
+
+    def test_different_column(self) -> None:
+        first = _play_nodes("- name: a\n")[0]
+        second = _play_nodes("-   name: a\n")[0]
+        self.assertNotEqual(
+            play_cache_key("- name: a\n", first),
+            play_cache_key("-   name: a\n", second),
+        )
+
+    def test_different_directives(self) -> None:
+        """Tag directives outside of the play change how it is constructed."""
+        play = "- name: !e!x a\n"
+        keys = {
+            play_cache_key(raw, _play_nodes(raw)[0])
+            for raw in (
+                "%TAG !e! tag:yaml.org,2002:\n---\n" + play,
+                "%TAG !e! tag:example.com,2024:\n---\n" + play,
+                "# comment\n%TAG !e! tag:yaml.org,2002:\n--- # comment\n" + play,
+            )
+        }
+        self.assertEqual(len(keys), 2)
+
+    def test_external_alias(self) -> None:
+        raw = "- name: &name a\n- name: *name\n"
+        first, second = _play_nodes(raw)
+        self.assertIsNotNone(play_cache_key(raw, first))
+        self.assertIsNone(play_cache_key(raw, second))
+
+    def test_internal_alias(self) -> None:
+        raw = "- name: &name a\n  other: *name\n"
+        (play,) = _play_nodes(raw)
+        self.assertIsNotNone(play_cache_key(raw, play))
+
+
+class TestDigestCache(TestCase):
+    def setUp(self) -> None:
+        self.stack = ExitStack()
+        try:
+            self.directory = Path(self.stack.enter_context(TemporaryDirectory()))
+        except:
+            self.tearDown()
+            raise
+
+    def tearDown(self) -> None:
+        self.stack.close()
+
+    def test_roundtrip(self) -> None:
+        play = CachedPlay(name="play", digest=b"digest", signature=b"signature")
+        with DigestCache(self.directory) as cache:
+            self.assertIsNone(cache.get(b"key"))
+            cache.put(b"key", play)
+            self.assertEqual(cache.get(b"key"), play)
+
+    def test_persistent(self) -> None:
+        play = CachedPlay(name="play", digest=b"digest", signature=b"signature")
+        with DigestCache(self.directory) as cache:
+            cache.put(b"key", play)
+        with DigestCache(self.directory) as cache:
+            self.assertEqual(cache.get(b"key"), play)
+
+    def test_lru_eviction(self) -> None:
+        with DigestCache(self.directory, max_entries=2) as cache:
+            for key in (b"a", b"b"):
+                cache.put(key, CachedPlay(name="", digest=key, signature=key))
+            # Mark 'a' as recently used, 'b' gets evicted
+            self.assertIsNotNone(cache.get(b"a"))
+            cache.put(b"c", CachedPlay(name="", digest=b"c", signature=b"c"))
+
+            self.assertEqual(len(cache), 2)
+            self.assertIsNotNone(cache.get(b"a"))
+            self.assertIsNone(cache.get(b"b"))
+            self.assertIsNotNone(cache.get(b"c"))
+
+    def test_discard(self) -> None:
+        with DigestCache(self.directory) as cache:
+            cache.put(b"key", CachedPlay(name="", digest=b"", signature=b""))
+            cache.discard(b"key")
+            self.assertIsNone(cache.get(b"key"))
+
+    def test_insecure_directory(self) -> None:
+        self.directory.chmod(0o777)
+        with self.assertRaisesRegex(PermissionError, "must not be writable"):
+            DigestCache(self.directory)
+
+    def test_foreign_directory(self) -> None:
+        with mock.patch("os.geteuid", return_value=os.geteuid() + 1):
+            with self.assertRaisesRegex(PermissionError, "owned by the current user"):
+                DigestCache(self.directory)
+
+    def test_foreign_database(self) -> None:
+        if os.geteuid() != 0:
+            self.skipTest("Changing the owner of a file requires root.")
+        DigestCache(self.directory).close()
+        os.chown(self.directory / CACHE_FILENAME, 65534, 65534)
+        with self.assertRaisesRegex(PermissionError, "owned by the current user"):
+            DigestCache(self.directory)
+
+    def test_insecure_database(self) -> None:
+        DigestCache(self.directory).close()
+        (self.directory / CACHE_FILENAME).chmod(0o666)
+        with self.assertRaisesRegex(PermissionError, "must not be writable"):
+            DigestCache(self.directory)
+
+    def test_symlink(self) -> None:
+        target = self.directory / "target"
+        target.mkdir(mode=0o700)
+        (self.directory / "link").symlink_to(target)
+        with self.assertRaisesRegex(PermissionError, "symbolic link"):
+            DigestCache(self.directory / "link")
+
+        (target / "other.sqlite3").touch(mode=0o600)
+        (target / CACHE_FILENAME).symlink_to(target / "other.sqlite3")
+        with self.assertRaisesRegex(PermissionError, "symbolic link"):
+            DigestCache(target)
+
+
+class TestVerifyPlaybookCached(TestCase):
+    def setUp(self) -> None:
+        self.stack = ExitStack()
+        try:
+            directory = Path(self.stack.enter_context(TemporaryDirectory()))
+            self.cache = self.stack.enter_context(DigestCache(directory))
+        except:
+            self.tearDown()
+            raise
+
+    def tearDown(self) -> None:
+        self.stack.close()
+
+    def test_ok(self) -> None:
+        for file in ("insights_remove", "document-from-hell"):
+            with self.subTest(file=file):
+                raw: str = (PLAYBOOKS / f"{file}.yml").read_text()
+                expected: bytes = (PLAYBOOKS / f"{file}.digest.bin").read_bytes()
+
+                first = rhc_playbook_lib.verify_playbook(raw, GPG_KEY, cache=self.cache)
+                self.assertEqual([digest for _, digest in first], [expected])
+
+                # The second run verifies the cached digest without serializing the play
+                with mock.patch.object(
+                    rhc_playbook_lib, "serialize_play", side_effect=AssertionError
+                ):
+                    second = rhc_playbook_lib.verify_playbook(
+                        raw, GPG_KEY, cache=self.cache
+                    )
+                self.assertEqual(first, second)
+
+    def test_same_as_uncached(self) -> None:
+        for file in ("bugs", "unicode"):
+            with self.subTest(file=file):
+                raw: str = (PLAYBOOKS / f"{file}.yml").read_text()
+                self.assertEqual(
+                    rhc_playbook_lib.verify_playbook(raw, GPG_KEY, cache=self.cache),
+                    rhc_playbook_lib.verify_playbook(raw, GPG_KEY),
+                )
+
+    def test_invalid_cached_entry(self) -> None:
+        """A cached entry whose signature does not verify is discarded and recomputed."""
+        raw: str = (PLAYBOOKS / "insights_remove.yml").read_text()
+        expected = rhc_playbook_lib.verify_playbook(raw, GPG_KEY, cache=self.cache)
+
+        key = play_cache_key(raw, _play_nodes(raw)[0])
+        assert key is not None
+        cached = self.cache.get(key)
+        assert cached is not None
+        self.cache.put(
+            key,
+            CachedPlay(name=cached.name, digest=b"forged", signature=cached.signature),
+        )
+
+        actual = rhc_playbook_lib.verify_playbook(raw, GPG_KEY, cache=self.cache)
+        self.assertEqual(actual, expected)
+        self.assertEqual(self.cache.get(key), cached)
+
+    def test_empty(self) -> None:
+        with self.assertRaisesRegex(
+            rhc_playbook_lib.PreconditionError, "contains no plays"
+        ):
+            rhc_playbook_lib.verify_playbook("[]", GPG_KEY, cache=self.cache)
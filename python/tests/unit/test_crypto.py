@@ -1,6 +1,7 @@
 """Unit tests for module ``rhc_playbook_lib.crypto``."""
 
 import subprocess
+import time
 from contextlib import ExitStack
 from pathlib import Path
 from subprocess import CalledProcessError
@@ -8,6 +9,7 @@ from tempfile import TemporaryDirectory
 from unittest import TestCase
 
 from rhc_playbook_lib import _keygen, crypto
+from rhc_playbook_lib.keyring import keyring_file
 
 GPG_OWNER = "rhc-playbook-verifier test"
 
@@ -167,3 +169,124 @@ class CryptoTestCase(TestCase):
         self.assertIn("file.txt.asc", str(cm.exception))
         self.assertTrue((self.home / "file.txt").is_file())
         self.assertFalse((self.home / "file.txt.asc").is_file())
+
+    def test_gpgv_valid_signature(self) -> None:
+        """A detached file signature can be verified without importing the key."""
+        _initialize_gpg_environment(self.home)
+        keyring: Path = keyring_file((self.home / "key.public.gpg").read_bytes())
+        result = crypto.verify_gpgv_signed_file(
+            file=self.home / "file.txt",
+            signature=self.home / "file.txt.asc",
+            keyring=keyring,
+        )
+        self.assertIn(f'Good signature from "{GPG_OWNER}"', result.stderr.decode())
+        self.assertEqual(result.returncode, 0)
+
+    def test_gpgv_invalid_signature(self) -> None:
+        """A bad detached file signature can be detected without importing the key."""
+        _initialize_gpg_environment(self.home)
+        (self.home / "file.txt").write_text("an unsigned message")
+        keyring: Path = keyring_file((self.home / "key.public.gpg").read_bytes())
+        with self.assertRaises(CalledProcessError) as cm:
+            crypto.verify_gpgv_signed_file(
+                file=self.home / "file.txt",
+                signature=self.home / "file.txt.asc",
+                keyring=keyring,
+            )
+        self.assertIn(f'BAD signature from "{GPG_OWNER}"', cm.exception.stderr.decode())
+
+    def test_signing_session(self) -> None:
+        """Multiple files can be signed in one session."""
+        _initialize_gpg_environment(self.home)
+        files = [self.home / f"file-{i}.txt" for i in range(3)]
+        for file in files:
+            file.write_text(f"message {file.name}")
+
+        with crypto.SigningSession(self.home / "key.private.gpg") as session:
+            homedir = session.homedir
+            for file in files:
+                session.sign_file(file)
+            signature: bytes = session.sign_data(b"a signed message")
+        self.assertFalse(homedir.exists())
+
+        for file in files:
+            with self.subTest(file=file.name):
+                crypto.verify_gpg_signed_file(
+                    file=file,
+                    signature=file.with_name(file.name + ".asc"),
+                    key=self.home / "key.public.gpg",
+                )
+        (self.home / "data.asc").write_bytes(signature)
+        crypto.verify_gpg_signed_file(
+            file=self.home / "file.txt",
+            signature=self.home / "data.asc",
+            key=self.home / "key.public.gpg",
+        )
+
+    def test_signing_session_closed(self) -> None:
+        """A closed signing session cannot be used."""
+        _initialize_gpg_environment(self.home)
+        with crypto.SigningSession(self.home / "key.private.gpg") as session:
+            pass
+        with self.assertRaisesRegex(RuntimeError, "not open"):
+            session.sign_data(b"data")
+
+    def test_export_public_key(self) -> None:
+        """The public half of a private key verifies its signatures."""
+        _initialize_gpg_environment(self.home)
+        public_key: bytes = crypto.export_public_key(self.home / "key.private.gpg")
+        self.assertTrue(crypto.list_key_ids(public_key))
+        (self.home / "exported.gpg").write_bytes(public_key)
+        crypto.verify_gpg_signed_file(
+            file=self.home / "file.txt",
+            signature=self.home / "file.txt.asc",
+            key=self.home / "exported.gpg",
+        )
+
+    def test_signing_session_missing_key(self) -> None:
+        """A missing private key can be detected."""
+        with self.assertRaises(FileNotFoundError) as cm:
+            crypto.SigningSession(self.home / "key.private.gpg")
+        self.assertIn("key.private.gpg", str(cm.exception))
+
+
+class BackendTestCase(TestCase):
+    def setUp(self) -> None:
+        self.addCleanup(crypto.configure_backend)
+
+    def test_select(self) -> None:
+        crypto.configure_backend("gpg")
+        self.assertFalse(crypto.use_gpgv())
+        crypto.configure_backend("gpgv")
+        self.assertTrue(crypto.use_gpgv())
+        crypto.configure_backend("auto")
+        self.assertEqual(crypto.use_gpgv(), crypto.GPGV.is_file())
+
+    def test_unknown(self) -> None:
+        with self.assertRaises(ValueError):
+            crypto.configure_backend("openssl")
+
+
+class TimeoutTestCase(TestCase):
+    def setUp(self) -> None:
+        self.addCleanup(crypto.configure_timeouts)
+
+    def test_timeout(self) -> None:
+        crypto.configure_timeouts(timeout=0.1)
+        start: float = time.monotonic()
+        with self.assertRaises(crypto.DeadlineExceeded):
+            crypto.run(["/usr/bin/sleep", "10"])
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_deadline(self) -> None:
+        crypto.configure_timeouts(timeout=60, deadline=0.1)
+        with self.assertRaises(crypto.DeadlineExceeded):
+            crypto.run(["/usr/bin/sleep", "10"])
+        # The deadline has passed, nothing else is started
+        with self.assertRaisesRegex(crypto.DeadlineExceeded, "Deadline passed"):
+            crypto.run(["/usr/bin/true"], check=True)
+
+    def test_cleanup_after_deadline(self) -> None:
+        crypto.configure_timeouts(deadline=0)
+        result = crypto.run(["/usr/bin/true"], check=True, cleanup=True)
+        self.assertEqual(result.returncode, 0)
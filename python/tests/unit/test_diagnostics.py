@@ -0,0 +1,73 @@
+"""Unit tests for module ``rhc_playbook_lib.diagnostics``."""
+
+import logging
+from contextlib import ExitStack
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from rhc_playbook_lib import diagnostics
+
+
+class ExplodingBytes(bytes):
+    """Bytes that fail the test when they are represented."""
+
+    def __repr__(self) -> str:
+        raise AssertionError("Payload was represented.")
+
+
+class TestLazyRepr(TestCase):
+    def test_short(self) -> None:
+        self.assertEqual(str(diagnostics.LazyRepr(b"play")), "b'play'")
+
+    def test_capped(self) -> None:
+        result = str(diagnostics.LazyRepr(b"x" * 100, limit=4))
+        self.assertEqual(result, "b'xxxx'... (100 bytes in total)")
+
+
+class TestLogPayload(TestCase):
+    def setUp(self) -> None:
+        self.stack = ExitStack()
+        try:
+            self.directory = Path(self.stack.enter_context(TemporaryDirectory()))
+            self.stack.callback(diagnostics.configure, None)
+        except:
+            self.tearDown()
+            raise
+
+    def tearDown(self) -> None:
+        self.stack.close()
+
+    def test_disabled(self) -> None:
+        """Nothing is formatted or written when the level is disabled."""
+        diagnostics.configure(self.directory / "artifacts")
+        logger = logging.getLogger("test_diagnostics.disabled")
+        logger.setLevel(logging.WARNING)
+        diagnostics.log_payload(logger, logging.DEBUG, "Payload", ExplodingBytes(b"x"))
+        self.assertEqual((self.directory / "artifacts").read_bytes(), b"")
+
+    def test_inline(self) -> None:
+        logger = logging.getLogger("test_diagnostics.inline")
+        with self.assertLogs(logger, logging.DEBUG) as cm:
+            diagnostics.log_payload(logger, logging.DEBUG, "Payload", b"play")
+        self.assertEqual(cm.records[0].getMessage(), "Payload: b'play'")
+        self.assertEqual(cm.records[0].funcName, "test_inline")
+
+    def test_artifact(self) -> None:
+        """Large payloads are written to the artifact file in full."""
+        artifacts = self.directory / "artifacts"
+        diagnostics.configure(artifacts)
+        payload = b"p" * (diagnostics.INLINE_LIMIT * 10)
+        logger = logging.getLogger("test_diagnostics.artifact")
+        with self.assertLogs(logger, logging.ERROR) as cm:
+            diagnostics.log_payload(logger, logging.ERROR, "Payload", payload)
+        message: str = cm.records[0].getMessage()
+        self.assertIn(f"stored in '{artifacts}#1'", message)
+        self.assertLess(len(message), len(payload))
+        self.assertIn(payload, artifacts.read_bytes())
+
+    def test_artifact_limit(self) -> None:
+        artifacts = diagnostics.ArtifactFile(self.directory / "artifacts", limit=100)
+        self.assertIsNotNone(artifacts.write("first", b"a" * 1000))
+        self.assertIsNone(artifacts.write("second", b"b" * 1000))
+        self.assertLessEqual((self.directory / "artifacts").stat().st_size, 100)
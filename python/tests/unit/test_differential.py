@@ -0,0 +1,62 @@
+"""Differential test of the serialization engines, see ``tests/unit/differential.py``."""
+
+import pathlib
+import random
+from unittest import TestCase, mock
+
+import rhc_playbook_lib
+from rhc_playbook_lib import serialization
+
+from tests.unit import differential
+
+
+class TestDifferential(TestCase):
+    def test_engines(self) -> None:
+        """All engines serialize and digest random plays the way the reference does."""
+        _, unsupported, compared = differential.run(seed=0, cases=100)
+        self.assertGreater(compared, 100)
+        self.assertEqual(unsupported["reference"], 0)
+
+    def test_deterministic(self) -> None:
+        playbooks: list[list[str]] = []
+        for _ in range(2):
+            generator = differential.PlaybookGenerator(random.Random(7))
+            playbooks.append([generator.playbook(3) for _ in range(5)])
+        self.assertEqual(playbooks[0], playbooks[1])
+
+    def test_reference_matches_fixture(self) -> None:
+        data = pathlib.Path(__file__).parents[3].absolute() / "data"
+        playbook: str = (data / "playbooks" / "document-from-hell.yml").read_text()
+        [result] = differential.reference(playbook)
+        assert result is not None
+        serialized, digest = result
+        playbooks = data / "playbooks"
+        self.assertEqual(
+            serialized, (playbooks / "document-from-hell.serialized.bin").read_bytes()
+        )
+        self.assertEqual(
+            digest, (playbooks / "document-from-hell.digest.bin").read_bytes()
+        )
+
+    def test_mismatch(self) -> None:
+        """A serializer that forgets an escape is caught."""
+        escapes = serialization._NON_ASCII_ESCAPES[:-1]
+        with mock.patch.object(serialization, "_NON_ASCII_ESCAPES", escapes):
+            with self.assertRaisesRegex(differential.Mismatch, "Case [0-9]+ of seed 0"):
+                differential.run(seed=0, cases=100)
+
+    def test_clean_play_mismatch(self) -> None:
+        """A ``clean_play`` that keeps an excluded field is caught."""
+        clean_play = rhc_playbook_lib.clean_play
+
+        def keep_hosts(play: dict) -> dict:
+            cleaned: dict = clean_play(play)
+            if "hosts" in play:
+                cleaned["hosts"] = play["hosts"]
+            return cleaned
+
+        with mock.patch.object(rhc_playbook_lib, "clean_play", keep_hosts):
+            with self.assertRaisesRegex(
+                differential.Mismatch, "Engine 'recursive' differs"
+            ):
+                differential.run(seed=0, cases=100)
@@ -0,0 +1,152 @@
+"""Unit tests for module ``rhc_playbook_lib.keyring``."""
+
+import base64
+import pathlib
+import subprocess
+from contextlib import ExitStack
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import ClassVar
+from unittest import TestCase
+
+import rhc_playbook_lib
+from rhc_playbook_lib import _keygen, crypto
+from rhc_playbook_lib.keyring import (
+    Keyring,
+    dearmor,
+    keyring_file,
+    signature_issuers,
+)
+
+DATA = pathlib.Path(__file__).parents[3].absolute() / "data"
+GPG_KEY = (DATA / "public.gpg").read_bytes()
+GPG_KEY_ID = "CBF0E7C0FE8F9A4D"
+GPG_FINGERPRINT = "5C1920B07B4AE916DBB3BCEACBF0E7C0FE8F9A4D"
+PLAYBOOK = (DATA / "playbooks" / "insights_remove.yml").read_text()
+
+
+def _signature(playbook: str) -> bytes:
+    play = rhc_playbook_lib.parse_playbook(playbook)[0]
+    return base64.b64decode(play["vars"]["insights_signature"])
+
+
+class TestSignatureIssuers(TestCase):
+    stack: ClassVar[ExitStack]
+    home: ClassVar[Path]
+    fingerprint: ClassVar[str]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.stack = ExitStack()
+        try:
+            cls.home = Path(cls.stack.enter_context(TemporaryDirectory()))
+            with _keygen._generate_keys() as gpg_tmp_dir:
+                _keygen._export_key_pair(gpg_tmp_dir, cls.home)
+                cls.fingerprint = _keygen._get_fingerprint(gpg_tmp_dir).replace(" ", "")
+            (cls.home / "file").write_bytes(b"digest")
+            crypto.sign_file(cls.home / "file", cls.home / "key.private.gpg")
+        except:
+            cls.tearDownClass()
+            raise
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.stack.close()
+
+    def test_dearmor(self) -> None:
+        expected: bytes = subprocess.run(
+            ["/usr/bin/gpg", "--dearmor"],
+            input=GPG_KEY,
+            capture_output=True,
+            check=True,
+        ).stdout
+        self.assertEqual(dearmor(GPG_KEY), expected)
+        self.assertEqual(dearmor(expected), expected)
+
+    def test_key_id(self) -> None:
+        """Old signatures only carry the key ID of the issuer."""
+        self.assertEqual(signature_issuers(_signature(PLAYBOOK)), [GPG_KEY_ID])
+
+    def test_fingerprint(self) -> None:
+        signature: bytes = (self.home / "file.asc").read_bytes()
+        issuers = signature_issuers(signature)
+        self.assertEqual(issuers[0], self.fingerprint)
+        self.assertIn(self.fingerprint[-16:], issuers)
+
+    def test_binary(self) -> None:
+        signature: bytes = dearmor((self.home / "file.asc").read_bytes())
+        self.assertEqual(signature_issuers(signature)[0], self.fingerprint)
+
+    def test_malformed(self) -> None:
+        for signature in (b"", b"signature", b"\x88\x05\x04", dearmor(GPG_KEY)[:10]):
+            with self.subTest(signature=signature):
+                self.assertEqual(signature_issuers(signature), [])
+
+
+class TestKeyringFile(TestCase):
+    def test_cached(self) -> None:
+        path: Path = keyring_file(GPG_KEY)
+        self.assertEqual(path.read_bytes(), dearmor(GPG_KEY))
+        self.assertEqual(keyring_file(GPG_KEY), path)
+        self.assertNotEqual(keyring_file(dearmor(GPG_KEY)), path)
+
+
+class TestKeyring(TestCase):
+    stack: ClassVar[ExitStack]
+    fingerprint: ClassVar[str]
+    other_key: ClassVar[bytes]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.stack = ExitStack()
+        try:
+            home = Path(cls.stack.enter_context(TemporaryDirectory()))
+            with _keygen._generate_keys() as gpg_tmp_dir:
+                _keygen._export_key_pair(gpg_tmp_dir, home)
+                cls.fingerprint = _keygen._get_fingerprint(gpg_tmp_dir).replace(" ", "")
+            cls.other_key = (home / "key.public.gpg").read_bytes()
+        except:
+            cls.tearDownClass()
+            raise
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.stack.close()
+
+    def test_index(self) -> None:
+        keyring = Keyring([GPG_KEY, self.other_key])
+        self.assertEqual(len(keyring), 2)
+        for key_id in (
+            GPG_KEY_ID,
+            GPG_FINGERPRINT,
+            self.fingerprint,
+            "cbf0e7c0fe8f9a4d",
+        ):
+            with self.subTest(key_id=key_id):
+                self.assertIn(key_id, keyring)
+        self.assertNotIn("0000000000000000", keyring)
+
+    def test_key_for(self) -> None:
+        keyring = Keyring([self.other_key, GPG_KEY])
+        self.assertEqual(keyring.key_for(_signature(PLAYBOOK)), dearmor(GPG_KEY))
+        self.assertEqual(
+            keyring.key_for(b"unknown"), dearmor(self.other_key) + dearmor(GPG_KEY)
+        )
+
+    def test_not_a_key(self) -> None:
+        with self.assertRaises(ValueError):
+            Keyring([b"not a key"])
+        with self.assertRaises(ValueError):
+            Keyring([b""])
+
+    def test_verify_playbook(self) -> None:
+        keyring = Keyring([self.other_key, GPG_KEY])
+        self.assertEqual(
+            rhc_playbook_lib.verify_playbook(PLAYBOOK, keyring),
+            rhc_playbook_lib.verify_playbook(PLAYBOOK, GPG_KEY),
+        )
+
+    def test_verify_playbook_untrusted(self) -> None:
+        keyring = Keyring([self.other_key])
+        with self.assertRaises(rhc_playbook_lib.GPGValidationError):
+            rhc_playbook_lib.verify_playbook(PLAYBOOK, keyring)
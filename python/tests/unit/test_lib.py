@@ -1,11 +1,17 @@
+import concurrent.futures
+import dataclasses
 import pathlib
+import re
+import threading
+import time
 from contextlib import ExitStack
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from unittest import TestCase
+from unittest import TestCase, mock
 
 import rhc_playbook_lib
-from rhc_playbook_lib import GPGValidationError, PreconditionError, _keygen
+from rhc_playbook_lib import GPGValidationError, PreconditionError, _keygen, crypto
+from rhc_playbook_lib.serialization import Loader
 
 DATA = pathlib.Path(__file__).parents[3].absolute() / "data"
 GPG_KEY = (DATA / "public.gpg").read_bytes()
@@ -154,6 +160,21 @@ class TestVerifyPlaybook(TestCase):
                 expected: bytes = (PLAYBOOKS / f"{file}.digest.bin").read_bytes()
                 self.assertEqual(digest, expected)
 
+    def test_backends(self) -> None:
+        """Both verification backends accept valid plays and reject invalid ones."""
+        playbook: str = (PLAYBOOKS / "bugs.yml").read_text()
+        self.addCleanup(crypto.configure_backend)
+        for backend in ("gpg", "gpgv"):
+            with self.subTest(backend=backend):
+                crypto.configure_backend(backend)
+                self.assertEqual(
+                    len(rhc_playbook_lib.verify_playbook(playbook, GPG_KEY)), 4
+                )
+                with self.assertRaises(GPGValidationError):
+                    rhc_playbook_lib.verify_playbook(
+                        playbook.replace("0600", "0666"), GPG_KEY
+                    )
+
     def test_no_signature(self) -> None:
         parsed_play = {
             "name": "bad playbook",
@@ -180,6 +201,221 @@ class TestVerifyPlaybook(TestCase):
             rhc_playbook_lib.verify_play(parsed_play, gpg_key=GPG_KEY)
 
 
+class TestVerifyPlaybookPhases(TestCase):
+    """Plays are all checked before any signature is verified with GPG."""
+
+    SIGNED: str = (PLAYBOOKS / "bugs.yml").read_text()
+
+    def setUp(self) -> None:
+        self.verify = mock.Mock(side_effect=AssertionError("GPG must not be called"))
+        for backend in ("verify_gpg_signed_file", "verify_gpgv_signed_file"):
+            patcher = mock.patch.object(crypto, backend, self.verify)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_unsigned_play(self) -> None:
+        playbook = (
+            self.SIGNED + (DATA / "playbooks-unsigned" / "sample.yml").read_text()
+        )
+        with self.assertRaisesRegex(PreconditionError, "does not contain a signature"):
+            rhc_playbook_lib.verify_playbook(playbook, GPG_KEY)
+        self.verify.assert_not_called()
+
+    def test_invalid_exclusion(self) -> None:
+        playbook = self.SIGNED + (
+            "- name: bad exclusion\n"
+            "  vars:\n"
+            "    insights_signature: c2lnbmF0dXJl\n"
+            "    insights_signature_exclude: /tasks\n"
+        )
+        with self.assertRaisesRegex(PreconditionError, "cannot be excluded"):
+            rhc_playbook_lib.verify_playbook(playbook, GPG_KEY)
+        self.verify.assert_not_called()
+
+    def test_revoked_play(self) -> None:
+        digest: bytes = (PLAYBOOKS / "insights_remove.digest.bin").read_bytes()
+        revocation_list: str = (
+            "- name: revocation list\n"
+            "  vars:\n"
+            "    insights_signature: c2lnbmF0dXJl\n"
+            "    insights_signature_exclude: /vars/insights_signature\n"
+            "  revoked_playbooks:\n"
+            f"    - hash: {digest.hex()}\n"
+        )
+        playbook = self.SIGNED + (PLAYBOOKS / "insights_remove.yml").read_text()
+        # The revocation list is verified before a play is reported as revoked
+        self.verify.side_effect = None
+        with self.assertRaisesRegex(PreconditionError, "is on revocation list"):
+            rhc_playbook_lib.verify_playbook(
+                playbook, GPG_KEY, revocation_list=revocation_list
+            )
+        # Only the revocation list itself has been verified
+        self.assertEqual(self.verify.call_count, 1)
+
+
+class TestVerifyPlays(TestCase):
+    """Every play is verified, failures are returned instead of raised."""
+
+    def test_mixed(self) -> None:
+        digest: bytes = (PLAYBOOKS / "insights_remove.digest.bin").read_bytes()
+        playbook: str = (
+            (PLAYBOOKS / "insights_remove.yml").read_text()
+            + (DATA / "playbooks-unsigned" / "sample.yml").read_text()
+            + (PLAYBOOKS / "insights_remove.yml").read_text()
+        )
+        first, second, third = rhc_playbook_lib.verify_plays(playbook, GPG_KEY)
+        self.assertEqual(
+            (first.name, first.digest, first.error), ("Insights Disable", digest, None)
+        )
+        self.assertIsInstance(second.error, PreconditionError)
+        self.assertIsNone(second.digest)
+        self.assertEqual(third, dataclasses.replace(first, seconds=third.seconds))
+
+    def test_revoked(self) -> None:
+        digest: bytes = (PLAYBOOKS / "insights_remove.digest.bin").read_bytes()
+        playbook: str = (PLAYBOOKS / "insights_remove.yml").read_text()
+        (result,) = rhc_playbook_lib.verify_plays(playbook, GPG_KEY, {digest})
+        self.assertEqual(result.digest, digest)
+        self.assertRegex(str(result.error), "is on revocation list")
+
+    def test_invalid_signature(self) -> None:
+        playbook: str = (PLAYBOOKS / "insights_remove.yml").read_text()
+        playbook = playbook.replace("Insights Disable", "Insights Enable", 1)
+        (result,) = rhc_playbook_lib.verify_plays(playbook, GPG_KEY)
+        self.assertEqual(result.name, "Insights Enable")
+        self.assertIsInstance(result.error, GPGValidationError)
+
+    def test_no_plays(self) -> None:
+        with self.assertRaisesRegex(PreconditionError, "contains no plays"):
+            rhc_playbook_lib.verify_plays("[]", GPG_KEY)
+
+
+class TestVerifier(TestCase):
+    def test_threads(self) -> None:
+        """One verifier is shared by several threads, each with its own cache connection."""
+        playbooks: list[bytes] = [
+            (PLAYBOOKS / f"{name}.yml").read_bytes()
+            for name in ("insights_remove", "document-from-hell", "bugs")
+        ]
+        with TemporaryDirectory() as directory:
+            verifier = rhc_playbook_lib.Verifier(
+                GPG_KEY, cache_directory=Path(directory)
+            )
+            expected: list[list] = [
+                [r.digest for r in verifier.verify_playbook(p).plays] for p in playbooks
+            ]
+            with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+                reports = list(executor.map(verifier.verify_playbook, playbooks * 4))
+            verifier.close()
+        self.assertTrue(all(report.valid for report in reports))
+        self.assertEqual(
+            [[r.digest for r in report.plays] for report in reports], expected * 4
+        )
+
+    def test_loader_state(self) -> None:
+        """Creating loaders does not modify state shared by all threads."""
+        constructors = Loader.yaml_constructors
+        registered = dict(constructors)
+        rhc_playbook_lib.Verifier(GPG_KEY).verify_playbook(
+            (PLAYBOOKS / "insights_remove.yml").read_text()
+        )
+        self.assertIs(Loader.yaml_constructors, constructors)
+        self.assertEqual(Loader.yaml_constructors, registered)
+
+    def test_revocation_list(self) -> None:
+        """The revocation list is verified once, when the verifier is created."""
+        with mock.patch(
+            "rhc_playbook_lib.get_revocation_digests",
+            wraps=rhc_playbook_lib.get_revocation_digests,
+        ) as get_digests:
+            verifier = rhc_playbook_lib.Verifier(GPG_KEY, revocation_list=REVOKED)
+            for _ in range(2):
+                report = verifier.verify_playbook(
+                    (PLAYBOOKS / "insights_remove.yml").read_bytes()
+                )
+                self.assertTrue(report.valid)
+        get_digests.assert_called_once()
+        self.assertEqual(
+            verifier.revoked,
+            {
+                bytes.fromhex(
+                    "8ddc7c9fb264aa24d7b3536ecf00272ca143c2ddb14a499cdefab045f3403e9b"
+                ),
+                bytes.fromhex(
+                    "40a6e9af448208759bc4ef59b6c678227aae9b3f6291c74a4a8767eefc0a401f"
+                ),
+            },
+        )
+
+    def test_invalid_encoding(self) -> None:
+        verifier = rhc_playbook_lib.Verifier(GPG_KEY)
+        with self.assertRaisesRegex(PreconditionError, "not valid UTF-8"):
+            verifier.verify_playbook(b"- name: \xff")
+
+
+class TestRevocationList(TestCase):
+    def test_ok(self) -> None:
+        revocation_list = rhc_playbook_lib.RevocationList(REVOKED, GPG_KEY)
+        self.assertEqual(
+            revocation_list.wait(),
+            rhc_playbook_lib.get_revocation_digests(REVOKED, GPG_KEY),
+        )
+
+    def test_background(self) -> None:
+        """The signature is verified outside of the calling thread."""
+        threads: list[str] = []
+
+        def verify(*args: object) -> None:
+            threads.append(threading.current_thread().name)
+
+        with mock.patch.object(crypto, "verify_gpg_signed_file", side_effect=verify):
+            with mock.patch.object(
+                crypto, "verify_gpgv_signed_file", side_effect=verify
+            ):
+                rhc_playbook_lib.RevocationList(REVOKED, GPG_KEY).wait()
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.current_thread().name)
+
+    def test_seconds(self) -> None:
+        """The time of the verification in the background is counted."""
+
+        def verify(*args: object) -> None:
+            time.sleep(0.05)
+
+        with mock.patch.object(crypto, "verify_gpg_signed_file", side_effect=verify):
+            with mock.patch.object(
+                crypto, "verify_gpgv_signed_file", side_effect=verify
+            ):
+                revocation_list = rhc_playbook_lib.RevocationList(REVOKED, GPG_KEY)
+                revocation_list.wait()
+        assert revocation_list.seconds is not None
+        self.assertGreaterEqual(revocation_list.seconds, 0.05)
+
+    def test_bad_signature(self) -> None:
+        revocation_list = rhc_playbook_lib.RevocationList(REVOKED, b"")
+        with self.assertRaises(GPGValidationError):
+            revocation_list.wait()
+
+    def test_verify_playbook(self) -> None:
+        """A playbook is not verified if its revocation list is not."""
+        playbook: str = (PLAYBOOKS / "insights_remove.yml").read_text()
+        revocation_list = rhc_playbook_lib.RevocationList(REVOKED, b"")
+        with self.assertRaises(GPGValidationError):
+            rhc_playbook_lib.verify_playbook(
+                playbook, GPG_KEY, revocation_list=revocation_list
+            )
+
+    def test_tampered(self) -> None:
+        """A play revoked by a tampered list fails on the signature of the list."""
+        digest: bytes = (PLAYBOOKS / "insights_remove.digest.bin").read_bytes()
+        tampered: str = re.sub("hash: [0-9a-f]+", f"hash: {digest.hex()}", REVOKED)
+        playbook: str = (PLAYBOOKS / "insights_remove.yml").read_text()
+        with self.assertRaisesRegex(GPGValidationError, "does not match its signature"):
+            rhc_playbook_lib.verify_playbook(
+                playbook, GPG_KEY, revocation_list=tampered
+            )
+
+
 class TestGetRevocationDigests(TestCase):
     def test_ok(self) -> None:
         expected = {
@@ -0,0 +1,131 @@
+"""Unit tests for module ``rhc_playbook_lib.lint``."""
+
+import pathlib
+import textwrap
+from tempfile import TemporaryDirectory
+from unittest import TestCase, mock, skipUnless
+
+from rhc_playbook_lib import lint, serialization
+from rhc_playbook_lib.serialization import Loader
+
+PLAYBOOKS = pathlib.Path(__file__).parents[3].absolute() / "data" / "playbooks"
+
+
+def _rules(document: str) -> list[tuple[int, int, str, str]]:
+    return [
+        (finding.line or 0, finding.column or 0, finding.severity, finding.rule)
+        for finding in lint.lint_playbook(textwrap.dedent(document))
+    ]
+
+
+class TestLintPlaybook(TestCase):
+    def test_clean(self) -> None:
+        for name in ("bugs", "insights_remove"):
+            with self.subTest(playbook=name):
+                findings = lint.lint_file(PLAYBOOKS / f"{name}.yml")
+                self.assertEqual([f for f in findings if f.severity == lint.ERROR], [])
+
+    def test_tag(self) -> None:
+        self.assertEqual(
+            _rules("""\
+                - name: !!str tagged
+                  tasks: !custom []
+                  vars:
+                    insights_signature: !!binary aGk=
+                    other: !!binary aGk=
+                """),
+            [
+                (1, 9, lint.ERROR, "tag"),
+                (2, 10, lint.ERROR, "tag"),
+                (5, 12, lint.ERROR, "tag"),
+            ],
+        )
+
+    def test_alias(self) -> None:
+        self.assertEqual(
+            _rules("""\
+                - defined: &paths [/a]
+                  used: *paths
+                  undefined: *missing
+                """),
+            [(2, 9, lint.ERROR, "alias"), (3, 14, lint.ERROR, "alias")],
+        )
+        findings = lint.lint_playbook("- name: &html a\n- *html\n")
+        self.assertEqual(
+            [(f.line, f.column, f.rule) for f in findings], [(2, 3, "alias")]
+        )
+        self.assertIn("quote it", findings[0].message)
+        self.assertEqual(
+            _rules("""\
+                serve:
+                  - /robots.txt
+                  - *.html
+                """),
+            [(3, 6, lint.ERROR, "alias")],
+        )
+
+    def test_non_ascii(self) -> None:
+        findings = lint.lint_playbook(
+            '# Komentář\n- name: "escaped \\xc5\\xa1"\n  path: /tmp/x\u200b/\n'
+        )
+        self.assertEqual(
+            [(f.line, f.column, f.rule) for f in findings], [(3, 15, "non-ascii")]
+        )
+        self.assertIn("U+200B", findings[0].message)
+
+    def test_byte_order_mark(self) -> None:
+        findings = lint.lint_playbook("\ufeff- name: \u00e9\n")
+        self.assertEqual(
+            [(f.line, f.column, f.rule) for f in findings], [(1, 9, "non-ascii")]
+        )
+
+    def test_boolean(self) -> None:
+        self.assertEqual(
+            _rules("""\
+                - become: yes
+                  gather_facts: "on"
+                  check_mode: true
+                  no: 'off'
+                """),
+            [(1, 11, lint.WARNING, "boolean"), (4, 3, lint.WARNING, "boolean")],
+        )
+
+    def test_syntax(self) -> None:
+        findings = lint.lint_playbook("- name: [unclosed\n", "broken.yml")
+        self.assertEqual([f.rule for f in findings], ["syntax"])
+        self.assertTrue(str(findings[0]).startswith("broken.yml:2:1: error: "))
+
+    def test_budget(self) -> None:
+        with mock.patch.object(Loader, "max_bytes", 8):
+            findings = lint.lint_playbook("- name: too large\n")
+        self.assertEqual([(f.line, f.rule) for f in findings], [(None, "budget")])
+
+    @skipUnless(serialization.HAS_LIBYAML, "PyYAML is built without libyaml")
+    def test_same_as_loader(self) -> None:
+        """libyaml finds what the parser of ``Loader`` finds."""
+        documents: dict[str, str] = {
+            path.name: path.read_text() for path in sorted(PLAYBOOKS.glob("*.yml"))
+        }
+        documents["tags"] = "- !!str a: !x [*y, &z b, *z]\n  c: [on, 'off', yes]\n"
+        documents["bom"] = "\ufeff- name: \u00e9\n"
+        for name, document in documents.items():
+            with self.subTest(playbook=name):
+                findings = lint.lint_playbook(document)
+                with mock.patch.object(lint, "HAS_LIBYAML", False):
+                    expected = lint.lint_playbook(document)
+                self.assertEqual(findings, expected)
+
+
+class TestLintFiles(TestCase):
+    def test_order(self) -> None:
+        with TemporaryDirectory() as directory:
+            paths: list[pathlib.Path] = []
+            for i in range(6):
+                path = pathlib.Path(directory) / f"playbook-{i}.yml"
+                path.write_text(f"- name: !tag play {i}\n")
+                paths.append(path)
+            paths.append(pathlib.Path(directory) / "missing.yml")
+
+            findings = list(lint.lint_files(paths, jobs=2))
+        self.assertEqual([f.file for f in findings], [str(p) for p in paths])
+        self.assertEqual([f.rule for f in findings], ["tag"] * 6 + ["syntax"])
@@ -0,0 +1,83 @@
+"""Unit tests for module ``rhc_playbook_lib.manifest``."""
+
+import io
+import pathlib
+import shutil
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import rhc_playbook_lib
+from rhc_playbook_lib import manifest
+
+DATA = pathlib.Path(__file__).parents[3].absolute() / "data"
+PLAYBOOKS = DATA / "playbooks"
+GPG_KEY = (DATA / "public.gpg").read_bytes()
+
+
+class TestPlayDigest(TestCase):
+    def test_digest(self) -> None:
+        for file in ("insights_remove", "document-from-hell"):
+            with self.subTest(file=file):
+                raw: str = (PLAYBOOKS / f"{file}.yml").read_text()
+                (play,) = rhc_playbook_lib.parse_playbook(raw)
+                expected: bytes = (PLAYBOOKS / f"{file}.digest.bin").read_bytes()
+                self.assertEqual(manifest.play_digest(play), expected)
+
+    def test_no_exclusion(self) -> None:
+        with self.assertRaisesRegex(rhc_playbook_lib.PreconditionError, "exclude"):
+            manifest.play_digest({"name": "play", "tasks": []})
+
+
+class TestDigestFiles(TestCase):
+    def test_order(self) -> None:
+        """Entries follow the order of the files and plays, whatever the worker finishing first."""
+        paths: list[pathlib.Path] = manifest.find_playbooks(PLAYBOOKS)
+        entries = list(manifest.digest_files(paths, jobs=2))
+        expected = [
+            (str(path), i, name, digest)
+            for path in paths
+            for i, (name, digest) in enumerate(
+                rhc_playbook_lib.verify_playbook(path.read_text(), GPG_KEY), 1
+            )
+        ]
+        self.assertEqual(
+            [(e.file, e.play, e.name, e.digest) for e in entries], expected
+        )
+
+    def test_error(self) -> None:
+        with TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "unsigned.yml"
+            shutil.copy(DATA / "playbooks-unsigned" / "sample.yml", path)
+            with self.assertRaisesRegex(
+                rhc_playbook_lib.PreconditionError, "Cannot digest '.*unsigned.yml'"
+            ):
+                list(manifest.digest_files([path], jobs=1))
+
+    def test_prepare(self) -> None:
+        path = DATA / "playbooks-unsigned" / "sample.yml"
+        (entry,) = manifest.digest_file(path, prepare=_exclude_hosts)
+        self.assertEqual(entry.name, "Minimal play")
+        self.assertEqual(entry.play, 1)
+
+
+class TestWriteManifest(TestCase):
+    def test_revocation_list(self) -> None:
+        """Manifest items can be used as items of a revocation list."""
+        output = io.StringIO()
+        paths = [PLAYBOOKS / "bugs.yml", PLAYBOOKS / "insights_remove.yml"]
+        count: int = manifest.write_manifest(manifest.digest_files(paths), output)
+        self.assertEqual(count, 5)
+
+        items: list[dict] = rhc_playbook_lib.parse_playbook(output.getvalue())
+        self.assertEqual(items[-1]["name"], "Insights Disable")
+        self.assertEqual(items[-1]["play"], 1)
+        revoked: set[bytes] = {bytes.fromhex(item["hash"]) for item in items}
+        results = rhc_playbook_lib.verify_plays(
+            (PLAYBOOKS / "bugs.yml").read_text(), GPG_KEY, revoked
+        )
+        for result in results:
+            self.assertRegex(str(result.error), "is on revocation list")
+
+
+def _exclude_hosts(play: dict) -> dict:
+    return {**play, "vars": {"insights_signature_exclude": "/hosts"}}
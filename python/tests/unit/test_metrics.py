@@ -0,0 +1,89 @@
+"""Unit tests for module ``rhc_playbook_verifier.metrics``."""
+
+import concurrent.futures
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from rhc_playbook_lib import GPGValidationError, PlayRevokedError
+from rhc_playbook_verifier import metrics
+
+RUNS_OK = 'rhc_playbook_verifier_runs_total{result="ok"}'
+RUNS_FAILED = 'rhc_playbook_verifier_runs_total{result="failed"}'
+
+
+def _failing_run(path: Path, exc: Exception) -> None:
+    try:
+        with metrics.session(path):
+            raise exc
+    except type(exc):
+        pass
+
+
+class TestMetrics(TestCase):
+    def setUp(self) -> None:
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "verifier.prom"
+
+    def test_runs(self) -> None:
+        for _ in range(2):
+            with metrics.session(self.path):
+                with metrics.stage("verify"):
+                    metrics.add_playbook("- name: play ✓\n")
+                    metrics.add_plays(3)
+                metrics.observe_stage("revocation list", 0.2)
+        _failing_run(self.path, PlayRevokedError("revoked"))
+        _failing_run(self.path, GPGValidationError("invalid", b"", b"", b""))
+        _failing_run(self.path, OSError("other"))
+
+        samples: dict[str, float] = metrics.read_samples(self.path)
+        failures: str = "rhc_playbook_verifier_failures_total"
+        self.assertEqual(samples[RUNS_OK], 2)
+        self.assertEqual(samples[RUNS_FAILED], 3)
+        self.assertEqual(samples[f'{failures}{{reason="revoked"}}'], 1)
+        self.assertEqual(samples[f'{failures}{{reason="GPGValidationError"}}'], 1)
+        self.assertEqual(samples[f'{failures}{{reason="other"}}'], 1)
+        self.assertEqual(samples["rhc_playbook_verifier_plays_verified_total"], 6)
+        self.assertEqual(samples["rhc_playbook_verifier_playbook_bytes_total"], 34)
+        duration: str = "rhc_playbook_verifier_duration_seconds"
+        self.assertEqual(samples[f'{duration}_count{{stage="verify"}}'], 2)
+        self.assertEqual(samples[f'{duration}_sum{{stage="revocation list"}}'], 0.4)
+        self.assertEqual(samples[f'{duration}_count{{stage="run"}}'], 5)
+        self.assertEqual(samples[f'{duration}_bucket{{stage="run",le="+Inf"}}'], 5)
+
+        text: str = self.path.read_text()
+        self.assertEqual(
+            text.count(f"# TYPE {duration} histogram\n"), 1, "one header per family"
+        )
+        self.assertEqual(list(self.path.parent.glob(".verifier.prom.*")), [])
+
+    def test_concurrent(self) -> None:
+        """Updates of concurrent runs are not lost."""
+
+        def run() -> None:
+            with metrics.session(self.path):
+                pass
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            for future in [executor.submit(run) for _ in range(40)]:
+                future.result()
+        self.assertEqual(metrics.read_samples(self.path)[RUNS_OK], 40)
+
+    def test_unknown_samples(self) -> None:
+        self.path.write_text(
+            f"# a comment\nnode_load1 0.5\n{RUNS_OK} 7\n{RUNS_FAILED} garbage\n"
+        )
+        with metrics.session(self.path):
+            pass
+        samples: dict[str, float] = metrics.read_samples(self.path)
+        self.assertEqual(samples[RUNS_OK], 8)
+        self.assertNotIn(RUNS_FAILED, samples)
+        self.assertNotIn("node_load1", self.path.read_text())
+        self.assertNotIn(RUNS_FAILED, self.path.read_text())
+
+    def test_disabled(self) -> None:
+        with metrics.session(None):
+            with metrics.stage("verify"):
+                metrics.add_plays(1)
+        self.assertFalse(self.path.exists())
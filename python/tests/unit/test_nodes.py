@@ -0,0 +1,178 @@
+"""Unit tests for module ``rhc_playbook_lib.nodes``."""
+
+import pathlib
+from typing import Optional
+from unittest import TestCase
+
+import rhc_playbook_lib
+import yaml
+from rhc_playbook_lib import nodes
+from rhc_playbook_lib.serialization import Loader, serialize_play
+
+DATA = pathlib.Path(__file__).parents[3].absolute() / "data"
+FIXTURES = sorted(
+    [
+        *(DATA / "playbooks").glob("*.yml"),
+        *(DATA / "playbooks-unsigned").glob("*.yml"),
+        DATA / "revoked_playbooks.yml",
+    ]
+)
+
+SIGNATURE = "vars:\n    insights_signature: c2lnbmF0dXJl\n"
+
+
+def _digests(playbook: str) -> list[Optional[bytes]]:
+    """Digest each play from its nodes, ``None`` for unsupported plays."""
+    loader = Loader(playbook)
+    try:
+        root = loader.get_single_node()
+    finally:
+        loader.dispose()
+    assert isinstance(root, yaml.SequenceNode)
+    result: list[Optional[bytes]] = []
+    for node in root.value:
+        try:
+            result.append(nodes.digest_play(loader, node).digest)
+        except nodes.Unsupported:
+            result.append(None)
+    return result
+
+
+def _reference_digests(playbook: str) -> list[bytes]:
+    return [
+        rhc_playbook_lib.create_play_digest(
+            serialize_play(rhc_playbook_lib.clean_play(play)).encode("utf-8")
+        )
+        for play in rhc_playbook_lib.parse_playbook(playbook)
+    ]
+
+
+class TestDigestPlay(TestCase):
+    def assertSameDigests(self, playbook: str) -> None:
+        actual = _digests(playbook)
+        self.assertNotIn(None, actual)
+        self.assertEqual(actual, _reference_digests(playbook))
+
+    def test_fixtures(self) -> None:
+        """Plays of all fixtures have the same digest as their constructed objects."""
+        for path in FIXTURES:
+            with self.subTest(file=path.name):
+                raw: str = path.read_text()
+                actual = _digests(raw)
+                for play, digest in zip(rhc_playbook_lib.parse_playbook(raw), actual):
+                    if digest is None:
+                        # Plays left to the reference implementation are rejected by it
+                        with self.assertRaises(rhc_playbook_lib.PreconditionError):
+                            rhc_playbook_lib.verify_play(play, b"")
+                        continue
+                    expected = rhc_playbook_lib.create_play_digest(
+                        serialize_play(rhc_playbook_lib.clean_play(play)).encode()
+                    )
+                    self.assertEqual(digest, expected)
+
+    def test_signed_fixtures(self) -> None:
+        for file in ("insights_remove", "document-from-hell"):
+            with self.subTest(file=file):
+                raw: str = (DATA / "playbooks" / f"{file}.yml").read_text()
+                expected: bytes = (
+                    DATA / "playbooks" / f"{file}.digest.bin"
+                ).read_bytes()
+                self.assertEqual(_digests(raw), [expected])
+
+    def test_scalars(self) -> None:
+        self.assertSameDigests(
+            "- name: scalars\n"
+            "  values: [1, 0x1f, -0b11, 1_000, 1.5, .inf, true, FALSE, yes, null, ~,\n"
+            "           '', 'quoted', \"both'\\\"\", 12:30, 2024-01-01, !!str 3]\n"
+            '  tab: "a\\tb\\\\c\\u200b"\n'
+            "  binary: !!binary YWJj\n"
+            "  "
+            + SIGNATURE
+            + "    insights_signature_exclude: /vars/insights_signature\n"
+        )
+
+    def test_keys(self) -> None:
+        """Keys are constructed and duplicates follow the semantics of dictionaries."""
+        self.assertSameDigests(
+            "- 1: int\n"
+            "  true: bool\n"
+            "  null: none\n"
+            "  a: first\n"
+            "  b: other\n"
+            "  a: last\n"
+            "  "
+            + SIGNATURE
+            + "    insights_signature_exclude: /vars/insights_signature\n"
+        )
+
+    def test_merge_keys(self) -> None:
+        self.assertSameDigests(
+            "- name: merged\n"
+            "  base: &base {a: 1, b: 2}\n"
+            "  task:\n"
+            "    <<: *base\n"
+            "    b: 3\n"
+            "  "
+            + SIGNATURE
+            + "    insights_signature_exclude: /vars/insights_signature\n"
+        )
+
+    def test_shared_excluded_vars(self) -> None:
+        """Exclusions apply to every alias of the excluded mapping, like in the deep copy."""
+        self.assertSameDigests(
+            "- name: shared\n"
+            "  hosts: localhost\n"
+            "  vars: &vars\n"
+            "    insights_signature: c2lnbmF0dXJl\n"
+            "    insights_signature_exclude: /hosts,/vars/insights_signature\n"
+            "  copy: *vars\n"
+            "- name: second\n"
+            "  hosts: all\n"
+            "  vars: *vars\n"
+        )
+
+    def test_empty_collections(self) -> None:
+        self.assertSameDigests(
+            "- name: empty\n"
+            "  hosts: {}\n"
+            "  tasks: []\n"
+            "  nested: [[], {}, [{}]]\n"
+            "  "
+            + SIGNATURE
+            + "    insights_signature_exclude: /vars/insights_signature\n"
+        )
+
+    def test_excluded_tags(self) -> None:
+        """Excluded fields the loader cannot construct are rejected, like in the reference way."""
+        for raw in (
+            "- hosts: !unknown localhost\n"
+            "  "
+            + SIGNATURE
+            + "    insights_signature_exclude: /hosts,/vars/insights_signature\n",
+            "- vars:\n"
+            "    insights_signature: !unknown c2lnbmF0dXJl\n"
+            "    insights_signature_exclude: /vars/insights_signature\n",
+        ):
+            with self.subTest(raw=raw):
+                with self.assertRaises(yaml.constructor.ConstructorError):
+                    _digests(raw)
+                with self.assertRaises(yaml.constructor.ConstructorError):
+                    rhc_playbook_lib.verify_playbook(raw, b"")
+
+    def test_unsupported(self) -> None:
+        for raw in (
+            "- name: no vars\n",
+            "- vars: {insights_signature_exclude: /hosts}\n",
+            "- vars: {insights_signature: c2ln}\n",
+            "- vars: {insights_signature: c2ln, insights_signature_exclude: /other}\n",
+            "- vars: {insights_signature: c2ln, insights_signature_exclude: /hosts}\n",
+            "- vars:\n    insights_signature: c2ln\n    insights_signature_exclude: /vars,/vars\n",
+            "- vars: {insights_signature: c2ln, insights_signature_exclude: /vars/a/b}\n",
+            "- vars: {insights_signature: c2ln, insights_signature_exclude: /vars}\n"
+            "  set: !!set {a}\n",
+            "- vars: {insights_signature: c2ln, insights_signature_exclude: /vars}\n"
+            "  ? [key]\n"
+            "  : value\n",
+        ):
+            with self.subTest(raw=raw):
+                self.assertEqual(_digests(raw), [None])
@@ -0,0 +1,53 @@
+"""Unit tests for module ``rhc_playbook_lib.profiling``."""
+
+import pstats
+import tracemalloc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from rhc_playbook_lib import GPGValidationError, profiling
+
+
+class TestSession(TestCase):
+    def test_profile_and_memory(self) -> None:
+        with TemporaryDirectory() as directory:
+            profile = Path(directory) / "profile.pstats"
+            memory = Path(directory) / "memory.txt"
+            with profiling.session(profile, memory):
+                with profiling.stage("allocate"):
+                    kept: list[bytes] = [bytes(1024) for _ in range(1024)]
+                with profiling.stage("release"):
+                    kept.clear()
+
+            stats = pstats.Stats(str(profile))
+            summary: str = memory.read_text()
+        self.assertTrue(stats.get_stats_profile().func_profiles)
+        self.assertFalse(tracemalloc.is_tracing())
+        rows: dict[str, list[float]] = {
+            line.split()[0]: [float(v) for v in line.split()[1:]]
+            for line in summary.splitlines()
+            if line.startswith(("allocate ", "release "))
+        }
+        self.assertGreater(rows["allocate"][1], 1000)
+        self.assertLess(rows["release"][1], -1000)
+        self.assertGreaterEqual(rows["release"][0], rows["release"][1])
+        self.assertIn("Top allocations retained by 'allocate':", summary)
+        self.assertIn("test_profiling.py", summary)
+
+    def test_exception(self) -> None:
+        """Exceptions leave the session and its stages unchanged."""
+        error = GPGValidationError("Play digest does not match", b"", b"", b"")
+        with TemporaryDirectory() as directory:
+            memory = Path(directory) / "memory.txt"
+            with self.assertRaises(GPGValidationError) as context:
+                with profiling.session(trace_memory=memory):
+                    with profiling.stage("verify"):
+                        raise error
+            self.assertIn("Top allocations retained by 'verify':", memory.read_text())
+        self.assertIs(context.exception, error)
+
+    def test_disabled(self) -> None:
+        with profiling.session():
+            with profiling.stage("nothing"):
+                self.assertFalse(tracemalloc.is_tracing())
@@ -1,7 +1,39 @@
-from unittest import TestCase
+import io
+import pathlib
+import time
+import tracemalloc
+from typing import Any, Iterator
+from unittest import TestCase, mock
 
+import rhc_playbook_lib
 import yaml
-from rhc_playbook_lib.serialization import CustomYamlDumper, Serializer
+from rhc_playbook_lib.serialization import (
+    CustomSafeConstructor,
+    CustomYamlDumper,
+    IterativeSerializer,
+    Loader,
+    PlaybookWriter,
+    Serializer,
+    serialize_play,
+)
+
+from tests.unit.differential import reference_str
+
+PLAYBOOKS = pathlib.Path(__file__).parents[3].absolute() / "data" / "playbooks"
+GPG_KEY = (PLAYBOOKS.parent / "public.gpg").read_bytes()
+
+
+def _strings(value: Any) -> Iterator[str]:
+    """Yield all strings in a parsed playbook, including mapping keys."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _strings(key)
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+    elif isinstance(value, str):
+        yield value
 
 
 class TestPlaybookSerializer(TestCase):
@@ -78,12 +110,272 @@ class TestPlaybookSerializer(TestCase):
                 result = Serializer._str(source)
                 self.assertEqual(result, expected)
 
+    def test_strings_escapes(self) -> None:
+        for source in (
+            "\\n is not a newline",
+            "trailing backslash\\",
+            "mixed\t\\\n\u200b'\"",
+            "non-ASCII without escapes: tříštivá",
+            "non-ASCII with escapes:\ttříštivá\\",
+            "",
+        ):
+            with self.subTest(source):
+                self.assertEqual(Serializer._str(source), reference_str(source))
+
+    def test_strings_fixtures(self) -> None:
+        for file in ("unicode", "bugs", "document-from-hell", "insights_remove"):
+            with self.subTest(file=file):
+                raw: str = (PLAYBOOKS / f"{file}.yml").read_text()
+                for source in _strings(rhc_playbook_lib.parse_playbook(raw)):
+                    self.assertEqual(Serializer._str(source), reference_str(source))
+
+
+class TestIterativeSerializer(TestCase):
+    DEPTH = 10**4
+
+    def test_same_as_recursive(self) -> None:
+        for source in (
+            {},
+            [],
+            {"a": None, "b": True, 3: 1.5, "c": [[], {}, ["x", {"y": b"z"}]]},
+            [{"a": [1, 2, {"b": "'\"\\"}]}, "tail"],
+        ):
+            with self.subTest(source=source):
+                self.assertEqual(
+                    IterativeSerializer.serialize(source), Serializer._obj(source)
+                )
+
+    def test_fixtures(self) -> None:
+        for file in ("unicode", "bugs", "document-from-hell", "insights_remove"):
+            with self.subTest(file=file):
+                raw: str = (PLAYBOOKS / f"{file}.yml").read_text()
+                for play in rhc_playbook_lib.parse_playbook(raw):
+                    self.assertEqual(
+                        IterativeSerializer.serialize(play), Serializer._obj(play)
+                    )
+
+    def test_deep_dict(self) -> None:
+        source: dict = {"leaf": "value"}
+        for _ in range(self.DEPTH):
+            source = {"vars": source}
+        expected = (
+            "ordereddict([('vars', " * self.DEPTH
+            + "ordereddict([('leaf', 'value')])"
+            + ")])" * self.DEPTH
+        )
+        self.assertEqual(IterativeSerializer.serialize(source), expected)
+
+    def test_shared_alias(self) -> None:
+        (play,) = rhc_playbook_lib.parse_playbook("- a: &x [1]\n  b: *x\n")
+        self.assertEqual(
+            IterativeSerializer.serialize(play), "ordereddict([('a', [1]), ('b', [1])])"
+        )
+
+    def test_recursive_alias(self) -> None:
+        """The Loader rejects recursive aliases, structures built in code are caught too."""
+        sequence: list = []
+        sequence.append(sequence)
+        mapping: dict = {"x": []}
+        mapping["x"].append(mapping)
+        for play in (sequence, mapping):
+            with self.subTest(play=type(play)):
+                with self.assertRaisesRegex(ValueError, "recursive structure"):
+                    IterativeSerializer.serialize(play)
+
+    def test_deep_list(self) -> None:
+        source: list = []
+        for _ in range(self.DEPTH):
+            source = [source, 1]
+        expected = "[" * self.DEPTH + "[]" + ", 1]" * self.DEPTH
+        self.assertEqual(IterativeSerializer.serialize(source), expected)
+
+    def test_deep_blocks(self) -> None:
+        """Nested block/rescue structures as generated playbooks contain them."""
+        source: list = [{"name": "leaf"}]
+        for _ in range(self.DEPTH):
+            source = [{"block": source, "rescue": []}]
+        expected = (
+            "[ordereddict([('block', " * self.DEPTH
+            + "[ordereddict([('name', 'leaf')])]"
+            + "), ('rescue', [])])]" * self.DEPTH
+        )
+        self.assertEqual(IterativeSerializer.serialize(source), expected)
+
+
+def _laughs(levels: int) -> str:
+    """Build a billion laughs document, each level holds ten aliases of the previous one."""
+    lines: list[str] = ["- vars:", '    l0: &l0 ["lol"]']
+    for level in range(1, levels + 1):
+        lines.append(f"    l{level}: &l{level} [{', '.join([f'*l{level - 1}'] * 10)}]")
+    return "\n".join(lines) + "\n"
+
+
+class TestLoaderBudgets(TestCase):
+    """Adversarial documents are rejected quickly, before they take much memory."""
+
+    # Envelope every document is rejected within, in seconds and bytes
+    TIME = 2.0
+    MEMORY = 16 * 1024 * 1024
+
+    def assertRejected(self, raw: str, message: str) -> None:
+        for function in (
+            rhc_playbook_lib.parse_playbook,
+            lambda raw: rhc_playbook_lib.verify_playbook(raw, GPG_KEY),
+        ):
+            tracemalloc.start()
+            start: float = time.perf_counter()
+            try:
+                with self.assertRaisesRegex(
+                    rhc_playbook_lib.PreconditionError, message
+                ):
+                    function(raw)
+                elapsed: float = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.assertLess(elapsed, self.TIME)
+            self.assertLess(peak, self.MEMORY)
+
+    def test_billion_laughs(self) -> None:
+        self.assertRejected(_laughs(9), "Aliases expand")
+
+    def test_quadratic_blowup(self) -> None:
+        """A single large anchor aliased many times."""
+        raw: str = (
+            "- vars:\n    a: &a [" + ", ".join(["x"] * 1_000) + "]\n"
+            "    b: [" + ", ".join(["*a"] * 1_000) + "]\n"
+        )
+        self.assertRejected(raw, "Aliases expand")
+
+    def test_flow_nesting(self) -> None:
+        self.assertRejected("- " + "[" * 100_000 + "]" * 100_000 + "\n", "nested")
+
+    def test_block_nesting(self) -> None:
+        self.assertRejected("- " * 1_000 + "x\n", "nested")
+
+    def test_recursive_alias(self) -> None:
+        for raw in ("- &a [*a]\n", "- &a {x: [*a]}\n"):
+            with self.subTest(raw=raw):
+                self.assertRejected(raw, "refers to its own node")
+
+    def test_nodes(self) -> None:
+        with mock.patch.object(Loader, "max_nodes", 1_000):
+            self.assertRejected("- [" + ", ".join(["x"] * 1_000) + "]\n", "nodes")
+
+    def test_size(self) -> None:
+        with mock.patch.object(Loader, "max_bytes", 1_000):
+            self.assertRejected("- " + "x" * 1_000 + "\n", "larger than")
+            # Characters are counted in UTF-8
+            self.assertRejected("- " + "\u00e9" * 500 + "\n", "larger than")
+            self.assertEqual(
+                rhc_playbook_lib.parse_playbook("- " + "\u00e9" * 400 + "\n"),
+                ["\u00e9" * 400],
+            )
+
+    def test_within_budgets(self) -> None:
+        """Aliases and nesting as playbooks use them are accepted."""
+        (play,) = rhc_playbook_lib.parse_playbook(_laughs(3))
+        self.assertEqual(len(play["vars"]["l3"]), 10)
+        self.assertEqual(
+            rhc_playbook_lib.parse_playbook("- " * 100 + "x\n"),
+            rhc_playbook_lib.parse_playbook("- " + "[" * 99 + "x" + "]" * 99 + "\n"),
+        )
+
+
+class TestStringDeduplication(TestCase):
+    RAW: str = (
+        "- name: first\n"
+        "  tasks:\n"
+        "    - ansible.builtin.shell: systemctl restart rhcd\n"
+        "    - ansible.builtin.shell: systemctl restart rhcd\n"
+        "- name: second\n"
+        "  tasks:\n"
+        f"    - ansible.builtin.shell: {'x' * 100}\n"
+        f"    - ansible.builtin.shell: {'x' * 100}\n"
+    )
+
+    def test_shared(self) -> None:
+        first, second = rhc_playbook_lib.parse_playbook(self.RAW)
+        (key_1,), (key_2,) = (task.keys() for task in first["tasks"])
+        (key_3,), (key_4,) = (task.keys() for task in second["tasks"])
+        self.assertTrue(key_1 is key_2 is key_3 is key_4)
+        self.assertIs(
+            first["tasks"][0]["ansible.builtin.shell"],
+            first["tasks"][1]["ansible.builtin.shell"],
+        )
+        # Long strings are rarely repeated, they are not looked up
+        self.assertIsNot(
+            second["tasks"][0]["ansible.builtin.shell"],
+            second["tasks"][1]["ansible.builtin.shell"],
+        )
+
+    def test_serialization(self) -> None:
+        """Deduplication changes neither the values nor their serialization."""
+        with mock.patch.object(CustomSafeConstructor, "intern_max_length", None):
+            plain = rhc_playbook_lib.parse_playbook(self.RAW)
+        interned = rhc_playbook_lib.parse_playbook(self.RAW)
+        self.assertEqual(interned, plain)
+        self.assertEqual(
+            [serialize_play(play) for play in interned],
+            [serialize_play(play) for play in plain],
+        )
+        first, _ = plain
+        self.assertIsNot(*(task["ansible.builtin.shell"] for task in first["tasks"]))
+
 
 class TestYamlDumper(TestCase):
     def test_represent_none(self) -> None:
         """Test that None is represented as an empty string in YAML."""
-        yaml.Dumper.add_representer(type(None), CustomYamlDumper.represent_none)
         source = {"key": None}
         result: str = yaml.dump(source, Dumper=CustomYamlDumper)
         expected: str = "key:\n"
         self.assertEqual(result, expected)
+
+
+class TestPlaybookWriter(TestCase):
+    def test_same_as_dump(self) -> None:
+        for file in ("unicode", "bugs", "document-from-hell", "insights_remove"):
+            with self.subTest(file=file):
+                raw: str = (PLAYBOOKS / f"{file}.yml").read_text()
+                plays: list[dict] = rhc_playbook_lib.parse_playbook(raw)
+
+                expected = io.StringIO()
+                yaml.dump(plays, expected, sort_keys=False)
+                actual = io.StringIO()
+                with PlaybookWriter(actual) as writer:
+                    for play in plays:
+                        writer.write(play)
+
+                self.assertEqual(actual.getvalue(), expected.getvalue())
+
+    def test_anchors_are_unique(self) -> None:
+        shared: list = ["a", "b"]
+        plays: list[dict] = [{"x": shared, "y": shared}, {"x": ["c"]}]
+        plays[1]["y"] = plays[1]["x"]
+
+        expected = io.StringIO()
+        yaml.dump(plays, expected, sort_keys=False)
+        actual = io.StringIO()
+        with PlaybookWriter(actual) as writer:
+            for play in plays:
+                writer.write(play)
+
+        self.assertEqual(actual.getvalue(), expected.getvalue())
+        self.assertEqual(yaml.safe_load(actual.getvalue()), plays)
+
+    def test_written_before_close(self) -> None:
+        output = io.StringIO()
+        with PlaybookWriter(output) as writer:
+            writer.write({"name": "first", "tasks": []})
+            writer.write({"name": "second", "tasks": []})
+            self.assertIn("name: first", output.getvalue())
+
+    def test_failure_is_not_valid_yaml(self) -> None:
+        output = io.StringIO()
+        with self.assertRaises(RuntimeError):
+            with PlaybookWriter(output) as writer:
+                writer.write({"name": "first", "tasks": []})
+                raise RuntimeError("Signing failed.")
+        self.assertIn(PlaybookWriter.FAILURE_MARKER, output.getvalue())
+        with self.assertRaises(yaml.YAMLError):
+            yaml.safe_load(output.getvalue())
@@ -0,0 +1,208 @@
+"""Unit tests for module ``rhc_playbook_signer.app``."""
+
+import io
+import pathlib
+from subprocess import CalledProcessError
+from tempfile import TemporaryDirectory
+from unittest import TestCase, mock, skipUnless
+
+import rhc_playbook_lib
+import yaml
+from rhc_playbook_lib import _keygen, crypto, serialization
+from rhc_playbook_signer import app
+
+DATA = pathlib.Path(__file__).parents[3].absolute() / "data"
+
+
+class TestSendSigningRequest(TestCase):
+    def setUp(self) -> None:
+        self.addCleanup(crypto.configure_timeouts)
+        patcher = mock.patch.object(app.time, "sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retry(self) -> None:
+        failure = CalledProcessError(1, "rpm-sign")
+        with mock.patch.object(
+            app, "_send_signing_request", side_effect=[failure, b"signature"]
+        ) as request:
+            self.assertEqual(app.send_signing_request(b"digest", "key"), b"signature")
+        self.assertEqual(request.call_count, 2)
+        self.sleep.assert_called_once_with(app.SIGNING_RETRY_DELAY)
+
+    def test_attempts_exhausted(self) -> None:
+        timeout = crypto.DeadlineExceeded("rpm-sign timed out")
+        with mock.patch.object(
+            app, "_send_signing_request", side_effect=timeout
+        ) as request:
+            with self.assertRaises(crypto.DeadlineExceeded):
+                app.send_signing_request(b"digest", "key")
+        self.assertEqual(request.call_count, app.SIGNING_ATTEMPTS)
+        self.assertEqual(
+            [call.args[0] for call in self.sleep.call_args_list],
+            [app.SIGNING_RETRY_DELAY * 2**i for i in range(app.SIGNING_ATTEMPTS - 1)],
+        )
+
+    def test_no_retry_past_deadline(self) -> None:
+        """A retry that cannot finish before the deadline is not attempted."""
+        crypto.configure_timeouts(deadline=app.SIGNING_RETRY_DELAY / 2)
+        failure = CalledProcessError(1, "rpm-sign")
+        with mock.patch.object(
+            app, "_send_signing_request", side_effect=failure
+        ) as request:
+            with self.assertRaises(CalledProcessError):
+                app.send_signing_request(b"digest", "key")
+        self.assertEqual(request.call_count, 1)
+        self.sleep.assert_not_called()
+
+
+@skipUnless(serialization.HAS_LIBYAML, "PyYAML is built without libyaml")
+class TestDumpPlaybook(TestCase):
+    """Playbooks signed with the libyaml emitter are the same as with the Python one."""
+
+    public_key: bytes
+    # Signed plays of the test playbooks, by file name
+    playbooks: dict[str, list[dict]]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        with TemporaryDirectory() as directory:
+            keys = pathlib.Path(directory)
+            with _keygen._generate_keys() as gpg_tmp_dir:
+                _keygen._export_key_pair(gpg_tmp_dir, keys)
+            cls.public_key = (keys / "key.public.gpg").read_bytes()
+            with app.digest_signer(
+                local_key=keys / "key.private.gpg", remote_key=None
+            ) as sign:
+                cls.playbooks = {
+                    path.name: [
+                        app.sign_play(play, sign=sign)
+                        for play in rhc_playbook_lib.parse_playbook(path.read_text())
+                    ]
+                    for path in sorted(DATA.glob("playbooks*/*.yml"))
+                }
+
+    def test_same_as_python(self) -> None:
+        emitted: int = 0
+        for name, plays in self.playbooks.items():
+            with self.subTest(playbook=name):
+                expected: str = yaml.dump(
+                    plays, Dumper=serialization.CustomYamlDumper, sort_keys=False
+                )
+                output = io.StringIO()
+                serialization.dump_playbook(plays, output)
+                self.assertEqual(output.getvalue(), expected)
+                if (
+                    serialization.playbook_dumper(plays)
+                    is serialization.CustomYamlDumper
+                ):
+                    continue
+                emitted += 1
+                self.assertEqual(
+                    yaml.dump(
+                        plays, Dumper=serialization.CustomYamlCDumper, sort_keys=False
+                    ),
+                    expected,
+                )
+        self.assertGreater(emitted, 0)
+
+    def test_verifies(self) -> None:
+        for name, plays in self.playbooks.items():
+            with self.subTest(playbook=name):
+                verified = [
+                    rhc_playbook_lib.verify_playbook(
+                        yaml.dump(plays, Dumper=dumper, sort_keys=False),
+                        self.public_key,
+                    )
+                    for dumper in (
+                        serialization.CustomYamlDumper,
+                        serialization.CustomYamlCDumper,
+                    )
+                ]
+                self.assertEqual(verified[0], verified[1])
+
+    def test_unsafe_keys(self) -> None:
+        """Keys the emitters write differently are dumped with the Python emitter."""
+        for plays in (
+            [{"": "x"}],
+            [{"a\rb": 1}],
+            [{"k\u00e9y": 1}],
+            [{"k" * 65: 1}],
+        ):
+            with self.subTest(plays=plays):
+                self.assertIs(
+                    serialization.playbook_dumper(plays), serialization.CustomYamlDumper
+                )
+                output = io.StringIO()
+                serialization.dump_playbook(plays, output)
+                self.assertEqual(
+                    output.getvalue(),
+                    yaml.dump(
+                        plays, Dumper=serialization.CustomYamlDumper, sort_keys=False
+                    ),
+                )
+
+    def test_none_is_scoped(self) -> None:
+        """Other dumpers keep writing ``None`` as ``null``."""
+        self.assertEqual(yaml.dump({"key": None}), "key: null\n")
+        self.assertEqual(
+            yaml.dump({"key": None}, Dumper=serialization.CustomYamlCDumper),
+            "key:\n",
+        )
+
+
+class TestSelfVerify(TestCase):
+    public_key: bytes
+    document: str
+    plays: int
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        with TemporaryDirectory() as directory:
+            keys = pathlib.Path(directory)
+            with _keygen._generate_keys() as gpg_tmp_dir:
+                _keygen._export_key_pair(gpg_tmp_dir, keys)
+            cls.public_key = (keys / "key.public.gpg").read_bytes()
+            with app.digest_signer(
+                local_key=keys / "key.private.gpg", remote_key=None
+            ) as sign:
+                plays: list[dict] = [
+                    app.sign_play(play, sign=sign)
+                    for play in rhc_playbook_lib.parse_playbook(
+                        (DATA / "playbooks" / "bugs.yml").read_text()
+                    )
+                ]
+        cls.plays = len(plays)
+        output = io.StringIO()
+        serialization.dump_playbook(plays, output)
+        cls.document = output.getvalue()
+
+    def setUp(self) -> None:
+        self.addCleanup(crypto.configure_backend)
+
+    def test_one_import(self) -> None:
+        """The key is imported once for all plays on the gpg backend."""
+        crypto.configure_backend("gpg")
+        with mock.patch.object(
+            crypto, "gpg_import_command", wraps=crypto.gpg_import_command
+        ) as command:
+            app.self_verify(self.document, self.public_key, plays=self.plays)
+        self.assertGreater(self.plays, 1)
+        self.assertEqual(command.call_count, 1)
+
+    @skipUnless(pathlib.Path(crypto.GPGV).is_file(), "gpgv is not installed")
+    def test_gpgv(self) -> None:
+        """The key is not imported at all on the gpgv backend."""
+        crypto.configure_backend("gpgv")
+        with mock.patch.object(
+            crypto, "gpg_import_command", wraps=crypto.gpg_import_command
+        ) as command:
+            app.self_verify(self.document, self.public_key, plays=self.plays)
+        command.assert_not_called()
+
+    def test_mismatch(self) -> None:
+        crypto.configure_backend("gpg")
+        document: str = self.document.replace("LoginGraceTime", "LoginGraceTimes", 1)
+        self.assertNotEqual(document, self.document)
+        with self.assertRaises(rhc_playbook_lib.GPGValidationError):
+            app.self_verify(document, self.public_key, plays=self.plays)